@@ -114,6 +114,10 @@ DATABASES = {
     'default': dj_database_url.config(default=config('DATABASE_URL'))
 }
 
+# Trigram lookups for deal search (core.utils.search)
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    INSTALLED_APPS.append('django.contrib.postgres')
+
 
 
 # Password validation
@@ -162,6 +166,88 @@ SIMPLE_JWT = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 BACKEND_URL = os.getenv('BACKEND_URL', 'http://localhost:8000/api/')
+
+# Deal list pagination (?page_size= can request up to DEAL_MAX_PAGE_SIZE)
+DEAL_PAGE_SIZE = int(os.getenv('DEAL_PAGE_SIZE', 50))
+DEAL_MAX_PAGE_SIZE = int(os.getenv('DEAL_MAX_PAGE_SIZE', 500))
+
+# LLM provider used by the analysis pipeline ("gemini", or "fake" to run offline)
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini')
+LLM_MODEL = os.getenv('LLM_MODEL', 'gemini-1.5-flash')
+GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')  # required by the gemini provider
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 30))  # seconds per call
+LLM_FAKE_LATENCY = float(os.getenv('LLM_FAKE_LATENCY', 0))  # seconds, fake provider only
+
+# Provider protection (core.utils.llm_guard)
+LLM_RATE_LIMIT = float(os.getenv('LLM_RATE_LIMIT', 5))  # calls per second
+LLM_RATE_BURST = int(os.getenv('LLM_RATE_BURST', 10))
+LLM_RATE_LIMIT_MAX_WAIT = float(os.getenv('LLM_RATE_LIMIT_MAX_WAIT', 10))  # seconds
+LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', 5))  # consecutive failures
+LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', 30))  # seconds before a trial call
+
+# LLM response cache: in-process LRU in front of the CachedLLMResponse table
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 7 * 24 * 3600))  # seconds
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', 1024))
+LLM_CACHE_DB_ENTRIES = int(os.getenv('LLM_CACHE_DB_ENTRIES', 50000))
+
+# Background jobs (core.utils.jobs). Set JOB_WORKERS=0 when jobs are run by
+# `manage.py run_workers` (which then starts one worker unless given --workers);
+# JOB_RUN_INLINE runs each job in the request thread.
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 2))  # seconds
+JOB_RUN_INLINE = os.getenv('JOB_RUN_INLINE', 'false').lower() == 'true'
+# Running jobs older than this were left by a dead worker and are claimed again,
+# up to JOB_MAX_ATTEMPTS claims in all
+JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', 30 * 60))  # seconds
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_RECOVERY_INTERVAL = float(os.getenv('JOB_RECOVERY_INTERVAL', 60))  # seconds between stale job checks
+
+# Bulk deal import (POST /api/deals/import/, `manage.py import_deals`): deals
+# inserted per bulk_create, and deals enriched per background job
+DEAL_IMPORT_BATCH_SIZE = int(os.getenv('DEAL_IMPORT_BATCH_SIZE', 1000))
+ENRICHMENT_BATCH_SIZE = int(os.getenv('ENRICHMENT_BATCH_SIZE', 25))
+
+# Deals analyzed at once by POST /api/deals/analyze-batch/
+BATCH_ANALYSIS_CONCURRENCY = int(os.getenv('BATCH_ANALYSIS_CONCURRENCY', 8))
+BATCH_ANALYSIS_MAX_CONCURRENCY = int(os.getenv('BATCH_ANALYSIS_MAX_CONCURRENCY', 32))
+
+# Monte Carlo scenarios per POST /api/deals/<pk>/simulate/
+SIMULATION_DEFAULT_SCENARIOS = int(os.getenv('SIMULATION_DEFAULT_SCENARIOS', 10000))
+SIMULATION_MAX_SCENARIOS = int(os.getenv('SIMULATION_MAX_SCENARIOS', 100000))
+
+# Deal search (GET /api/deals/search/): results per query, and the trigram
+# similarity below which fuzzy matches are dropped (in-process index only)
+DEAL_SEARCH_LIMIT = int(os.getenv('DEAL_SEARCH_LIMIT', 10))
+DEAL_SEARCH_MAX_LIMIT = int(os.getenv('DEAL_SEARCH_MAX_LIMIT', 50))
+DEAL_SEARCH_MIN_SIMILARITY = float(os.getenv('DEAL_SEARCH_MIN_SIMILARITY', 0.5))
+
+# Cache backend. The default is per process: point CACHE_BACKEND/CACHE_LOCATION
+# at a shared cache (e.g. Redis) when running several processes, so that
+# invalidations reach all of them.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds the dashboard statistics stay cached (they are also invalidated on change).
+# With the per-process default cache, invalidations made by job workers and
+# commands never reach the web processes, so the shorter TTL applies there.
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 3600))
+DASHBOARD_LOCAL_CACHE_TTL = int(os.getenv('DASHBOARD_LOCAL_CACHE_TTL', 30))
+# Recompute a user's dashboard distributions in the background after each change
+DASHBOARD_PRECOMPUTE = os.getenv('DASHBOARD_PRECOMPUTE', 'true').lower() == 'true'
+
+# Longest history served by GET /api/dashboard/trends/ (?days=)
+DASHBOARD_TRENDS_MAX_DAYS = int(os.getenv('DASHBOARD_TRENDS_MAX_DAYS', 730))
+
+# Document parsing (core.utils.parse_document): worker processes, and pages per
+# task; documents of at most DOCUMENT_PARSE_CHUNK_PAGES pages are parsed in-process
+DOCUMENT_PARSE_WORKERS = int(os.getenv('DOCUMENT_PARSE_WORKERS', os.cpu_count() or 1))
+DOCUMENT_PARSE_CHUNK_PAGES = int(os.getenv('DOCUMENT_PARSE_CHUNK_PAGES', 10))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -26,5 +26,8 @@ urlpatterns = [
     path('api/', include('core.urls.filter')),
     path('api/', include('core.urls.stat')),
     path('api/', include('core.urls.analysisResult')),
+    path('api/', include('core.urls.job')),
+    path('api/', include('core.urls.llm')),
+    path('api/', include('core.urls.simulation')),
     
 ]
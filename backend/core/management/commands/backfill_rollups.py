@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.rollup import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the daily dashboard rollups from deals and analysis results, "
+        "a chunk of users at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild this username's rollups.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Users rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        users = User.objects.order_by("pk")
+        if options["user"]:
+            users = users.filter(username=options["user"])
+            if not users.exists():
+                raise CommandError(f"No user named {options['user']!r}")
+
+        user_ids = list(users.values_list("pk", flat=True))
+        rows = 0
+        for start in range(0, len(user_ids), options["chunk_size"]):
+            chunk = user_ids[start:start + options["chunk_size"]]
+            rows += rebuild_rollups(chunk)
+            self.stdout.write(f"{start + len(chunk)}/{len(user_ids)} users, {rows} rows")
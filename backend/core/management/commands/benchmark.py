@@ -0,0 +1,321 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def bench_analysis(options):
+    """Offline run_full_analysis latency against the fake LLM provider, with the LLM cache off."""
+    from django.test import override_settings
+
+    from core.utils.analysis import run_full_analysis
+    from core.utils.llm import FakeLLMProvider
+
+    latency = options["latency"]
+    data = {
+        "purchase_price": 1000000, "noi": 75000, "bedrooms": 3, "bathrooms": 2, "sqft": 1200,
+        "rent": 2500, "year_built": 1995, "crime_score": 5, "area_income": 60000,
+    }
+    provider = FakeLLMProvider(latency=latency)
+    timings = []
+    # Every repeat must reach the provider, and nothing is written to the cache table
+    with override_settings(LLM_CACHE_ENABLED=False):
+        for _ in range(options["repeat"]):
+            started = time.perf_counter()
+            run_full_analysis(data, provider=provider)
+            timings.append(time.perf_counter() - started)
+    return [
+        f"per-call latency: {latency:.3f}s (sequential would be {2 * latency:.3f}s)",
+        f"best: {min(timings):.3f}s  mean: {sum(timings) / len(timings):.3f}s",
+    ]
+
+
+def legacy_clean_json_response(response_text):
+    """The regex-based extractor clean_json_response replaced, kept for comparison."""
+    response_text = response_text.strip()
+    response_text = re.sub(r'^```json\s*|```$', '', response_text, flags=re.IGNORECASE)
+    response_text = re.sub(r'^json\s*', '', response_text, flags=re.IGNORECASE)
+    match = re.search(r'(\{.*\})', response_text, re.DOTALL)
+    if not match:
+        raise ValueError("No JSON object found in the response.")
+    json_str = match.group(1)
+    json_str = ''.join(c for c in json_str if ord(c) >= 32 or c in '\n\r\t')
+
+    def escape_backslashes_in_string(match):
+        content = match.group(1)
+        content = content.replace('\\', '\\\\')
+        content = content.replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
+        return '"' + content + '"'
+
+    json_str = re.sub(r'"(.*?)"', escape_backslashes_in_string, json_str, flags=re.DOTALL)
+    json_str = re.sub(r',\s*([}\]])', r'\1', json_str)
+    return json_str
+
+
+def bench_json(options):
+    """clean_json_response against the legacy regex extractor on a large response."""
+    from core.utils.analysis import clean_json_response
+
+    items = [f"Unit {i}: raise rent to ${1000 + i}\n(see C:\\notes\\unit{i}.txt)" for i in range(options["size"])]
+    expected = {"risk_score": "Medium", "red_flags": items, "recommendations": items}
+    body = json.dumps(expected, indent=2)
+    response = "Here is the analysis:\n```json\n" + body.replace("\n]", ",\n]") + "\n```"
+
+    lines = [f"response size: {len(response) / 1024:.0f} KiB"]
+    for label, extract in (("single-pass", clean_json_response), ("legacy", legacy_clean_json_response)):
+        timings = []
+        for _ in range(options["repeat"]):
+            started = time.perf_counter()
+            content = extract(response)
+            timings.append(time.perf_counter() - started)
+        try:
+            verdict = "correct" if json.loads(content) == expected else "wrong content"
+        except ValueError:
+            verdict = "invalid JSON"
+        lines.append(f"{label:>12}: best {min(timings) * 1000:.1f}ms, output {verdict}")
+    return lines
+
+
+def bench_metrics(options):
+    """Vectorized IRR/NPV/cap rate/cash-on-cash over --size deals against a per-deal loop."""
+    import numpy as np
+
+    from core.utils import metrics
+
+    size = options["size"]
+    rng = np.random.default_rng(0)
+    price = rng.uniform(5e5, 5e6, size)
+    noi = price * rng.uniform(0.03, 0.1, size)
+    invested = price * 0.25
+    annual = noi * rng.uniform(0.3, 0.7, size)
+    flows = np.column_stack([-invested, np.outer(annual, 1.03 ** np.arange(9)), price * rng.uniform(0.2, 0.6, size)])
+
+    timings = []
+    for _ in range(options["repeat"]):
+        started = time.perf_counter()
+        result = metrics.deal_metrics(noi, price, annual, invested, flows)
+        timings.append(time.perf_counter() - started)
+    sample = min(size, 500)
+    started = time.perf_counter()
+    looped = [metrics.irr(row)[0] for row in flows[:sample]]
+    per_deal = (time.perf_counter() - started) / sample
+    assert np.allclose(looped, result["irr"][:sample], equal_nan=True)
+    return [
+        f"deals: {size}, periods: {flows.shape[1]}, IRR found for {int(np.isfinite(result['irr']).sum())}",
+        f"vectorized: best {min(timings):.3f}s ({size / min(timings):,.0f} deals/s)",
+        f"per-deal loop: {per_deal * 1000:.2f}ms per deal ({1 / per_deal:,.0f} deals/s)",
+    ]
+
+
+def bench_distributions(options):
+    """Cold dashboard distributions of a user with --size generated deals, half of them analyzed."""
+    import random
+
+    from django.contrib.auth.models import User
+    from django.db import transaction
+
+    from core.models import AnalysisResult, Deal
+    from core.utils.dashboard import compute_distributions
+
+    rng = random.Random(0)
+    # Everything is rolled back at the end
+    with transaction.atomic():
+        user = User.objects.create_user(username="benchmark-distributions")
+        Deal.objects.bulk_create((
+            Deal(user=user, address=f"{i} Main St", asking_price=rng.randint(100000, 900000),
+                 price=rng.choice([None, rng.randint(100000, 900000)]), sqft=rng.randint(500, 3000))
+            for i in range(options["size"])
+        ), batch_size=5000)
+        AnalysisResult.objects.bulk_create((
+            AnalysisResult(deal_id=deal_id, cap_rate=rng.uniform(0.03, 0.1), cash_on_cash=rng.uniform(0, 0.12),
+                           risk_score=rng.choice(["Low", "Medium", "High"]))
+            for deal_id in Deal.objects.filter(user=user).values_list("id", flat=True)[::2]
+        ), batch_size=5000)
+        timings = []
+        for _ in range(options["repeat"]):
+            started = time.perf_counter()
+            compute_distributions(user)
+            timings.append(time.perf_counter() - started)
+        transaction.set_rollback(True)
+    return [
+        f"deals: {options['size']}, target 0.200s",
+        f"best: {min(timings):.3f}s  mean: {sum(timings) / len(timings):.3f}s",
+    ]
+
+
+SEARCH_QUERIES = ("1234 ma", "oak", "mapel avenue", "austin tx", "7870", "4321 cedr st spr")
+
+
+def bench_search(options):
+    """Deal search queries against an in-process trigram index of --size generated deals."""
+    import random
+
+    from core.utils.search import NgramIndex, normalize
+
+    rng = random.Random(0)
+    streets = ["Main", "Oak", "Maple", "Cedar", "Pine", "Elm", "Washington", "Lake", "Hill", "Park", "Sunset", "River"]
+    kinds = ["St", "Ave", "Rd", "Ln", "Dr", "Blvd"]
+    cities = [("Austin", "TX"), ("Dallas", "TX"), ("Springfield", "IL"), ("Portland", "OR"), ("Denver", "CO")]
+    texts = []
+    for _ in range(options["size"]):
+        city, state = rng.choice(cities)
+        texts.append(normalize(
+            f"{rng.randint(1, 9999)} {rng.choice(streets)} {rng.choice(kinds)} {city} {state} {rng.randint(10000, 99999)}"
+        ))
+
+    started = time.perf_counter()
+    index = NgramIndex(enumerate(texts))
+    build = time.perf_counter() - started
+    lines = [f"deals: {len(index)}, index built in {build:.2f}s"]
+    for query in SEARCH_QUERIES:
+        timings = []
+        for _ in range(options["repeat"]):
+            started = time.perf_counter()
+            matches = index.search(normalize(query), 10, 0.5)
+            timings.append(time.perf_counter() - started)
+        top = texts[matches[0][0]] if matches else "-"
+        lines.append(f"{query!r:>20}: best {min(timings) * 1000:.1f}ms, top match {top!r}")
+    return lines
+
+
+SAMPLE_ROW_HEIGHT = 14
+
+
+def write_sample_pdf(target, doc_type="t12", pages=200):
+    """
+    Writes a synthetic T12 or rent roll of about `pages` pages to a path or
+    binary file: one ruled table whose header row repeats on every page.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+
+    if doc_type == "t12":
+        months = ["Jan 2024", "Feb 2024", "Mar 2024", "Apr 2024", "May 2024", "Jun 2024",
+                  "Jul 2024", "Aug 2024", "Sep 2024", "Oct 2024", "Nov 2024", "Dec 2024"]
+        items = ["Rental Income", "Parking Income", "Laundry Income", "Property Tax", "Insurance",
+                 "Repairs & Maintenance", "Utilities - Water", "Payroll", "Management Fee", "Landscaping"]
+        header = ["Description", *months, "YTD"]
+
+        def row(i):
+            values = [1000 + (i * 37 + month * 11) % 900 for month in range(12)]
+            return [f"{items[i % len(items)]} {i // len(items) + 1}", *(f"${v:,}" for v in values), f"${sum(values):,}"]
+    else:
+        header = ["Unit #", "Tenant Name", "Sq. Ft.", "Market Rent", "Rent", "Status", "Lease End"]
+
+        def row(i):
+            vacant = i % 13 == 0
+            return [f"{100 + i}", "" if vacant else f"Tenant {i}", f"{600 + i % 7 * 100:,}", f"${1300 + i % 9 * 50:,}",
+                    "$0" if vacant else f"${1250 + i % 9 * 50:,}", "Vacant" if vacant else "Occupied", f"{i % 12 + 1}/30/2025"]
+
+    margin = 0.5 * inch
+    rows_per_page = int((letter[0] - 2 * margin) // SAMPLE_ROW_HEIGHT) - 2
+    data = [header, *(row(i) for i in range(pages * rows_per_page))]
+    table = Table(data, repeatRows=1, rowHeights=SAMPLE_ROW_HEIGHT)
+    table.setStyle(TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.black),
+        ("FONTSIZE", (0, 0), (-1, -1), 6),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]))
+    document = SimpleDocTemplate(
+        target, pagesize=landscape(letter),
+        leftMargin=margin, rightMargin=margin, topMargin=margin, bottomMargin=margin,
+    )
+    document.build([table])
+
+
+def bench_pdf(options):
+    """Table extraction from a generated --pages page T12, in-process and with the worker pool."""
+    import tempfile
+
+    from core.utils.parse_document import parse_pdf, primary_rows, shutdown_pool
+
+    workers = options["workers"] or settings.DOCUMENT_PARSE_WORKERS
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "t12.pdf")
+        started = time.perf_counter()
+        write_sample_pdf(path, "t12", options["pages"])
+        lines = [f"generated {os.path.getsize(path) / 1e6:.1f}MB in {time.perf_counter() - started:.1f}s"]
+        runs = [("in-process", 1)] + ([(f"{workers} workers", workers)] if workers > 1 else [])
+        for label, count in runs:
+            if count > 1:
+                parse_pdf(path, workers=count)  # start the worker processes outside the timing
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                parsed = parse_pdf(path, workers=count)
+                timings.append(time.perf_counter() - started)
+            lines.append(
+                f"{label:>12}: best {min(timings):.2f}s for {parsed['pages']} pages, "
+                f"{len(primary_rows(parsed['tables']))} rows, detected {parsed['doc_type']}"
+            )
+    shutdown_pool()
+    return lines
+
+
+# Modules that are slow to import and should only load when a request needs them.
+# Code loaded at start-up imports them, and the modules that import them at
+# load time (core.utils.metrics, underwrite and simulation), inside the
+# functions that need them; StartupImportTests keeps it that way.
+HEAVY_MODULES = ("numpy", "pandas", "pdfplumber", "reportlab", "google.generativeai")
+
+STARTUP_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+import backend.urls
+elapsed = time.perf_counter() - started
+print(json.dumps([elapsed, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))
+"""
+
+
+def bench_startup(options):
+    """Cold start of a fresh interpreter: django.setup() plus importing the URLconf."""
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "backend.settings")}
+    timings = []
+    for _ in range(options["repeat"]):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True, check=True, env=env, cwd=settings.BASE_DIR,
+        ).stdout
+        elapsed, loaded = json.loads(output.strip().splitlines()[-1])
+        timings.append(elapsed)
+    return [
+        f"best: {min(timings):.3f}s  mean: {sum(timings) / len(timings):.3f}s",
+        f"heavy modules loaded at start-up: {', '.join(loaded) or 'none'}",
+    ]
+
+
+BENCHMARKS = {
+    "analysis": bench_analysis,
+    "distributions": bench_distributions,
+    "json": bench_json,
+    "metrics": bench_metrics,
+    "pdf": bench_pdf,
+    "search": bench_search,
+    "startup": bench_startup,
+}
+
+
+class Command(BaseCommand):
+    help = "Runs an offline performance benchmark: " + ", ".join(BENCHMARKS)
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=sorted(BENCHMARKS))
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM latency in seconds.")
+        parser.add_argument("--size", type=int, default=20000, help="Number of items in generated inputs.")
+        parser.add_argument("--pages", type=int, default=200, help="Pages of the generated PDF.")
+        parser.add_argument("--workers", type=int, default=None, help="Parser processes, defaults to settings.")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+        for line in BENCHMARKS[options["name"]](options):
+            self.stdout.write(line)
@@ -0,0 +1,34 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.deal_import import detect_format, import_deals, iter_import_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports deals for a user from a CSV or JSON file and queues their enrichment "
+        "for `manage.py run_workers`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--user", required=True, help="Username that will own the deals.")
+        parser.add_argument("--format", choices=["csv", "json"], help="Guessed from the file name by default.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Defaults to settings.DEAL_IMPORT_BATCH_SIZE.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+
+        file_format = options["format"] or detect_format(options["path"])
+        with open(options["path"], "rb") as file:
+            report = import_deals(
+                user, iter_import_rows(file, file_format), batch_size=options["batch_size"], wake_workers=False,
+            )
+        for error in report.pop("errors"):
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(json.dumps(report))
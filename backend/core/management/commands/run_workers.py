@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.jobs import worker_pool
+
+
+class Command(BaseCommand):
+    help = "Runs background job workers in the foreground until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Defaults to settings.JOB_WORKERS, or 1 when web processes run no workers (JOB_WORKERS=0).",
+        )
+
+    def handle(self, *args, **options):
+        workers = max(settings.JOB_WORKERS, 1) if options["workers"] is None else options["workers"]
+        if workers < 1:
+            raise CommandError("--workers must be at least 1.")
+        worker_pool.start(workers)
+        self.stdout.write(f"Started {worker_pool.size} job workers")
+        try:
+            worker_pool.join()
+        except KeyboardInterrupt:
+            worker_pool.stop()
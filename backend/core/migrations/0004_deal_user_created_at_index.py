@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_analysisresult_risk_explanation_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'created_at'], name='core_deal_user_created_idx'),
+        ),
+    ]
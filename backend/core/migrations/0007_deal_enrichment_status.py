@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:22
+
+from django.db import migrations, models
+
+
+def mark_existing_deals(apps, schema_editor):
+    # Deals created before this migration were enriched while the request
+    # waited; those without data will never be picked up by a job.
+    Deal = apps.get_model('core', 'Deal')
+    Deal.objects.filter(fetched_data__isnull=False).update(enrichment_status='done')
+    Deal.objects.filter(fetched_data__isnull=True).update(enrichment_status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deal',
+            name='enrichment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_deals, migrations.RunPython.noop),
+    ]
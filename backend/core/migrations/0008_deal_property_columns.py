@@ -0,0 +1,104 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:34
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+PROPERTY_COLUMNS = {'price': int, 'rent': int, 'sqft': int, 'year_built': int, 'cap_rate': float}
+BATCH_SIZE = 1000
+
+
+def to_number(value):
+    # Copy of core.utils.summarize.parse_number, frozen for this migration
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value or '').strip().replace(',', '').replace('$', '')
+    match = re.search(r'-?\d+(?:\.\d+)?', text)
+    if not match:
+        return None
+    number = float(match.group())
+    if '%' in text:
+        number /= 100
+    return -abs(number) if text.startswith('(') and text.endswith(')') else number
+
+
+def backfill_property_columns(apps, schema_editor):
+    Deal = apps.get_model('core', 'Deal')
+    deals = Deal.objects.exclude(fetched_data__isnull=True).only('id', 'fetched_data').order_by('id')
+    batch = []
+    for deal in deals.iterator(chunk_size=BATCH_SIZE):
+        data = deal.fetched_data if isinstance(deal.fetched_data, dict) else {}
+        for name, cast in PROPERTY_COLUMNS.items():
+            value = to_number(data.get(name))
+            setattr(deal, name, cast(value) if value is not None else None)
+        batch.append(deal)
+        if len(batch) == BATCH_SIZE:
+            Deal.objects.bulk_update(batch, list(PROPERTY_COLUMNS))
+            batch = []
+    if batch:
+        Deal.objects.bulk_update(batch, list(PROPERTY_COLUMNS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_deal_enrichment_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deal',
+            name='cap_rate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deal',
+            name='price',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deal',
+            name='rent',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deal',
+            name='sqft',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deal',
+            name='year_built',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_property_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'asking_price'], name='core_deal_user_asking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'price'], name='core_deal_user_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'rent'], name='core_deal_user_rent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'sqft'], name='core_deal_user_sqft_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'year_built'], name='core_deal_user_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'cap_rate'], name='core_deal_user_cap_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def populate_filter_matches(apps, schema_editor):
+    # Same conditions as core.utils.filters.apply_filter_setting at this point
+    Deal = apps.get_model('core', 'Deal')
+    FilterSetting = apps.get_model('core', 'FilterSetting')
+    FilterMatch = apps.get_model('core', 'FilterMatch')
+    for filter_setting in FilterSetting.objects.all().iterator():
+        deals = Deal.objects.filter(user_id=filter_setting.user_id)
+        if filter_setting.min_cap_rate:
+            deals = deals.filter(cap_rate__gte=filter_setting.min_cap_rate)
+        if filter_setting.max_price is not None:
+            deals = deals.filter(asking_price__lte=filter_setting.max_price)
+        if filter_setting.year_built_min is not None:
+            deals = deals.filter(year_built__gte=filter_setting.year_built_min)
+        FilterMatch.objects.bulk_create(
+            (FilterMatch(filter_setting_id=filter_setting.pk, deal_id=deal_id)
+             for deal_id in deals.values_list('id', flat=True).iterator()),
+            batch_size=BATCH_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_deal_property_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilterMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='filter_matches', to='core.deal')),
+                ('filter_setting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='core.filtersetting')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('filter_setting', 'deal'), name='core_filtermatch_unique')],
+            },
+        ),
+        migrations.RunPython(populate_filter_matches, migrations.RunPython.noop),
+    ]
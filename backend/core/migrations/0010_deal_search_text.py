@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:39
+
+import re
+
+from django.db import migrations, models
+
+
+SEARCH_FIELDS = ('address', 'city', 'state', 'zip_code')
+BATCH_SIZE = 1000
+
+
+def normalize(text):
+    # Copy of core.utils.search.normalize, frozen for this migration
+    return re.sub(r'[^0-9a-z]+', ' ', (text or '').lower()).strip()
+
+
+def backfill_search_text(apps, schema_editor):
+    Deal = apps.get_model('core', 'Deal')
+    batch = []
+    for deal in Deal.objects.only('id', *SEARCH_FIELDS).order_by('id').iterator(chunk_size=BATCH_SIZE):
+        deal.search_text = normalize(' '.join(getattr(deal, name) or '' for name in SEARCH_FIELDS))
+        batch.append(deal)
+        if len(batch) == BATCH_SIZE:
+            Deal.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        Deal.objects.bulk_update(batch, ['search_text'])
+
+
+def create_trigram_index(apps, schema_editor):
+    # Only PostgreSQL has pg_trgm; other databases search in-process (core.utils.search)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS core_deal_search_trgm_idx ON core_deal USING gin (search_text gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_deal_search_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_filtermatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deal',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
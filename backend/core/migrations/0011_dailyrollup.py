@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_deal_search_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('deals_added', models.IntegerField(default=0)),
+                ('analyses', models.IntegerField(default=0)),
+                ('passed', models.IntegerField(default=0)),
+                ('cap_rate_sum', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='core_dailyrollup_user_date_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:04
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_documents(apps, schema_editor):
+    """
+    Hashes the files of existing documents, and clears the placeholder
+    parsed_data of documents uploaded before real parsing so that they are
+    parsed on their next analysis.
+    """
+    UploadedDocument = apps.get_model('core', 'UploadedDocument')
+    for document in UploadedDocument.objects.order_by('id').iterator():
+        if 'tables' not in (document.parsed_data or {}):
+            document.parsed_data = None
+        try:
+            with document.file.open('rb'):
+                digest = hashlib.sha256()
+                for chunk in document.file.chunks():
+                    digest.update(chunk)
+                document.content_hash = digest.hexdigest()
+        except (OSError, ValueError):
+            pass  # file missing from storage
+        document.save(update_fields=['parsed_data', 'content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(hash_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_uploadeddocument_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='cap_rate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='analysisresult',
+            name='cash_on_cash',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_backgroundjob_attempts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='deal',
+            name='core_deal_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='core_deal_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:41
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def count_cap_rates(apps, schema_editor):
+    """Counts the analyses with a cap rate into the existing rollup rows."""
+    AnalysisResult = apps.get_model('core', 'AnalysisResult')
+    DailyRollup = apps.get_model('core', 'DailyRollup')
+    counts = (
+        AnalysisResult.objects.filter(cap_rate__isnull=False)
+        .annotate(day=TruncDate('created_at'))
+        .values('deal__user_id', 'day')
+        .annotate(count=Count('id'))
+    )
+    for values in counts:
+        DailyRollup.objects.filter(user_id=values['deal__user_id'], date=values['day']).update(
+            cap_rate_count=values['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_deal_user_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='cap_rate_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_cap_rates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:10
+
+from importlib import import_module
+
+from django.db import migrations
+
+# The helper 0008 backfilled the columns with, since corrected to read
+# percentages as fractions and booleans as no value
+property_columns = import_module('core.migrations.0008_deal_property_columns')
+
+
+def resync_property_columns(apps, schema_editor):
+    """Re-reads the columns of deals whose fetched_data has percentages or booleans."""
+    Deal = apps.get_model('core', 'Deal')
+    deals = Deal.objects.exclude(fetched_data__isnull=True).only('id', 'fetched_data').order_by('id')
+    batch = []
+    for deal in deals.iterator(chunk_size=property_columns.BATCH_SIZE):
+        data = deal.fetched_data if isinstance(deal.fetched_data, dict) else {}
+        values = [data.get(name) for name in property_columns.PROPERTY_COLUMNS]
+        if not any(isinstance(value, bool) or (isinstance(value, str) and '%' in value) for value in values):
+            continue
+        for name, cast in property_columns.PROPERTY_COLUMNS.items():
+            value = property_columns.to_number(data.get(name))
+            setattr(deal, name, cast(value) if value is not None else None)
+        batch.append(deal)
+        if len(batch) == property_columns.BATCH_SIZE:
+            Deal.objects.bulk_update(batch, list(property_columns.PROPERTY_COLUMNS))
+            batch = []
+    if batch:
+        Deal.objects.bulk_update(batch, list(property_columns.PROPERTY_COLUMNS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_dailyrollup_cap_rate_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(resync_property_columns, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class Deal(models.Model):
@@ -13,7 +14,21 @@ class Deal(models.Model):
         property_type (CharField): Type of property (e.g., residential, commercial).
         created_at (DateTimeField): Timestamp when the deal was created.
         fetched_data (JSONField): Auto-fetched or parsed data related to the deal.
+        enrichment_status (CharField): Whether fetched_data has been generated yet (pending, done or failed).
+        price, rent, sqft, year_built, cap_rate: Typed copies of the same keys of fetched_data,
+            kept in sync on save so that filters can use indexes.
+        search_text (CharField): Normalized address, city, state and ZIP code, kept in sync on
+            save for deal search (see core.utils.search).
     """
+    ENRICHMENT_PENDING = 'pending'
+    ENRICHMENT_DONE = 'done'
+    ENRICHMENT_FAILED = 'failed'
+    ENRICHMENT_CHOICES = [
+        (ENRICHMENT_PENDING, 'Pending'),
+        (ENRICHMENT_DONE, 'Done'),
+        (ENRICHMENT_FAILED, 'Failed'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     address = models.CharField(max_length=255)
     city = models.CharField(max_length=100, blank=True)
@@ -25,25 +40,78 @@ class Deal(models.Model):
 
     # Auto-fetched or parsed data
     fetched_data = models.JSONField(blank=True, null=True)
+    enrichment_status = models.CharField(max_length=10, choices=ENRICHMENT_CHOICES, default=ENRICHMENT_PENDING)
+
+    # Typed copies of fetched_data, see sync_property_columns
+    price = models.IntegerField(blank=True, null=True)
+    rent = models.IntegerField(blank=True, null=True)
+    sqft = models.IntegerField(blank=True, null=True)
+    year_built = models.IntegerField(blank=True, null=True)
+    cap_rate = models.FloatField(blank=True, null=True)
+
+    # Normalized location, see sync_search_text
+    search_text = models.CharField(max_length=500, blank=True, default='', editable=False)
+
+    # fetched_data key -> type of its column
+    PROPERTY_COLUMNS = {'price': int, 'rent': int, 'sqft': int, 'year_built': int, 'cap_rate': float}
+    SEARCH_FIELDS = ('address', 'city', 'state', 'zip_code')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='core_deal_user_created_idx'),
+            models.Index(fields=['user', 'asking_price'], name='core_deal_user_asking_idx'),
+            models.Index(fields=['user', 'price'], name='core_deal_user_price_idx'),
+            models.Index(fields=['user', 'rent'], name='core_deal_user_rent_idx'),
+            models.Index(fields=['user', 'sqft'], name='core_deal_user_sqft_idx'),
+            models.Index(fields=['user', 'year_built'], name='core_deal_user_year_idx'),
+            models.Index(fields=['user', 'cap_rate'], name='core_deal_user_cap_idx'),
+        ]
 
     def __str__(self):
         return self.address
+
+    def sync_property_columns(self):
+        """Copies the PROPERTY_COLUMNS keys of fetched_data into their typed columns."""
+        from core.utils.summarize import parse_number
+
+        data = self.fetched_data if isinstance(self.fetched_data, dict) else {}
+        for name, cast in self.PROPERTY_COLUMNS.items():
+            value = parse_number(data.get(name))
+            setattr(self, name, cast(value) if value is not None else None)
+
+    def sync_search_text(self):
+        """Builds search_text from the SEARCH_FIELDS."""
+        from core.utils.search import normalize
+
+        self.search_text = normalize(' '.join(getattr(self, name) or '' for name in self.SEARCH_FIELDS))
+
+    def save(self, *args, **kwargs):
+        self.sync_property_columns()
+        self.sync_search_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if 'fetched_data' in update_fields:
+                update_fields = {*update_fields, *self.PROPERTY_COLUMNS}
+            if not set(update_fields).isdisjoint(self.SEARCH_FIELDS):
+                update_fields = {*update_fields, 'search_text'}
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
 class AnalysisResult(models.Model):
     """
     Represents the analysis results for a real estate deal.
 
     Attributes:
         deal (OneToOneField): The deal associated with this analysis.
-        cap_rate (FloatField): Capitalization rate of the deal.
-        cash_on_cash (FloatField): Cash on cash return of the deal.
+        cap_rate (FloatField, optional): Capitalization rate of the deal; null without a purchase price.
+        cash_on_cash (FloatField, optional): Cash on cash return of the deal; null without equity invested.
         irr (FloatField, optional): Internal rate of return, can be null or blank.
         pass_status (BooleanField): Indicates if the deal passed the analysis.
         recommendations (JSONField): Recommendations based on the analysis.
         created_at (DateTimeField): Timestamp when the analysis was created.
     """
     deal = models.OneToOneField(Deal, on_delete=models.CASCADE)
-    cap_rate = models.FloatField()
-    cash_on_cash = models.FloatField()
+    cap_rate = models.FloatField(null=True, blank=True)
+    cash_on_cash = models.FloatField(null=True, blank=True)
     irr = models.FloatField(null=True, blank=True)  # Optional
     pass_status = models.BooleanField(default=False)
     recommendations = models.JSONField(blank=True, null=True)
@@ -63,7 +131,10 @@ class UploadedDocument(models.Model):
         file (FileField): The uploaded document file.
         doc_type (CharField): Type of document (e.g., T12, Rent Roll).
         uploaded_at (DateTimeField): Timestamp when the document was uploaded.
-        parsed_data (JSONField): Parsed data from the document, if available.
+        parsed_data (JSONField): Parsed tables and summary (see core.utils.documents);
+            null until the document has been parsed.
+        content_hash (CharField): SHA-256 of the file contents; documents with
+            the same contents share one parse.
     """
     deal = models.ForeignKey(Deal, on_delete=models.CASCADE)
     file = models.FileField(upload_to='uploads/')
@@ -71,6 +142,7 @@ class UploadedDocument(models.Model):
     doc_type = models.CharField(max_length=20, choices=DOC_TYPES)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     parsed_data = models.JSONField(blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
     def __str__(self):
         return f"{self.deal.address} - {self.doc_type}"
 
@@ -112,3 +184,110 @@ class FilterSetting(models.Model):
     max_price = models.IntegerField(blank=True, null=True)
     year_built_min = models.IntegerField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+
+class FilterMatch(models.Model):
+    """
+    Materialized membership of a deal in a saved filter, kept up to date by
+    the signal handlers in core.signals (see core.utils.filters).
+    Attributes:
+        filter_setting (ForeignKey): The saved filter.
+        deal (ForeignKey): A deal of the filter's user that matches it.
+    """
+    filter_setting = models.ForeignKey(FilterSetting, on_delete=models.CASCADE, related_name='matches')
+    deal = models.ForeignKey(Deal, on_delete=models.CASCADE, related_name='filter_matches')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['filter_setting', 'deal'], name='core_filtermatch_unique'),
+        ]
+
+
+class DailyRollup(models.Model):
+    """
+    Per-user, per-day totals behind the dashboard trends, updated
+    incrementally by the signal handlers in core.signals (see
+    core.utils.rollup) and rebuilt by `manage.py backfill_rollups`.
+    Attributes:
+        user (ForeignKey): The user whose deals are counted.
+        date (DateField): The day the deals were added or analyzed.
+        deals_added (IntegerField): Deals created that day.
+        analyses (IntegerField): Analysis results created that day.
+        passed (IntegerField): Those of them that passed.
+        cap_rate_sum (FloatField): Sum of their cap rates, for averaging.
+        cap_rate_count (IntegerField): How many of them have a cap rate.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    deals_added = models.IntegerField(default=0)
+    analyses = models.IntegerField(default=0)
+    passed = models.IntegerField(default=0)
+    cap_rate_sum = models.FloatField(default=0)
+    cap_rate_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='core_dailyrollup_user_date_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.date}"
+
+
+class CachedLLMResponse(models.Model):
+    """
+    Persistent tier of the LLM response cache (see core.utils.llm_cache).
+    Attributes:
+        key (CharField): SHA-256 of the model name and prompt.
+        model_name (CharField): Model that produced the response.
+        response (TextField): Raw model output.
+        created_at (DateTimeField): When the response was stored, used for TTL expiry.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    response = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.model_name} - {self.key[:12]}"
+
+
+class BackgroundJob(models.Model):
+    """
+    A unit of work queued in the database and run by core.utils.jobs workers.
+    Attributes:
+        kind (CharField): Job type, a key of core.utils.jobs.JOB_HANDLERS.
+        user (ForeignKey): The user who submitted the job.
+        deal (ForeignKey, optional): The deal the job works on.
+        payload (JSONField): Extra arguments for the handler.
+        status (CharField): queued, running, done or failed.
+        attempts (PositiveSmallIntegerField): How many times a worker has claimed the job.
+        stage_timings (JSONField): Seconds spent in each completed stage.
+        error (TextField): Error message when the job failed.
+        created_at / started_at / finished_at (DateTimeField): Lifecycle timestamps.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = ((QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed'))
+
+    kind = models.CharField(max_length=50)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    deal = models.ForeignKey(Deal, on_delete=models.CASCADE, blank=True, null=True)
+    payload = models.JSONField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    stage_timings = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='core_job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.pk} - {self.status}"
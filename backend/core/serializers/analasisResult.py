@@ -1,4 +1,5 @@
 
+from django.conf import settings
 from rest_framework import serializers
 from core.models import AnalysisResult
 
@@ -22,3 +23,24 @@ class RecommendationsSerializer(serializers.Serializer):
     recommendations = serializers.ListField(
         child=serializers.CharField()
     )
+
+
+class BatchAnalysisSerializer(serializers.Serializer):
+    """
+    Serializer for a batch analysis request.
+    Takes either a list of deal IDs or the ID of a saved FilterSetting,
+    plus an optional concurrency limit.
+    """
+    deal_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    filter_id = serializers.IntegerField(required=False)
+    concurrency = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=settings.BATCH_ANALYSIS_MAX_CONCURRENCY,
+        default=settings.BATCH_ANALYSIS_CONCURRENCY,
+    )
+
+    def validate(self, data):
+        if ('deal_ids' in data) == ('filter_id' in data):
+            raise serializers.ValidationError("Provide exactly one of deal_ids or filter_id.")
+        return data
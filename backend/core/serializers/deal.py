@@ -1,4 +1,5 @@
 
+from django.conf import settings
 from rest_framework import serializers
 from core.models import Deal
 from core.serializers.analasisResult import AnalysisResultSerializer
@@ -12,7 +13,10 @@ class DealReadSerializer(serializers.ModelSerializer):
     class Meta:
         model = Deal
         fields = '__all__'
-        read_only_fields = ['id', 'user', 'created_at',  'fetched_data']
+        read_only_fields = [
+            'id', 'user', 'created_at',  'fetched_data', 'enrichment_status',
+            'price', 'rent', 'sqft', 'year_built', 'cap_rate', 'search_text',
+        ]
     def get_analysis_result(self, obj):
         """
         Custom method to get the analysis result for the deal.
@@ -29,8 +33,55 @@ class DealReadSerializer(serializers.ModelSerializer):
 class DealWriteSerializer(serializers.ModelSerializer):
     """
     Serializer for writing Deal instances.
-    Excludes user, created_at, and fetched_data fields to allow creation and updates.
+    Excludes user, created_at, fetched_data and the columns derived from it to allow creation and updates.
     """
     class Meta:
         model = Deal
-        exclude = ['user', 'created_at', 'fetched_data']
+        exclude = [
+            'user', 'created_at', 'fetched_data', 'enrichment_status',
+            'price', 'rent', 'sqft', 'year_built', 'cap_rate', 'search_text',
+        ]
+
+
+class DealEnrichmentSerializer(serializers.ModelSerializer):
+    """
+    Serializer for polling the background enrichment of a deal.
+    """
+    class Meta:
+        model = Deal
+        fields = ['id', 'enrichment_status', 'fetched_data']
+        read_only_fields = fields
+
+
+class DealSearchSerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of a deal search.
+    """
+    q = serializers.CharField(max_length=200, allow_blank=True, trim_whitespace=True)
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_limit(self, value):
+        if value > settings.DEAL_SEARCH_MAX_LIMIT:
+            raise serializers.ValidationError(f"At most {settings.DEAL_SEARCH_MAX_LIMIT}.")
+        return value
+
+
+class DealSearchResultSerializer(serializers.ModelSerializer):
+    """
+    Serializer for deal search results: the location of each match and its score.
+    """
+    score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Deal
+        fields = ['id', 'address', 'city', 'state', 'zip_code', 'asking_price', 'score']
+        read_only_fields = fields
+
+
+class DealImportSerializer(serializers.Serializer):
+    """
+    Serializer for a bulk deal import upload.
+    The format is guessed from the file name when it is not given.
+    """
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=['csv', 'json'], required=False)
@@ -10,4 +10,4 @@ class UploadedDocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = UploadedDocument
         fields = '__all__'
-        read_only_fields = ['id', 'deal', 'uploaded_at', 'parsed_data']
+        read_only_fields = ['id', 'deal', 'uploaded_at', 'parsed_data', 'content_hash']
@@ -5,8 +5,17 @@ class FilterSettingSerializer(serializers.ModelSerializer):
     """
     Serializer for FilterSetting model.
     Includes all fields and marks them as read-only except for the user.
+    match_count is the number of deals currently matching the filter.
     """
+    match_count = serializers.SerializerMethodField()
+
     class Meta:
         model = FilterSetting
         fields = '__all__'
         read_only_fields = ['id', 'user', 'created_at']
+
+    def get_match_count(self, obj):
+        # Annotated by list views; counted from FilterMatch otherwise
+        if hasattr(obj, 'match_count'):
+            return obj.match_count
+        return obj.matches.count()
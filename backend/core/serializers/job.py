@@ -0,0 +1,13 @@
+
+from rest_framework import serializers
+from core.models import BackgroundJob
+
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for BackgroundJob model.
+    Exposes the job status and per-stage timings; everything is read-only.
+    """
+    class Meta:
+        model = BackgroundJob
+        fields = ['id', 'kind', 'deal', 'status', 'attempts', 'stage_timings', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
@@ -0,0 +1,45 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class RangeField(serializers.ListField):
+    """A [low, high] pair of floats."""
+
+    def __init__(self, **kwargs):
+        super().__init__(child=serializers.FloatField(), min_length=2, max_length=2, required=False, **kwargs)
+
+    def to_internal_value(self, data):
+        low, high = super().to_internal_value(data)
+        if low > high:
+            raise serializers.ValidationError("Low bound must not exceed high bound.")
+        return low, high
+
+
+class SimulationSerializer(serializers.Serializer):
+    """
+    Serializer for a Monte Carlo simulation request.
+    Every assumption range is optional and falls back to
+    core.utils.simulation.DEFAULT_RANGES.
+    """
+    scenarios = serializers.IntegerField(
+        required=False,
+        min_value=100,
+        max_value=settings.SIMULATION_MAX_SCENARIOS,
+        default=settings.SIMULATION_DEFAULT_SCENARIOS,
+    )
+    years = serializers.IntegerField(required=False, min_value=1, max_value=30, default=5)
+    seed = serializers.IntegerField(required=False, min_value=0)
+    rent_growth = RangeField()
+    vacancy = RangeField()
+    expense_inflation = RangeField()
+    exit_cap_rate = RangeField()
+
+    def validate_vacancy(self, value):
+        if value[0] < 0 or value[1] >= 1:
+            raise serializers.ValidationError("Vacancy must be between 0 and 1.")
+        return value
+
+    def validate_exit_cap_rate(self, value):
+        if value[0] <= 0:
+            raise serializers.ValidationError("Exit cap rate must be positive.")
+        return value
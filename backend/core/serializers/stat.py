@@ -0,0 +1,14 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from core.utils.rollup import PERIODS
+
+
+class TrendsSerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of the dashboard trends.
+    """
+    period = serializers.ChoiceField(choices=PERIODS, required=False, default='day')
+    days = serializers.IntegerField(
+        required=False, min_value=1, max_value=settings.DASHBOARD_TRENDS_MAX_DAYS, default=90,
+    )
@@ -0,0 +1,83 @@
+"""
+Keeps the FilterMatch table, the in-process deal search indexes, the
+cached dashboard statistics and the daily rollups in step with deals,
+analyses and saved filters.
+
+FilterMatch deletions need no handler: rows cascade with their deal or
+filter. Code that writes deals in bulk (bulk_create/bulk_update bypass
+these signals) calls core.utils.filters.refresh_deal_matches and
+core.utils.search.index_deals itself, and
+core.utils.dashboard.invalidate_dashboard and core.utils.rollup.record_deals
+where needed.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.models import AnalysisResult, Deal, FilterSetting
+from core.utils.dashboard import invalidate_dashboard
+from core.utils.filters import rebuild_filter_matches, refresh_deal_matches
+from core.utils.rollup import record_analysis, record_deals
+from core.utils.search import index_deals, unindex_deal
+
+
+def _deleting_user(origin):
+    # Rollups are deleted along with their user and need no decrements
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+@receiver(post_save, sender=Deal, dispatch_uid='core_deal_filter_matches')
+def deal_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        refresh_deal_matches([instance], created=created)
+        index_deals([instance])
+        invalidate_dashboard(instance.user_id)
+        if created:
+            record_deals([instance])
+
+
+@receiver(post_delete, sender=Deal, dispatch_uid='core_deal_search_index')
+def deal_deleted(sender, instance, origin=None, **kwargs):
+    unindex_deal(instance)
+    invalidate_dashboard(instance.user_id)
+    if not _deleting_user(origin):
+        record_deals([instance], sign=-1)
+
+
+@receiver(pre_save, sender=AnalysisResult, dispatch_uid='core_analysis_previous_values')
+def analysis_saving(sender, instance, raw=False, **kwargs):
+    # Remember what the rollups counted for a re-analyzed deal
+    instance._rollup_previous = None
+    if not raw and instance.pk is not None:
+        instance._rollup_previous = (
+            AnalysisResult.objects.filter(pk=instance.pk).values_list('created_at', 'cap_rate', 'pass_status').first()
+        )
+
+
+@receiver(post_save, sender=AnalysisResult, dispatch_uid='core_analysis_saved_dashboard')
+def analysis_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    user_id = instance.deal.user_id
+    invalidate_dashboard(user_id)
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        record_analysis(user_id, *previous, sign=-1)
+    record_analysis(user_id, instance.created_at, instance.cap_rate, instance.pass_status)
+
+
+@receiver(post_delete, sender=AnalysisResult, dispatch_uid='core_analysis_deleted_dashboard')
+def analysis_deleted(sender, instance, origin=None, **kwargs):
+    try:
+        user_id = instance.deal.user_id
+    except Deal.DoesNotExist:
+        return  # deleted along with its deal, whose handler already ran or will run
+    invalidate_dashboard(user_id)
+    if not _deleting_user(origin):
+        record_analysis(user_id, instance.created_at, instance.cap_rate, instance.pass_status, sign=-1)
+
+
+@receiver(post_save, sender=FilterSetting, dispatch_uid='core_filtersetting_filter_matches')
+def filter_setting_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rebuild_filter_matches(instance)
@@ -1,3 +1,1446 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import importlib
+import io
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import Deal, AnalysisResult, BackgroundJob, DailyRollup, FilterMatch, FilterSetting, UploadedDocument
+from core.utils.analysis import calculate_irr, clean_json_response, prepare_risk_prompt, run_full_analysis
+from core.utils.deal_import import iter_json_rows
+from core.utils import llm, metrics, search, underwrite
+from core.utils.jobs import enqueue, run_next_job
+from core.utils.llm import FakeLLMProvider
+from core.utils.llm_cache import response_cache
+from core.utils.llm_guard import CircuitBreaker, CircuitOpenError, ProviderGuard, RateLimitedError, TokenBucket
+from core.utils.parse_document import (
+    _get_pool, merge_tables, normalize_headers, parse_document, parse_pdf, shutdown_pool,
+)
+from core.utils.pipeline import (
+    analyze_deals_concurrently, base_analysis_input, load_analysis_inputs, save_analysis_result, stream_deal_analysis,
+)
+from core.utils.portfolio import PLACEHOLDER_FETCHED_DATA
+from core.utils.search import NgramIndex, clear_indexes, get_index, match_rank
+from core.utils.summarize import summarize_rent_roll, summarize_t12
+
+
+def create_deals(user, count, analyzed=True):
+    deals = []
+    for i in range(count):
+        deal = Deal.objects.create(user=user, address=f"{i} Main St", city="Austin", state="TX")
+        if analyzed and i % 2 == 0:
+            AnalysisResult.objects.create(deal=deal, cap_rate=0.08, cash_on_cash=0.1, pass_status=True)
+        deals.append(deal)
+    return deals
+
+
+class PortfolioQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_deal_list_query_count_is_constant(self):
+        create_deals(self.user, 2)
+        small = self.count_queries("/api/deals/")
+        create_deals(self.user, 20)
+        self.assertEqual(self.count_queries("/api/deals/"), small)
+
+    @mock.patch("core.views.export.export_deals_to_pdf")
+    def test_pdf_export_query_count_is_constant(self, export_mock):
+        create_deals(self.user, 2)
+        small = self.count_queries("/api/deals/export/pdf/")
+        create_deals(self.user, 20)
+        self.assertEqual(self.count_queries("/api/deals/export/pdf/"), small)
+
+    @mock.patch("core.views.export.export_deals_to_excel")
+    def test_excel_export_query_count_is_constant(self, export_mock):
+        create_deals(self.user, 2)
+        small = self.count_queries("/api/deals/export/excel/")
+        create_deals(self.user, 20)
+        self.assertEqual(self.count_queries("/api/deals/export/excel/"), small)
+
+    def test_deal_list_uses_placeholder_and_analysis(self):
+        create_deals(self.user, 2)
+        data = self.client.get("/api/deals/?all=true").json()
+        by_address = {deal["address"]: deal for deal in data}
+        self.assertEqual(by_address["0 Main St"]["analysis_result"]["cap_rate"], 0.08)
+        self.assertEqual(by_address["1 Main St"]["fetched_data"], PLACEHOLDER_FETCHED_DATA)
+
+
+class DealPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        create_deals(self.user, 7, analyzed=False)
+
+    def test_cursor_walks_every_deal_once(self):
+        seen = []
+        url = "/api/deals/?page_size=3"
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data["results"]), 3)
+            seen.extend(deal["id"] for deal in data["results"])
+            url = data["next"]
+        expected = list(Deal.objects.filter(user=self.user).order_by("-created_at").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_deals_created_at_the_same_time_are_walked_once(self):
+        Deal.objects.filter(user=self.user).update(created_at=timezone.now())
+        seen = []
+        url = "/api/deals/?page_size=2"
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url).json()
+            self.assertTrue(any('"core_deal"."id" DESC' in query["sql"] for query in queries.captured_queries))
+            seen.extend(deal["id"] for deal in data["results"])
+            url = data["next"]
+        expected = list(Deal.objects.filter(user=self.user).order_by("-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_all_flag_returns_unpaginated_list(self):
+        data = self.client.get("/api/deals/?all=true").json()
+        self.assertIsInstance(data, list)
+        self.assertEqual(len(data), 7)
+
+
+class DealStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_stream_returns_every_deal(self):
+        create_deals(self.user, 5)
+        response = self.client.get("/api/deals/stream/")
+        self.assertTrue(response.streaming)
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data[0]["fetched_data"], PLACEHOLDER_FETCHED_DATA)
+
+    def test_stream_of_empty_portfolio_is_empty_array(self):
+        response = self.client.get("/api/deals/stream/")
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), [])
+
+
+ANALYSIS_INPUT = {
+    "purchase_price": 1000000,
+    "noi": 75000,
+    "bedrooms": 3,
+    "bathrooms": 2,
+    "sqft": 1200,
+    "rent": 2500,
+    "year_built": 1995,
+    "crime_score": 5,
+    "area_income": 60000,
+}
+
+
+class ConcurrentAnalysisTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+
+    def test_llm_calls_overlap(self):
+        provider = FakeLLMProvider(latency=0.3)
+        started = time.perf_counter()
+        result = run_full_analysis(ANALYSIS_INPUT, provider=provider)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(provider.calls, 2)
+        self.assertLess(elapsed, 0.55)
+        self.assertEqual(result["risk_analysis"]["risk_score"], "Medium")
+        self.assertEqual(len(result["ai_recommendations"]["recommendations"]), 3)
+
+    def test_slow_provider_times_out_with_fallback(self):
+        provider = FakeLLMProvider(latency=1)
+        with self.settings(LLM_TIMEOUT=0.05):
+            result = run_full_analysis(ANALYSIS_INPUT, provider=provider)
+        self.assertEqual(result["risk_analysis"]["risk_score"], "Unknown")
+        self.assertEqual(result["ai_recommendations"], {"recommendations": []})
+
+
+class LLMResponseCacheTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+
+    def test_reanalysis_is_served_from_cache(self):
+        provider = FakeLLMProvider(latency=0.2)
+        run_full_analysis(ANALYSIS_INPUT, provider=provider)
+        started = time.perf_counter()
+        result = run_full_analysis(ANALYSIS_INPUT, provider=provider)
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertEqual(provider.calls, 2)
+        self.assertEqual(result["risk_analysis"]["risk_score"], "Medium")
+        self.assertEqual(response_cache.stats()["memory_hits"], 2)
+
+    def test_unparseable_answers_are_not_cached(self):
+        provider = FakeLLMProvider(response="Sorry, I can't help with that.")
+        for _ in range(2):
+            result = run_full_analysis(ANALYSIS_INPUT, provider=provider)
+        self.assertEqual(provider.calls, 4)
+        self.assertEqual(result["risk_analysis"]["risk_score"], "Unknown")
+
+        user = User.objects.create_user(username="owner", password="secret")
+        deal = create_deals(user, 1, analyzed=False)[0]
+        list(stream_deal_analysis(deal, provider=provider))
+        self.assertEqual(provider.calls, 6)
+        self.assertEqual(response_cache.stats()["memory_entries"], 0)
+
+    def test_database_tier_survives_memory_eviction(self):
+        response_cache.set("fake", "prompt", "answer")
+        response_cache._memory.clear()
+        self.assertEqual(response_cache.get("fake", "prompt"), "answer")
+        self.assertEqual(response_cache.stats()["db_hits"], 1)
+
+    def test_expired_entries_are_misses(self):
+        response_cache.set("fake", "prompt", "answer")
+        response_cache._memory.clear()
+        with self.settings(LLM_CACHE_TTL=1):
+            with mock.patch("core.utils.llm_cache.timezone.now", return_value=timezone.now() + timedelta(seconds=5)):
+                self.assertIsNone(response_cache.get("fake", "prompt"))
+        self.assertEqual(response_cache.stats()["misses"], 1)
+
+    def test_memory_tier_is_bounded(self):
+        with self.settings(LLM_CACHE_MEMORY_ENTRIES=2):
+            for i in range(3):
+                response_cache.set("fake", f"prompt {i}", "answer")
+        self.assertEqual(response_cache.stats()["memory_entries"], 2)
+
+
+@override_settings(LLM_PROVIDER="fake")
+class AnalysisJobTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.deal = create_deals(self.user, 1, analyzed=False)[0]
+
+    @override_settings(JOB_RUN_INLINE=True)
+    def test_analyze_returns_job_and_status_reports_stages(self):
+        response = self.client.post(f"/api/deals/{self.deal.pk}/analyze/")
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(f"/api/jobs/{response.json()['id']}/").json()
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(set(job["stage_timings"]), {"parse_documents", "llm_analysis", "save_result"})
+        self.assertTrue(AnalysisResult.objects.filter(deal=self.deal).exists())
+
+    def test_worker_runs_queued_jobs_in_order(self):
+        first = enqueue("analysis", self.user, deal=self.deal)
+        second = enqueue("analysis", self.user, deal=self.deal)
+        self.assertEqual(first.status, "queued")
+        self.assertEqual(run_next_job().pk, first.pk)
+        self.assertEqual(run_next_job().pk, second.pk)
+        self.assertIsNone(run_next_job())
+        self.assertEqual(BackgroundJob.objects.filter(status="done").count(), 2)
+
+    @override_settings(JOB_STALE_AFTER=60, JOB_MAX_ATTEMPTS=2)
+    def test_jobs_left_running_by_a_dead_worker_are_recovered(self):
+        retried, given_up, running = (enqueue("analysis", self.user, deal=self.deal) for _ in range(3))
+        started = timezone.now() - timedelta(minutes=5)
+        BackgroundJob.objects.filter(pk=retried.pk).update(status="running", started_at=started, attempts=1)
+        BackgroundJob.objects.filter(pk=given_up.pk).update(status="running", started_at=started, attempts=2)
+        BackgroundJob.objects.filter(pk=running.pk).update(status="running", started_at=timezone.now(), attempts=1)
+        with mock.patch("core.utils.jobs._next_recovery", 0.0), self.assertLogs("core.utils.jobs", level="WARNING"):
+            self.assertEqual(run_next_job().pk, retried.pk)
+        statuses = dict(BackgroundJob.objects.values_list("pk", "status"))
+        self.assertEqual(
+            (statuses[retried.pk], statuses[given_up.pk], statuses[running.pk]), ("done", "failed", "running"),
+        )
+        self.assertEqual(BackgroundJob.objects.get(pk=retried.pk).attempts, 2)
+
+    def test_stale_jobs_are_checked_once_per_interval(self):
+        with mock.patch("core.utils.jobs._next_recovery", 0.0), \
+                mock.patch("core.utils.jobs.recover_stale_jobs", return_value=0) as recover:
+            run_next_job()
+            run_next_job()
+        self.assertEqual(recover.call_count, 1)
+
+    @override_settings(JOB_WORKERS=0)
+    def test_run_workers_starts_a_worker_when_web_processes_run_none(self):
+        with mock.patch("core.management.commands.run_workers.worker_pool") as pool:
+            call_command("run_workers", stdout=io.StringIO())
+        pool.start.assert_called_once_with(1)
+        with self.assertRaises(CommandError):
+            call_command("run_workers", "--workers", "0", stdout=io.StringIO())
+
+    def test_failed_job_records_error(self):
+        job = enqueue("analysis", self.user, deal=self.deal)
+        with mock.patch("core.utils.pipeline.run_full_analysis", side_effect=RuntimeError("boom")):
+            with self.assertLogs("core.utils.jobs", level="ERROR"):
+                run_next_job()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, "boom")
+        self.assertIn("parse_documents", job.stage_timings)
+
+    def test_sync_flag_returns_result(self):
+        response = self.client.post(f"/api/deals/{self.deal.pk}/analyze/?sync=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["risk_score"], "Medium")
+
+    def test_other_users_cannot_see_job(self):
+        job = enqueue("analysis", self.user, deal=self.deal)
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username="other", password="secret"))
+        self.assertEqual(other.get(f"/api/jobs/{job.pk}/").status_code, 404)
+
+
+@override_settings(LLM_PROVIDER="fake")
+class DealEnrichmentTests(TestCase):
+    payload = {"address": "1 Main St", "city": "Austin", "state": "TX", "zip_code": "78701"}
+
+    def setUp(self):
+        response_cache.clear()
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_returns_pending_deal_without_calling_llm(self):
+        with mock.patch("core.utils.enrichment.generate_property_data") as generate:
+            response = self.client.post("/api/deals/", self.payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["enrichment_status"], "pending")
+        self.assertIsNone(response.json()["fetched_data"])
+        generate.assert_not_called()
+        job = BackgroundJob.objects.get(deal_id=response.json()["id"])
+        self.assertEqual((job.kind, job.status), ("enrichment", "queued"))
+
+    def test_worker_fills_fetched_data(self):
+        deal_id = self.client.post("/api/deals/", self.payload, format="json").json()["id"]
+        run_next_job()
+        polled = self.client.get(f"/api/deals/{deal_id}/enrichment/").json()
+        self.assertEqual(polled["enrichment_status"], "done")
+        self.assertEqual(polled["fetched_data"]["bedrooms"], llm.FAKE_RESPONSE["bedrooms"])
+
+    def test_invalid_llm_answer_marks_deal_failed(self):
+        deal_id = self.client.post("/api/deals/", self.payload, format="json").json()["id"]
+        with mock.patch.object(llm, "get_provider", return_value=FakeLLMProvider(response="no json here")):
+            with self.assertLogs("core.utils", level="WARNING"):
+                job = run_next_job()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(Deal.objects.get(pk=deal_id).enrichment_status, "failed")
+
+    def test_sync_flag_enriches_before_responding(self):
+        response = self.client.post("/api/deals/?sync=true", self.payload, format="json")
+        self.assertEqual(response.json()["enrichment_status"], "done")
+        self.assertFalse(BackgroundJob.objects.exists())
+
+
+@override_settings(LLM_PROVIDER="fake", ENRICHMENT_BATCH_SIZE=2)
+class DealImportTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Deal.objects.create(user=self.user, address="1 Main St", city="Austin", state="TX", zip_code="78701")
+
+    def upload(self, name, content):
+        return self.client.post(
+            "/api/deals/import/", {"file": SimpleUploadedFile(name, content.encode())}, format="multipart",
+        )
+
+    def test_csv_import_reports_counts(self):
+        content = (
+            "address,city,state,zip_code,asking_price\n"
+            "2 Oak Ave,Austin,TX,78702,250000\n"
+            "1 MAIN ST,austin,TX,78701,\n"
+            ",Austin,TX,78703,100\n"
+            "3 Elm Rd,Dallas,TX,75201,abc\n"
+            "4 Pine Ln,Dallas,TX,75202,\n"
+            "2 Oak Ave,Austin,TX,78702,260000\n"
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload("deals.csv", content)
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report["accepted"], report["rejected"], report["duplicates"]), (2, 2, 2))
+        self.assertEqual([error["row"] for error in report["errors"]], [3, 4])
+        self.assertIn("asking_price", report["errors"][1]["errors"])
+        self.assertEqual(report["enrichment_jobs"], 1)
+        self.assertLess(len(queries), 15)
+        self.assertEqual(Deal.objects.get(address="4 Pine Ln").asking_price, 340000)
+
+    def test_json_import_is_parsed_across_chunks(self):
+        rows = [{"address": f"{i} Long Road", "city": "Austin", "notes": "x" * 500} for i in range(200)]
+        response = self.upload("deals.json", json.dumps(rows))
+        self.assertEqual(response.json()["accepted"], 200)
+        self.assertEqual(response.json()["enrichment_jobs"], 100)
+
+    def test_malformed_json_is_rejected(self):
+        response = self.upload("deals.json", '[{"address": "9 Bay St"}, {"address": ')
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_json_is_not_read_to_the_end(self):
+        stream = io.StringIO('[{"address": "9 Bay St"}, {"address" "1 Bay St"}, ' + '{"address": "2 Bay St"}, ' * 20000)
+        with mock.patch("core.utils.deal_import.MAX_JSON_VALUE_SIZE", 64 * 1024):
+            rows = iter_json_rows(stream, chunk_size=16 * 1024)
+            self.assertEqual(next(rows), {"address": "9 Bay St"})
+            with self.assertRaises(ValueError):
+                next(rows)
+        self.assertLess(stream.tell(), 128 * 1024)
+
+    def test_batch_jobs_enrich_imported_deals(self):
+        self.upload("deals.jsonl", '{"address": "5 Hill St"}\n{"address": "6 Hill St"}\n')
+        job = run_next_job()
+        self.assertEqual((job.kind, job.status), ("enrichment_batch", "done"))
+        statuses = set(Deal.objects.filter(address__endswith="Hill St").values_list("enrichment_status", flat=True))
+        self.assertEqual(statuses, {"done"})
+
+
+def fake_analyze_deal(deal):
+    time.sleep(0.1)
+    if deal.address == "broken":
+        raise ValueError("no data")
+    return AnalysisResult(deal=deal, cap_rate=0.08, cash_on_cash=0.1)
+
+
+@mock.patch("core.utils.pipeline.analyze_deal", fake_analyze_deal)
+class BatchAnalysisTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post_batch(self, payload):
+        response = self.client.post("/api/deals/analyze-batch/", payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_closing_the_stream_does_not_wait_for_the_batch(self):
+        calls = []
+
+        def slow_analysis(deal):
+            calls.append(deal.pk)
+            time.sleep(0.2)
+            return deal.pk
+
+        with mock.patch("core.utils.pipeline._analyze_in_thread", side_effect=slow_analysis):
+            results = analyze_deals_concurrently(create_deals(self.user, 10, analyzed=False), concurrency=2)
+            next(results)
+            started = time.perf_counter()
+            results.close()
+            self.assertLess(time.perf_counter() - started, 0.1)
+            time.sleep(0.3)
+        self.assertLessEqual(len(calls), 4)
+
+    def test_deals_run_concurrently_and_stream_back(self):
+        deals = create_deals(self.user, 6, analyzed=False)
+        started = time.perf_counter()
+        lines = self.post_batch({"deal_ids": [deal.pk for deal in deals], "concurrency": 3})
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual({line["deal_id"] for line in lines[:-1]}, {deal.pk for deal in deals})
+        self.assertEqual(lines[-1], {"status": "complete", "total": 6, "failed": 0})
+
+    def test_failures_are_reported_per_deal(self):
+        deal = Deal.objects.create(user=self.user, address="broken")
+        lines = self.post_batch({"deal_ids": [deal.pk]})
+        self.assertEqual(lines[0], {"deal_id": deal.pk, "status": "failed", "error": "no data"})
+        self.assertEqual(lines[-1]["failed"], 1)
+
+    def test_saved_filter_selects_deals(self):
+        Deal.objects.create(user=self.user, address="cheap", asking_price=100000, fetched_data={"cap_rate": 0.09, "year_built": 2010})
+        Deal.objects.create(user=self.user, address="pricey", asking_price=900000, fetched_data={"cap_rate": 0.09, "year_built": 2010})
+        Deal.objects.create(user=self.user, address="low cap", asking_price=100000, fetched_data={"cap_rate": 0.02, "year_built": 2010})
+        filter_setting = FilterSetting.objects.create(user=self.user, min_cap_rate=0.05, max_price=500000)
+        lines = self.post_batch({"filter_id": filter_setting.pk})
+        self.assertEqual(lines[-1]["total"], 1)
+        self.assertEqual(lines[0]["deal_id"], Deal.objects.get(address="cheap").pk)
+
+    def test_requires_exactly_one_selector(self):
+        response = self.client.post("/api/deals/analyze-batch/", {}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+MONTHS = ["Jan", "Feb", "Mar"]
+
+
+def t12_rows():
+    return [
+        {"Category": "Gross Rent Income", **{m: "$10,000" for m in MONTHS}, "Total": "$30,000"},
+        {"Category": "Property Taxes", **{m: "1,000" for m in MONTHS}, "Total": "3,000"},
+        {"Category": "Repairs", **{m: "500" for m in MONTHS}, "Total": "1,500"},
+        {"Category": "Total Expenses", **{m: "1,500" for m in MONTHS}, "Total": "4,500"},
+    ]
+
+
+def rent_roll_rows(units=300):
+    rows = [{"Unit": str(i), "Rent": f"${1000 + i % 50:,}", "Status": "Occupied", "SqFt": "800"} for i in range(units)]
+    rows[0]["Status"] = "Vacant"
+    rows[1]["Rent"] = "$9,000"
+    return rows
+
+
+class PromptSummaryTests(TestCase):
+    def test_t12_totals(self):
+        summary = summarize_t12(t12_rows())
+        self.assertEqual(summary["periods"], MONTHS)
+        self.assertEqual(summary["income_by_period"], [10000.0] * 3)
+        self.assertEqual(summary["expense_by_period"], [1500.0] * 3)
+        self.assertEqual(summary["noi"], 25500.0)
+        self.assertEqual(summary["top_expenses"][0], {"item": "Property Taxes", "total": 3000.0})
+
+    def test_rent_roll_statistics(self):
+        summary = summarize_rent_roll(rent_roll_rows())
+        self.assertEqual(summary["units"], 300)
+        self.assertEqual(summary["vacant"], 1)
+        self.assertEqual(summary["rent_outliers"], [{"unit": "1", "rent": 9000.0}])
+        self.assertEqual(summary["rent"]["max"], 9000.0)
+
+    def test_summarized_prompt_is_much_smaller(self):
+        rows = rent_roll_rows()
+        prompt = prepare_risk_prompt(60000, 5, t12_rows(), rows)
+        self.assertLess(len(prompt) * 10, len(json.dumps(rows, indent=2)))
+
+
+class CleanJsonResponseTests(TestCase):
+    def parse(self, text):
+        return json.loads(clean_json_response(text))
+
+    def test_strips_fences_and_surrounding_prose(self):
+        text = 'Sure, here it is:\n```json\n{"risk_score": "Low"}\n```\nAnything else? {"x": 1}'
+        self.assertEqual(self.parse(text), {"risk_score": "Low"})
+
+    def test_keeps_valid_escapes_and_repairs_invalid_ones(self):
+        text = '{"a": "say \\"hi\\" in C:\\data \\u00e9"}'
+        self.assertEqual(self.parse(text), {"a": 'say "hi" in C:\\data \u00e9'})
+
+    def test_escapes_raw_control_characters_in_strings(self):
+        self.assertEqual(self.parse('{"a": "line1\nline2\tend\x01"}'), {"a": "line1\nline2\tend"})
+
+    def test_removes_trailing_commas(self):
+        self.assertEqual(self.parse('{"a": [1, 2, ], "b": {"c": 3,},}'), {"a": [1, 2], "b": {"c": 3}})
+
+    def test_commas_inside_strings_are_untouched(self):
+        self.assertEqual(self.parse('{"a": "x, }"}'), {"a": "x, }"})
+
+    def test_closes_truncated_response(self):
+        self.assertEqual(self.parse('{"recommendations": ["one", "tw'), {"recommendations": ["one", "tw"]})
+
+    def test_no_object_raises(self):
+        with self.assertRaises(ValueError):
+            clean_json_response("no json here")
+
+
+def parse_sse(payload):
+    events = []
+    for block in payload.decode().strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+class AnalysisStreamTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.deal = create_deals(self.user, 1, analyzed=False)[0]
+
+    def test_events_cover_every_stage(self):
+        events = [event for event, data in stream_deal_analysis(self.deal, provider=FakeLLMProvider(chunks=4))]
+        self.assertEqual(events[:3], ["started", "documents_parsed", "risk_analysis_started"])
+        self.assertIn("insights_started", events)
+        self.assertEqual(events.count("token"), 8)
+        self.assertEqual(events[-1], "result_saved")
+        self.assertTrue(AnalysisResult.objects.filter(deal=self.deal).exists())
+
+    def test_tokens_arrive_before_the_model_finishes(self):
+        provider = FakeLLMProvider(latency=0.8, chunks=8)
+        started = time.perf_counter()
+        for event, data in stream_deal_analysis(self.deal, provider=provider):
+            if event == "token":
+                break
+        self.assertLess(time.perf_counter() - started, 0.4)
+
+    def test_cached_responses_are_replayed(self):
+        provider = FakeLLMProvider()
+        list(stream_deal_analysis(self.deal, provider=provider))
+        events = list(stream_deal_analysis(self.deal, provider=provider))
+        self.assertEqual(provider.calls, 2)
+        self.assertTrue(all(data["cached"] for event, data in events if event == "token"))
+
+    def test_timeout_is_reported_and_falls_back(self):
+        with self.settings(LLM_TIMEOUT=0.05):
+            events = list(stream_deal_analysis(self.deal, provider=FakeLLMProvider(latency=2)))
+        self.assertEqual([data["call"] for event, data in events if event == "error"], ["risk_analysis", "insights"])
+        self.assertEqual(events[-1][1].risk_score, "Unknown")
+
+    @override_settings(LLM_PROVIDER="fake")
+    def test_endpoint_streams_server_sent_events(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(f"/api/deals/{self.deal.pk}/analyze/stream/", HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = parse_sse(b"".join(response.streaming_content))
+        self.assertEqual(events[0], ("started", {"deal_id": self.deal.pk}))
+        self.assertEqual(events[-1][0], "result_saved")
+        self.assertEqual(events[-1][1]["risk_score"], "Medium")
+
+
+class FailingProvider(FakeLLMProvider):
+    async def generate(self, prompt):
+        self.calls += 1
+        raise ConnectionError("provider down")
+
+
+class LLMGuardTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+
+    def test_identical_in_flight_prompts_share_one_call(self):
+        provider = FakeLLMProvider(latency=0.1)
+
+        async def ask_twice():
+            return await asyncio.gather(llm.generate("same", provider=provider), llm.generate("same", provider=provider))
+
+        first, second = async_to_sync(ask_twice)()
+        self.assertEqual(first, second)
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual(provider.guard.stats()["coalesced"], 1)
+
+    @override_settings(LLM_BREAKER_THRESHOLD=2)
+    def test_breaker_opens_after_consecutive_failures(self):
+        provider = FailingProvider()
+        for prompt in ("a", "b"):
+            with self.assertRaises(ConnectionError):
+                async_to_sync(llm.generate)(prompt, provider=provider)
+        with self.assertRaises(CircuitOpenError):
+            async_to_sync(llm.generate)("c", provider=provider)
+        self.assertEqual(provider.calls, 2)
+        self.assertEqual(provider.guard.stats()["circuit_breaker"]["state"], "open")
+
+    def test_breaker_closes_after_successful_trial(self):
+        breaker = CircuitBreaker(threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        time.sleep(0.06)
+        breaker.before_call()
+        self.assertEqual(breaker.state, "half_open")
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    @override_settings(LLM_BREAKER_THRESHOLD=1, LLM_BREAKER_RESET=0.05)
+    def test_abandoned_trial_calls_do_not_lock_the_breaker(self):
+        guard = ProviderGuard()
+
+        async def ok():
+            return "ok"
+
+        async def cancel_trial():
+            task = asyncio.ensure_future(guard.run("slow", lambda: asyncio.sleep(10)))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        guard.record(False)
+        time.sleep(0.06)
+        async_to_sync(cancel_trial)()
+        self.assertEqual(guard.breaker.state, "open")
+
+        limiter, guard.limiter = guard.limiter, TokenBucket(rate=0.001, burst=0)
+        with self.assertRaises(RateLimitedError):
+            async_to_sync(guard.run)("limited", ok)
+        self.assertEqual(guard.breaker.state, "open")
+
+        guard.limiter = limiter
+        self.assertEqual(async_to_sync(guard.run)("trial", ok), "ok")
+        self.assertEqual(guard.breaker.state, "closed")
+
+    def test_token_bucket_spaces_out_calls(self):
+        bucket = TokenBucket(rate=20, burst=1)
+        started = time.perf_counter()
+        for _ in range(3):
+            async_to_sync(bucket.acquire)(max_wait=1)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.09)
+        self.assertEqual(bucket.stats()["waits"], 2)
+        with self.assertRaises(RateLimitedError):
+            async_to_sync(bucket.acquire)(max_wait=0)
+
+    @override_settings(GEMINI_API_KEY="")
+    def test_gemini_provider_requires_an_api_key(self):
+        with mock.patch.dict(llm._providers, clear=True):
+            with self.assertRaises(ImproperlyConfigured):
+                llm.get_provider("gemini")
+
+    def test_metrics_endpoint_is_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="owner", password="secret"))
+        self.assertEqual(client.get("/api/llm/metrics/").status_code, 403)
+        client.force_authenticate(User.objects.create_user(username="ops", password="secret", is_staff=True))
+        self.assertEqual(set(client.get("/api/llm/metrics/").json()), {"providers", "cache", "prompt_size"})
+
+
+class StartupImportTests(TestCase):
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        from core.management.commands.benchmark import STARTUP_SCRIPT
+
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout
+        _, loaded = json.loads(output.strip().splitlines()[-1])
+        self.assertEqual(loaded, [])
+
+
+class FinancialMetricsTests(TestCase):
+    def test_irr_matches_known_values(self):
+        rates = metrics.irr([[-100, 110], [-1000, 300, 400, 500], [-100, 0, 0, 0, 0, 0, 0, 0, 0, 0, 10000000]])
+        self.assertAlmostEqual(rates[0], 0.10, places=10)
+        self.assertAlmostEqual(rates[1], 0.0889633947, places=8)
+        self.assertAlmostEqual(rates[2], 10 ** 0.5 - 1, places=8)
+
+    def test_irr_zeroes_npv_for_many_deals(self):
+        rng = np.random.default_rng(1)
+        flows = np.column_stack([-rng.uniform(1e5, 1e6, 2000), rng.uniform(1e4, 2e5, (2000, 10))])
+        rates = metrics.irr(flows)
+        self.assertTrue(np.isfinite(rates).all())
+        np.testing.assert_allclose(metrics.npv(rates, flows), 0, atol=1e-4)
+
+    def test_irr_is_nan_without_sign_change_and_handles_ragged_rows(self):
+        rates = metrics.irr([[100, 100], [-100, 110], [-5], []])
+        self.assertTrue(math.isnan(rates[0]))
+        self.assertAlmostEqual(rates[1], 0.10)
+        self.assertTrue(math.isnan(rates[2]) and math.isnan(rates[3]))
+
+    def test_ratios_are_nan_for_zero_denominators(self):
+        result = metrics.deal_metrics(
+            noi=[75000, 1], purchase_price=[1000000, 0],
+            annual_cash_flow=[20000, 1], cash_invested=[250000, 0],
+            cash_flows=[[-100, 110], [-100, 110]],
+        )
+        self.assertEqual(result["cap_rate"][0], 0.075)
+        self.assertEqual(result["cash_on_cash"][0], 0.08)
+        self.assertTrue(math.isnan(result["cap_rate"][1]) and math.isnan(result["cash_on_cash"][1]))
+        self.assertAlmostEqual(result["npv"][0], -100 + 110 / 1.08)
+
+    def test_calculate_irr_no_longer_returns_none(self):
+        self.assertEqual(calculate_irr([-250000, 20000, 22000, 25000, 800000]), 0.3891)
+        self.assertIsNone(calculate_irr([]))
+        self.assertIsNone(calculate_irr([100, 100]))
+
+
+class SimulationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.deal = create_deals(self.user, 1, analyzed=False)[0]
+        self.deal.fetched_data = {"purchase_price": 1000000, "noi": 75000}
+        self.deal.save()
+
+    def simulate(self, payload):
+        return self.client.post(f"/api/deals/{self.deal.pk}/simulate/", payload, format="json")
+
+    def test_returns_percentiles_and_histograms_quickly(self):
+        started = time.perf_counter()
+        response = self.simulate({"scenarios": 100000, "seed": 7})
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(response.status_code, 200)
+        irr = response.json()["metrics"]["irr"]
+        percentiles = list(irr["percentiles"].values())
+        self.assertEqual(percentiles, sorted(percentiles))
+        self.assertEqual(sum(irr["histogram"]["counts"]) + irr["undefined"], 100000)
+        self.assertEqual(len(irr["histogram"]["edges"]), len(irr["histogram"]["counts"]) + 1)
+
+    def test_fixed_assumptions_match_a_single_projection(self):
+        response = self.simulate({
+            "scenarios": 100, "years": 1, "rent_growth": [0, 0], "vacancy": [0, 0],
+            "expense_inflation": [0, 0], "exit_cap_rate": [0.075, 0.075],
+        })
+        cap_rate = response.json()["metrics"]["cap_rate"]
+        self.assertEqual(cap_rate["percentiles"]["p5"], cap_rate["percentiles"]["p95"])
+        self.assertEqual(cap_rate["mean"], 0.075)
+        # One year at 75% LTV, 6.5% over 30 years: -250000 equity, then the NOI less
+        # debt service plus a 2% cost sale at the purchase price, less the loan balance
+        loan, rate = 750000, 0.065 / 12
+        payment = loan * rate / (1 - (1 + rate) ** -360)
+        balance = loan * (1 + rate) ** 12 - payment * ((1 + rate) ** 12 - 1) / rate
+        expected_irr = (75000 - 12 * payment + 1000000 * 0.98 - balance) / 250000 - 1
+        self.assertAlmostEqual(response.json()["metrics"]["irr"]["mean"], expected_irr, places=4)
+
+    def test_deals_are_simulated_on_their_own_inputs(self):
+        cheap = Deal.objects.create(
+            user=self.user, address="2 Main St", asking_price=None,
+            fetched_data={"price": 400000, "rent": 4000, "cap_rate": 0.05},
+        )
+        pricey = Deal.objects.create(user=self.user, address="3 Main St", asking_price=900000, fetched_data={"rent": 4000})
+        self.assertEqual(
+            {key: base_analysis_input(cheap)[key] for key in ("purchase_price", "noi")},
+            {"purchase_price": 400000, "noi": 28800},
+        )
+        results = [
+            self.client.post(f"/api/deals/{deal.pk}/simulate/", {"scenarios": 1000, "seed": 3}, format="json").json()
+            for deal in (cheap, pricey)
+        ]
+        self.assertNotEqual(results[0]["metrics"], results[1]["metrics"])
+        self.assertGreater(
+            results[0]["metrics"]["irr"]["percentiles"]["p50"], results[1]["metrics"]["irr"]["percentiles"]["p50"],
+        )
+
+    def test_seed_makes_results_repeatable(self):
+        first = self.simulate({"scenarios": 1000, "seed": 3}).json()
+        self.assertEqual(first, self.simulate({"scenarios": 1000, "seed": 3}).json())
+
+    def test_invalid_ranges_are_rejected(self):
+        response = self.simulate({"vacancy": [0.2, 0.1], "exit_cap_rate": [0, 0.05], "scenarios": 10 ** 7})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {"vacancy", "exit_cap_rate", "scenarios"})
+
+
+class UnderwritingTests(TestCase):
+    def setUp(self):
+        underwrite.clear_cache()
+
+    def test_amortization_matches_monthly_schedule(self):
+        debt_service, balance, interest, principal = underwrite.amortization(np.array([750000.0]), 0.065, 30, 5)
+        owed, rate = 750000.0, 0.065 / 12
+        payment = owed * rate / (1 - (1 + rate) ** -360)
+        for year in range(5):
+            paid_interest = 0.0
+            for _ in range(12):
+                paid_interest += owed * rate
+                owed = owed * (1 + rate) - payment
+            self.assertAlmostEqual(balance[0, year], owed, places=4)
+            self.assertAlmostEqual(interest[0, year], paid_interest, places=4)
+        self.assertAlmostEqual(debt_service[0], 12 * payment, places=6)
+        np.testing.assert_allclose(interest + principal, 12 * payment)
+
+    def test_cash_flows_add_up(self):
+        projection = underwrite.project_deal({"purchase_price": 1000000, "noi": 75000})
+        self.assertEqual(projection["equity"], 250000)
+        self.assertEqual(len(projection["cash_flows"]), 6)
+        self.assertAlmostEqual(
+            projection["cash_flows"][-1], projection["cash_flow"][-1] + projection["sale_proceeds"], places=1,
+        )
+        self.assertAlmostEqual(projection["cash_on_cash"], round(projection["cash_flow"][0] / 250000, 4))
+        self.assertAlmostEqual(projection["irr"], calculate_irr(projection["cash_flows"]), places=3)
+
+    def test_vectorized_projection_matches_single_deals(self):
+        deals = [
+            {"purchase_price": 500000, "noi": 40000},
+            {"purchase_price": 2000000, "noi": 110000, "ltv": 0.6, "exit_cap_rate": 0.06},
+            {"purchase_price": 900000, "noi": 70000, "hold_years": 10, "interest_rate": 0.0},
+        ]
+        together = underwrite.project_deals(deals)
+        for inputs, row in zip(deals, together):
+            underwrite.clear_cache()
+            self.assertEqual(underwrite.project_deal(inputs), row)
+
+    def test_projection_is_memoized_on_inputs(self):
+        inputs = {"purchase_price": 1000000, "noi": 75000}
+        with mock.patch.object(underwrite, "project", wraps=underwrite.project) as project:
+            first = underwrite.project_deal(inputs)
+            self.assertIs(underwrite.project_deal(dict(inputs)), first)
+            underwrite.project_deal({**inputs, "ltv": 0.5})
+        self.assertEqual(project.call_count, 2)
+
+    def test_zero_price_or_equity_give_undefined_returns(self):
+        rows = underwrite.project_deals([
+            {"purchase_price": 0, "noi": 75000},
+            {"purchase_price": 1000000, "noi": 75000, "ltv": 1.0},
+            {"purchase_price": 500000, "noi": 40000, "exit_cap_rate": 0.07},
+        ])
+        self.assertEqual((rows[0]["cap_rate"], rows[0]["irr"]), (None, None))
+        self.assertEqual((rows[1]["cash_on_cash"], rows[1]["irr"], rows[1]["equity_multiple"]), (None, None, None))
+        self.assertEqual(rows[1]["cap_rate"], 0.075)
+        self.assertIsNotNone(rows[2]["irr"])
+
+    def test_analysis_without_price_or_equity_is_saved(self):
+        user = User.objects.create_user(username="owner", password="secret")
+        for deal, extra in zip(create_deals(user, 2, analyzed=False), ({"purchase_price": 0}, {"ltv": 1.0})):
+            analysis_input = {**ANALYSIS_INPUT, **extra}
+            result = run_full_analysis(analysis_input, provider=FakeLLMProvider())
+            stored = save_analysis_result(deal, analysis_input, result)
+            stored.refresh_from_db()
+            self.assertIsNone(stored.cash_on_cash)
+            self.assertFalse(stored.pass_status)
+
+    def test_underwriting_projects_from_the_asking_price(self):
+        user = User.objects.create_user(username="owner", password="secret")
+        deal = Deal.objects.create(user=user, address="1 Main St", asking_price=500000)
+        self.assertEqual(underwrite.run_underwriting_logic(deal)["cap_rate"], 0.15)
+
+    def test_analysis_stores_projected_returns(self):
+        summary = run_full_analysis(ANALYSIS_INPUT, provider=FakeLLMProvider())["summary"]
+        projection = underwrite.project_deal(underwrite.deal_inputs(ANALYSIS_INPUT))
+        self.assertEqual(summary["irr"], projection["irr"])
+        self.assertEqual(summary["cash_on_cash"], projection["cash_on_cash"])
+        self.assertIsNotNone(summary["irr"])
+
+
+class FilterExecutionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(6):
+            Deal.objects.create(
+                user=self.user, address=f"{i} Main St", asking_price=200000 + i * 50000,
+                fetched_data={"cap_rate": 0.04 + i * 0.01, "year_built": 1990 + i * 5, "price": f"${300 + i},000"},
+            )
+
+    def test_save_copies_fetched_data_into_typed_columns(self):
+        deal = Deal.objects.get(address="0 Main St")
+        self.assertEqual((deal.price, deal.year_built, deal.cap_rate, deal.rent), (300000, 1990, 0.04, None))
+        deal.fetched_data = {"rent": "2,400", "sqft": 1500}
+        deal.save(update_fields=["fetched_data"])
+        deal.refresh_from_db()
+        self.assertEqual((deal.rent, deal.sqft, deal.price), (2400, 1500, None))
+
+    def test_percent_cap_rates_are_stored_as_fractions(self):
+        resync = importlib.import_module("core.migrations.0017_resync_percent_property_columns").resync_property_columns
+        deal = Deal.objects.get(address="0 Main St")
+        deal.fetched_data = {"cap_rate": "6.5%", "sqft": True}
+        deal.save()
+        deal.refresh_from_db()
+        self.assertEqual((deal.cap_rate, deal.sqft), (0.065, None))
+
+        Deal.objects.filter(pk=deal.pk).update(cap_rate=6.5, sqft=1)
+        resync(apps, None)
+        deal.refresh_from_db()
+        self.assertEqual((deal.cap_rate, deal.sqft), (0.065, None))
+
+    def test_filter_deals_runs_in_sql_with_pagination(self):
+        setting = FilterSetting.objects.create(user=self.user, min_cap_rate=0.05, max_price=400000, year_built_min=1995)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(f"/api/filters/{setting.pk}/deals/?page_size=2").json()
+        self.assertEqual([deal["address"] for deal in data["results"]], ["4 Main St", "3 Main St"])
+        deal_queries = [q["sql"] for q in queries.captured_queries if 'FROM "core_deal"' in q["sql"]]
+        self.assertEqual(len(deal_queries), 1)
+        self.assertNotIn("fetched_data", deal_queries[0].split("WHERE")[1])
+        rest = self.client.get(data["next"]).json()
+        self.assertEqual([deal["address"] for deal in rest["results"]], ["2 Main St", "1 Main St"])
+        self.assertIsNone(rest["next"])
+
+    def test_other_users_filter_is_not_found(self):
+        setting = FilterSetting.objects.create(user=User.objects.create_user(username="other", password="secret"))
+        self.assertEqual(self.client.get(f"/api/filters/{setting.pk}/deals/").status_code, 404)
+
+    def test_backfill_migration_fills_columns(self):
+        backfill = importlib.import_module("core.migrations.0008_deal_property_columns").backfill_property_columns
+
+        Deal.objects.update(price=None, cap_rate=None, year_built=None)
+        backfill(apps, None)
+        self.assertEqual(Deal.objects.filter(cap_rate__gte=0.065).count(), 3)
+        self.assertEqual(Deal.objects.get(address="5 Main St").price, 305000)
+
+
+@override_settings(LLM_PROVIDER="fake")
+class FilterMatchTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.setting = FilterSetting.objects.create(user=self.user, min_cap_rate=0.06, max_price=400000)
+        self.deal = Deal.objects.create(
+            user=self.user, address="1 Main St", asking_price=300000, fetched_data={"cap_rate": 0.07},
+        )
+
+    def matched(self, setting=None):
+        return set((setting or self.setting).matches.values_list("deal__address", flat=True))
+
+    def test_saving_a_deal_updates_its_matches(self):
+        self.assertEqual(self.matched(), {"1 Main St"})
+        self.deal.asking_price = 450000
+        self.deal.save()
+        self.assertEqual(self.matched(), set())
+        self.deal.asking_price = 350000
+        self.deal.save()
+        self.assertEqual(self.matched(), {"1 Main St"})
+
+    def test_saving_a_filter_rebuilds_its_matches(self):
+        Deal.objects.create(user=self.user, address="2 Main St", asking_price=500000, fetched_data={"cap_rate": 0.08})
+        self.setting.max_price = None
+        self.setting.save()
+        self.assertEqual(self.matched(), {"1 Main St", "2 Main St"})
+        other = FilterSetting.objects.create(user=User.objects.create_user(username="other", password="secret"))
+        self.assertEqual(self.matched(other), set())
+
+    def test_deletes_cascade(self):
+        self.deal.delete()
+        self.assertFalse(FilterMatch.objects.exists())
+
+    def test_bulk_import_and_enrichment_update_matches(self):
+        self.client.post(
+            "/api/deals/import/",
+            {"file": SimpleUploadedFile("deals.csv", b"address,asking_price\n9 Oak Ave,250000\n")},
+            format="multipart",
+        )
+        imported = Deal.objects.get(address="9 Oak Ave")
+        self.assertEqual(self.matched(), {"1 Main St"})  # no cap rate yet
+        provider = FakeLLMProvider(response=json.dumps({"cap_rate": 0.065}))
+        with mock.patch.object(llm, "get_provider", return_value=provider):
+            run_next_job()
+        imported.refresh_from_db()
+        self.assertEqual(imported.cap_rate, 0.065)
+        self.assertEqual(self.matched(), {"1 Main St", "9 Oak Ave"})
+
+    def test_list_reports_match_counts(self):
+        data = self.client.get("/api/filters/").json()
+        self.assertEqual(data[0]["match_count"], 1)
+
+    def test_populate_migration_fills_matches(self):
+        populate = importlib.import_module("core.migrations.0009_filtermatch").populate_filter_matches
+
+        FilterMatch.objects.all().delete()
+        populate(apps, None)
+        self.assertEqual(self.matched(), {"1 Main St"})
+
+
+class DealSearchTests(TestCase):
+    def setUp(self):
+        clear_indexes()
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for address, city in [("1234 Main St", "Austin"), ("12 Maple Ave", "Dallas"), ("88 Oak Rd", "Springfield")]:
+            Deal.objects.create(user=self.user, address=address, city=city, state="TX", zip_code="78701")
+        other = User.objects.create_user(username="other", password="secret")
+        Deal.objects.create(user=other, address="1234 Main St", city="Austin")
+
+    def search(self, q, **params):
+        response = self.client.get("/api/deals/search/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [deal["address"] for deal in response.json()]
+
+    def test_prefix_matches_rank_first(self):
+        self.assertEqual(self.search("12"), ["12 Maple Ave", "1234 Main St"])  # ties: newest first
+        self.assertEqual(self.search("1234 ma")[0], "1234 Main St")
+        self.assertEqual(self.search("springf"), ["88 Oak Rd"])
+
+    def test_sql_ranks_prefix_and_word_matches_like_the_index(self):
+        def ranks(query):
+            deals = Deal.objects.filter(user=self.user).annotate(rank=match_rank(query)).filter(rank__gt=0)
+            return dict(deals.values_list("address", "rank"))
+
+        self.assertEqual(ranks("12"), {"1234 Main St": 2, "12 Maple Ave": 2})
+        self.assertEqual(ranks("main st"), {"1234 Main St": 1})
+        self.assertEqual(ranks("springf"), {"88 Oak Rd": 1})
+        self.assertEqual(ranks("ain"), {})
+
+    def test_index_is_built_outside_the_lock(self):
+        lock_held = []
+
+        def build(items):
+            lock_held.append(search._indexes_lock.locked())
+            return NgramIndex(items)
+
+        with mock.patch("core.utils.search.NgramIndex", side_effect=build):
+            index = get_index(self.user.pk)
+        self.assertEqual((lock_held, len(index)), ([False], 3))
+        self.assertIs(get_index(self.user.pk), index)
+
+    def test_typos_still_match(self):
+        self.assertEqual(self.search("mapel ave")[0], "12 Maple Ave")
+        self.assertEqual(self.search("oak rd sprngfield"), ["88 Oak Rd"])
+        self.assertEqual(self.search("zzz"), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.search("main")  # builds the index
+        deal = Deal.objects.get(user=self.user, address="88 Oak Rd")
+        deal.address = "7 Harbor Way"
+        deal.save()
+        self.assertEqual(self.search("harbor"), ["7 Harbor Way"])
+        self.assertEqual(self.search("oak rd"), [])
+        deal.delete()
+        self.assertEqual(self.search("harbor"), [])
+        self.client.post(
+            "/api/deals/import/",
+            {"file": SimpleUploadedFile("deals.csv", b"address,city\n5 Harbor Ln,Austin\n")},
+            format="multipart",
+        )
+        self.assertEqual(self.search("harb"), ["5 Harbor Ln"])
+
+    def test_limit_is_validated(self):
+        self.assertEqual(len(self.search("tx", limit=2)), 2)
+        self.assertEqual(self.client.get("/api/deals/search/", {"q": "tx", "limit": 1000}).status_code, 400)
+
+    def test_index_scores_similarity(self):
+        index = NgramIndex([(1, "1234 main st"), (2, "99 elm st")])
+        self.assertEqual(index.search("1234 main st", 10, 0.5), [(1, 1.0)])
+        deal_id, score = index.search("1243 main st", 10, 0.5)[0]
+        self.assertEqual(deal_id, 1)
+        self.assertTrue(0.5 <= score < 1)
+
+
+class DashboardMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i, (cap_rate, passed) in enumerate([(0.05, False), (0.07, True), (0.09, True)]):
+            deal = Deal.objects.create(user=self.user, address=f"{i} Main St")
+            AnalysisResult.objects.create(deal=deal, cap_rate=cap_rate, cash_on_cash=0.1, pass_status=passed)
+        Deal.objects.create(user=self.user, address="not analyzed")
+        Deal.objects.create(user=User.objects.create_user(username="other", password="secret"), address="elsewhere")
+
+    def metrics(self):
+        return self.client.get("/api/dashboard/metrics/").json()
+
+    def test_one_query_then_cached(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.metrics()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(data, {"total_deals": 4, "average_cap_rate": 0.07, "pass_count": 2, "fail_count": 1})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.metrics(), data)
+
+    def test_changes_invalidate_the_cache(self):
+        self.metrics()
+        AnalysisResult.objects.filter(deal__address="0 Main St").get().delete()
+        self.assertEqual(self.metrics()["fail_count"], 0)
+        result = AnalysisResult.objects.get(deal__address="1 Main St")
+        result.pass_status = False
+        result.save()
+        self.assertEqual(self.metrics()["pass_count"], 1)
+        Deal.objects.get(address="not analyzed").delete()
+        self.assertEqual(self.metrics()["total_deals"], 3)
+        self.client.post(
+            "/api/deals/import/",
+            {"file": SimpleUploadedFile("deals.csv", b"address\n5 Harbor Ln\n")},
+            format="multipart",
+        )
+        self.assertEqual(self.metrics()["total_deals"], 4)
+
+    @override_settings(DASHBOARD_CACHE_TTL=3600, DASHBOARD_LOCAL_CACHE_TTL=30)
+    def test_per_process_cache_keeps_statistics_briefly(self):
+        # invalidations from job workers never reach an in-process cache
+        with mock.patch("core.utils.dashboard.cache.set") as cache_set:
+            self.metrics()
+        self.assertEqual(cache_set.call_args.args[2], 30)
+
+    def test_other_users_changes_keep_the_cache(self):
+        self.metrics()
+        Deal.objects.create(user=User.objects.get(username="other"), address="another")
+        with self.assertNumQueries(0):
+            self.metrics()
+
+
+class DailyRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i, (cap_rate, passed) in enumerate([(0.05, False), (0.07, True)]):
+            deal = Deal.objects.create(user=self.user, address=f"{i} Main St")
+            AnalysisResult.objects.create(deal=deal, cap_rate=cap_rate, cash_on_cash=0.1, pass_status=passed)
+        Deal.objects.create(user=self.user, address="not analyzed")
+
+    def rollups(self):
+        return list(DailyRollup.objects.order_by("user_id", "date").values(
+            "user_id", "date", "deals_added", "analyses", "passed", "cap_rate_sum", "cap_rate_count",
+        ))
+
+    def test_saves_update_todays_row(self):
+        today = timezone.localdate()
+        row = DailyRollup.objects.get(user=self.user, date=today)
+        self.assertEqual((row.deals_added, row.analyses, row.passed), (3, 2, 1))
+        self.assertAlmostEqual(row.cap_rate_sum, 0.12)
+        # Re-analysis replaces the counted values
+        AnalysisResult.objects.update_or_create(
+            deal=Deal.objects.get(address="0 Main St"), defaults={"cap_rate": 0.09, "cash_on_cash": 0.1, "pass_status": True},
+        )
+        row.refresh_from_db()
+        self.assertEqual((row.analyses, row.passed), (2, 2))
+        self.assertAlmostEqual(row.cap_rate_sum, 0.16)
+        Deal.objects.get(address="1 Main St").delete()
+        row.refresh_from_db()
+        self.assertEqual((row.deals_added, row.analyses, row.passed), (2, 1, 1))
+        self.assertAlmostEqual(row.cap_rate_sum, 0.09)
+
+    def test_analyses_without_a_cap_rate_do_not_lower_the_average(self):
+        deal = Deal.objects.create(user=self.user, address="2 Main St")
+        AnalysisResult.objects.create(deal=deal, cap_rate=None, cash_on_cash=None, pass_status=False)
+        row = DailyRollup.objects.get(user=self.user, date=timezone.localdate())
+        self.assertEqual((row.analyses, row.cap_rate_count), (3, 2))
+        today = self.client.get("/api/dashboard/trends/", {"days": 1}).json()[-1]
+        self.assertEqual(today["average_cap_rate"], 0.06)
+        incremental = self.rollups()
+        call_command("backfill_rollups", stdout=io.StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_backfill_matches_incremental_updates(self):
+        self.client.post(
+            "/api/deals/import/",
+            {"file": SimpleUploadedFile("deals.csv", b"address\n5 Harbor Ln\n6 Harbor Ln\n")},
+            format="multipart",
+        )
+        incremental = self.rollups()
+        DailyRollup.objects.all().delete()
+        call_command("backfill_rollups", "--chunk-size", "1", stdout=io.StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_trends_by_day_and_week(self):
+        AnalysisResult.objects.filter(deal__address="0 Main St").update(created_at=timezone.now() - timedelta(days=8))
+        Deal.objects.filter(address="0 Main St").update(created_at=timezone.now() - timedelta(days=8))
+        call_command("backfill_rollups", "--user", "owner", stdout=io.StringIO())
+
+        days = self.client.get("/api/dashboard/trends/", {"days": 10}).json()
+        self.assertEqual(len(days), 10)
+        self.assertEqual(days[-1], {
+            "period": timezone.localdate().isoformat(), "deals_added": 2, "analyses": 1,
+            "average_cap_rate": 0.07, "pass_rate": 1.0,
+        })
+        self.assertEqual((days[1]["deals_added"], days[1]["pass_rate"]), (1, 0.0))
+        self.assertIsNone(days[2]["average_cap_rate"])
+
+        weeks = self.client.get("/api/dashboard/trends/", {"days": 10, "period": "week"}).json()
+        self.assertTrue(all(date.fromisoformat(week["period"]).weekday() == 0 for week in weeks))
+        self.assertEqual(sum(week["deals_added"] for week in weeks), 3)
+        self.assertEqual(self.client.get("/api/dashboard/trends/", {"period": "month"}).status_code, 400)
+
+    def test_deleting_the_user_drops_its_rollups(self):
+        self.user.delete()
+        self.assertFalse(DailyRollup.objects.exists())
+
+
+class DashboardDistributionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(10):
+            deal = Deal.objects.create(
+                user=self.user, address=f"{i} Main St", asking_price=100000 * (i + 1),
+                fetched_data={"sqft": 1000, "price": 150000 * (i + 1) if i % 2 else None},
+            )
+            AnalysisResult.objects.create(
+                deal=deal, cap_rate=0.01 * (i + 1), cash_on_cash=0.1, risk_score="High" if i < 3 else "Low",
+            )
+        Deal.objects.create(user=self.user, address="no area", fetched_data={"sqft": 0})
+
+    def test_distributions_are_summarized(self):
+        data = self.client.get("/api/dashboard/distributions/").json()
+        self.assertEqual((data["deals"], data["analyses"]), (11, 10))
+        cap_rate = data["metrics"]["cap_rate"]
+        self.assertEqual(cap_rate["percentiles"]["p50"], 0.055)
+        self.assertEqual(sum(cap_rate["histogram"]["counts"]), 10)
+        self.assertEqual(cap_rate["undefined"], 1)
+        price_per_sqft = data["metrics"]["price_per_sqft"]
+        self.assertEqual(price_per_sqft["histogram"]["edges"][0], 100.0)  # asking price of deal 0
+        self.assertEqual(price_per_sqft["histogram"]["edges"][-1], 1500.0)  # market price of deal 9
+        self.assertEqual(data["risk_score"], {"High": 3, "Low": 7})
+
+    def test_cached_under_a_version_key(self):
+        first = self.client.get("/api/dashboard/distributions/").json()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/dashboard/distributions/").json(), first)
+        AnalysisResult.objects.filter(risk_score="High").first().delete()
+        self.assertEqual(self.client.get("/api/dashboard/distributions/").json()["risk_score"], {"High": 2, "Low": 7})
+
+    def test_changes_are_recomputed_before_the_next_read(self):
+        class InlineExecutor:
+            def submit(self, function, *args):
+                function(*args)
+
+        self.client.get("/api/dashboard/distributions/")
+        with mock.patch("core.utils.dashboard._refresher", InlineExecutor()), \
+                mock.patch("core.utils.dashboard.close_old_connections"):
+            with self.captureOnCommitCallbacks(execute=True):
+                AnalysisResult.objects.filter(risk_score="High").first().delete()
+        with self.assertNumQueries(0):
+            data = self.client.get("/api/dashboard/distributions/").json()
+        self.assertEqual(data["risk_score"], {"High": 2, "Low": 7})
+
+
+def sample_pdf(doc_type, pages):
+    from core.management.commands.benchmark import write_sample_pdf
+
+    buffer = io.BytesIO()
+    write_sample_pdf(buffer, doc_type, pages)
+    return buffer.getvalue()
+
+
+class ParseDocumentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.t12 = sample_pdf("t12", 3)
+        cls.rent_roll = sample_pdf("rent_roll", 2)
+
+    def test_t12_tables_span_every_page(self):
+        parsed = parse_document(SimpleUploadedFile("t12.pdf", self.t12))
+        self.assertEqual((parsed["pages"], parsed["doc_type"], parsed["detected_type"]), (3, "t12", "t12"))
+        self.assertEqual(len(parsed["tables"]), 1)
+        table = parsed["tables"][0]
+        self.assertEqual(table["pages"], [1, 3])
+        self.assertEqual(table["headers"][:2], ["item", "jan 2024"])
+        self.assertEqual(table["headers"][-1], "total")
+        self.assertEqual(len(table["rows"]), 3 * 36)
+        self.assertEqual(parsed["summary"]["periods"][0], "jan 2024")
+        self.assertGreater(parsed["summary"]["total_expense"], 0)
+
+    def test_rent_roll_is_detected_and_summarized(self):
+        parsed = parse_document(SimpleUploadedFile("roll.pdf", self.rent_roll))
+        self.assertEqual(parsed["detected_type"], "rent_roll")
+        self.assertEqual(
+            parsed["tables"][0]["headers"],
+            ["unit", "tenant", "sqft", "market rent", "actual rent", "status", "lease end"],
+        )
+        self.assertEqual(parsed["summary"]["units"], 2 * 36)
+        self.assertEqual(parsed["summary"]["vacant"], 6)
+
+    @override_settings(DOCUMENT_PARSE_CHUNK_PAGES=1)
+    def test_worker_pool_gives_the_same_tables(self):
+        self.addCleanup(shutdown_pool)
+        self.assertEqual(parse_pdf(self.t12, workers=2), parse_pdf(self.t12, workers=1))
+
+    @override_settings(DOCUMENT_PARSE_CHUNK_PAGES=1)
+    def test_workers_are_sent_a_path_not_the_bytes(self):
+        sources = []
+
+        class InlinePool:
+            def submit(self, function, source, *args):
+                sources.append(source)
+                future = Future()
+                future.set_result(function(source, *args))
+                return future
+
+        with mock.patch("core.utils.parse_document._get_pool", return_value=InlinePool()):
+            parsed = parse_pdf(self.t12, workers=2)
+        self.assertEqual(len(parsed["tables"][0]["rows"]), 3 * 36)
+        self.assertEqual(len(sources), 3)
+        self.assertEqual(len(set(sources)), 1)
+        self.assertIsInstance(sources[0], str)
+        self.assertFalse(os.path.exists(sources[0]))
+
+    def test_pools_of_other_sizes_are_left_running(self):
+        self.addCleanup(shutdown_pool)
+        pool = _get_pool(2)
+        self.assertIsNot(_get_pool(3), pool)
+        self.assertIs(_get_pool(2), pool)
+        self.assertEqual(pool.submit(abs, -1).result(), 1)
+
+    def test_rows_that_do_not_fit_the_header_are_kept_and_counted(self):
+        header = ["Unit", "Tenant", "Rent"]
+        table, = merge_tables([(0, [header, ["1", "Ann", "900"], ["2", "Vacant"], ["3", "Bo", "9", "50"]])])
+        self.assertEqual([row["unit"] for row in table["rows"]], ["1", "2", "3"])
+        self.assertEqual(table["rows"][1]["actual rent"], "")
+        self.assertEqual(table["irregular_rows"], 2)
+
+    def test_headers_are_normalized(self):
+        self.assertEqual(
+            normalize_headers(["Unit #", "Sq. Ft.", "Market\nRent", "", "Annual", "Jan", "Jan"]),
+            ["unit", "sqft", "market rent", "column 4", "total", "jan", "jan 2"],
+        )
+
+    def test_other_files_are_not_parsed(self):
+        parsed = parse_document(SimpleUploadedFile("notes.txt", b"hello"), "t12")
+        self.assertEqual((parsed["doc_type"], parsed["tables"]), ("t12", []))
+        self.assertIn("error", parsed)
+
+
+@override_settings(JOB_RUN_INLINE=True)
+class DocumentUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.t12 = sample_pdf("t12", 2)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.deal, self.other_deal = create_deals(self.user, 2, analyzed=False)
+
+    def upload(self, deal, doc_type="t12"):
+        return self.client.post(
+            f"/api/deals/{deal.pk}/documents/",
+            {"file": SimpleUploadedFile("t12.pdf", self.t12, content_type="application/pdf"), "doc_type": doc_type},
+            format="multipart",
+        )
+
+    def test_upload_parses_in_a_job_and_stores_the_tables(self):
+        response = self.upload(self.deal)
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data["job"]["status"], "done")
+        self.assertEqual(data["content_hash"], hashlib.sha256(self.t12).hexdigest())
+        self.assertEqual(data["parsed_data"]["detected_type"], "t12")
+        self.assertEqual(len(data["parsed_data"]["tables"][0]["rows"]), 2 * 36)
+
+    def test_same_contents_reuse_the_stored_parse(self):
+        first = self.upload(self.deal).json()
+        with mock.patch("core.utils.documents.parse_document", side_effect=AssertionError("parsed twice")):
+            second = self.upload(self.other_deal, doc_type="rent_roll").json()
+        self.assertNotIn("job", second)
+        self.assertEqual(second["parsed_data"]["tables"], first["parsed_data"]["tables"])
+        self.assertEqual(second["parsed_data"]["doc_type"], "rent_roll")
+        self.assertIn("units", second["parsed_data"]["summary"])
+
+    def test_parses_are_not_shared_between_users(self):
+        self.upload(self.deal)
+        other = User.objects.create_user(username="other", password="secret")
+        self.client.force_authenticate(other)
+        response = self.upload(create_deals(other, 1, analyzed=False)[0])
+        self.assertEqual(response.json()["job"]["status"], "done")
+
+    @override_settings(JOB_RUN_INLINE=False)
+    def test_analysis_runs_the_queued_parse_job_instead_of_parsing_again(self):
+        response = self.upload(self.deal).json()
+        self.assertIsNone(response["parsed_data"])
+        with mock.patch("core.utils.documents.parse_document", wraps=parse_document) as parse:
+            _, t12_rows, _ = load_analysis_inputs(self.deal)
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(len(t12_rows), 2 * 36)
+        job = BackgroundJob.objects.get(pk=response["job"]["id"])
+        self.assertEqual(job.status, "done")
+        self.assertIsNone(run_next_job())
+
+    def test_analysis_reads_the_stored_tables(self):
+        self.upload(self.deal)
+        with mock.patch("core.utils.documents.parse_document", side_effect=AssertionError("parsed again")):
+            _, t12_rows, rent_roll_rows = load_analysis_inputs(self.deal)
+        self.assertEqual(len(t12_rows), 2 * 36)
+        self.assertIsNone(rent_roll_rows)
+
+    def test_documents_without_stored_tables_are_parsed_once(self):
+        document = UploadedDocument.objects.create(
+            deal=self.deal, doc_type="t12", file=SimpleUploadedFile("old.pdf", self.t12),
+            parsed_data={"total_income": 120000},
+        )
+        _, t12_rows, _ = load_analysis_inputs(self.deal)
+        document.refresh_from_db()
+        self.assertEqual(len(t12_rows), 2 * 36)
+        self.assertEqual(document.content_hash, hashlib.sha256(self.t12).hexdigest())
+        self.assertEqual(len(document.parsed_data["tables"][0]["rows"]), 2 * 36)
@@ -1,12 +1,16 @@
 from django.urls import path
 from core.views.analusisResult import (
     DealAnalyzeAPIView,
+    DealAnalyzeStreamAPIView,
+    DealBatchAnalyzeAPIView,
     DealAnalysisResultAPIView,
     DealRecommendationsAPIView,
 )
 
 urlpatterns = [
+    path('deals/analyze-batch/', DealBatchAnalyzeAPIView.as_view(), name='deal-analyze-batch'),
     path('deals/<int:pk>/analyze/', DealAnalyzeAPIView.as_view(), name='deal-analyze'),
+    path('deals/<int:pk>/analyze/stream/', DealAnalyzeStreamAPIView.as_view(), name='deal-analyze-stream'),
     path('deals/<int:pk>/analysis/', DealAnalysisResultAPIView.as_view(), name='deal-analysis-result'),
     path('deals/<int:pk>/recommendations/', DealRecommendationsAPIView.as_view(), name='deal-recommendations'),
 ]
@@ -1,8 +1,15 @@
 from django.urls import path
-from core.views.deal import DealListCreateAPIView, DealDetailAPIView, DealFetchDataAPIView
+from core.views.deal import (
+    DealListCreateAPIView, DealDetailAPIView, DealEnrichmentAPIView, DealFetchDataAPIView, DealImportAPIView, DealSearchAPIView,
+    DealStreamAPIView,
+)
 
 urlpatterns = [
     path('deals/', DealListCreateAPIView.as_view(), name='deal-list-create'),
+    path('deals/import/', DealImportAPIView.as_view(), name='deal-import'),
+    path('deals/search/', DealSearchAPIView.as_view(), name='deal-search'),
+    path('deals/stream/', DealStreamAPIView.as_view(), name='deal-stream'),
     path('deals/<int:pk>/', DealDetailAPIView.as_view(), name='deal-detail'),
+    path('deals/<int:pk>/enrichment/', DealEnrichmentAPIView.as_view(), name='deal-enrichment'),
     path('deals/<int:pk>/fetch-data/', DealFetchDataAPIView.as_view(), name='deal-fetch-data'),
 ]
@@ -1,8 +1,9 @@
 
 from django.urls import path
-from core.views.filter import FilterListCreateAPIView, FilterDetailAPIView
+from core.views.filter import FilterListCreateAPIView, FilterDetailAPIView, FilterDealsAPIView
 
 urlpatterns = [
     path('filters/', FilterListCreateAPIView.as_view(), name='filter-list-create'),
     path('filters/<int:pk>/', FilterDetailAPIView.as_view(), name='filter-detail'),
+    path('filters/<int:pk>/deals/', FilterDealsAPIView.as_view(), name='filter-deals'),
 ]
@@ -0,0 +1,6 @@
+from django.urls import path
+from core.views.job import JobStatusAPIView
+
+urlpatterns = [
+    path('jobs/<int:pk>/', JobStatusAPIView.as_view(), name='job-status'),
+]
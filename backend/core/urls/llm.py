@@ -0,0 +1,6 @@
+from django.urls import path
+from core.views.llm import LLMMetricsAPIView
+
+urlpatterns = [
+    path('llm/metrics/', LLMMetricsAPIView.as_view(), name='llm-metrics'),
+]
@@ -0,0 +1,6 @@
+from django.urls import path
+from core.views.simulation import DealSimulateAPIView
+
+urlpatterns = [
+    path('deals/<int:pk>/simulate/', DealSimulateAPIView.as_view(), name='deal-simulate'),
+]
@@ -1,7 +1,11 @@
 from django.urls import path
-from core.views.stat import DashboardMetricsAPIView, DashboardRecentDealsAPIView
+from core.views.stat import (
+    DashboardDistributionsAPIView, DashboardMetricsAPIView, DashboardRecentDealsAPIView, DashboardTrendsAPIView,
+)
 
 urlpatterns = [
     path('dashboard/metrics/', DashboardMetricsAPIView.as_view(), name='dashboard-metrics'),
     path('dashboard/recent/', DashboardRecentDealsAPIView.as_view(), name='dashboard-recent'),
+    path('dashboard/distributions/', DashboardDistributionsAPIView.as_view(), name='dashboard-distributions'),
+    path('dashboard/trends/', DashboardTrendsAPIView.as_view(), name='dashboard-trends'),
 ]
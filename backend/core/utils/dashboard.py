@@ -0,0 +1,174 @@
+"""
+Dashboard statistics, cached per user.
+
+Cache keys embed a per-user version number. The signal handlers in
+core.signals, and code that writes deals in bulk, call
+invalidate_dashboard whenever one of the user's deals or analysis results
+changes; it bumps the version, so every cached statistic of the user is
+recomputed on next read. With the default in-process cache an invalidation
+only reaches the process that made the change, and changes made by job
+workers or `manage.py import_deals` never reach the web processes, so
+statistics are then only kept for DASHBOARD_LOCAL_CACHE_TTL seconds.
+Deployments should point CACHES at a shared backend.
+
+The distributions are the costly statistic, so once an invalidation of a
+user whose dashboard has been read commits, they are recomputed ahead of
+the next read by a background thread of the process (DASHBOARD_PRECOMPUTE).
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Avg, Count, Q
+
+from core.models import Deal
+
+logger = logging.getLogger(__name__)
+
+# Users whose distributions are waiting to be recomputed, so that a burst of
+# changes is recomputed once
+_refresh_pending = set()
+_refresh_lock = threading.Lock()
+_refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dashboard-refresh')
+
+
+def _version_key(user_id):
+    return f'dashboard:version:{user_id}'
+
+
+def dashboard_version(user_id):
+    """The current cache version of a user's dashboard."""
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Start past any version an evicted counter may have reached
+        version = time.time_ns()
+        cache.add(_version_key(user_id), version, None)
+        version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def invalidate_dashboard(user_id):
+    """Makes every cached dashboard statistic of a user stale."""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        return  # no version yet, so nothing cached under one either
+    if settings.DASHBOARD_PRECOMPUTE:
+        transaction.on_commit(partial(schedule_refresh, user_id))
+
+
+def schedule_refresh(user_id):
+    """Recomputes a user's distributions in the background, unless that is already waiting."""
+    with _refresh_lock:
+        if user_id in _refresh_pending:
+            return
+        _refresh_pending.add(user_id)
+    _refresher.submit(_refresh_distributions, user_id)
+
+
+def _refresh_distributions(user_id):
+    with _refresh_lock:
+        _refresh_pending.discard(user_id)
+    try:
+        key = _statistic_key('distributions', user_id)
+        cache.set(key, compute_distributions(User(pk=user_id)), cache_ttl())
+    except Exception:
+        logger.exception("Could not recompute the dashboard distributions of user %s", user_id)
+    finally:
+        close_old_connections()
+
+
+def cache_ttl():
+    """Seconds a statistic stays cached: short when the cache is private to this process."""
+    if isinstance(caches['default'], LocMemCache):
+        return min(settings.DASHBOARD_CACHE_TTL, settings.DASHBOARD_LOCAL_CACHE_TTL)
+    return settings.DASHBOARD_CACHE_TTL
+
+
+def _statistic_key(name, user_id):
+    return f'dashboard:{name}:{user_id}:{dashboard_version(user_id)}'
+
+
+def cached_statistic(name, user, compute):
+    """compute(user), served from the cache while the user's dashboard version is unchanged."""
+    key = _statistic_key(name, user.pk)
+    value = cache.get(key)
+    if value is None:
+        value = compute(user)
+        cache.set(key, value, cache_ttl())
+    return value
+
+
+def compute_dashboard_metrics(user):
+    """
+    Deal count, average cap rate and pass/fail counts of the user's
+    analyses, in a single conditional-aggregate query over deals joined
+    with their (one-to-one) analysis result.
+    """
+    totals = Deal.objects.filter(user=user).aggregate(
+        total_deals=Count('id'),
+        average_cap_rate=Avg('analysisresult__cap_rate'),
+        pass_count=Count('analysisresult', filter=Q(analysisresult__pass_status=True)),
+        fail_count=Count('analysisresult', filter=Q(analysisresult__pass_status=False)),
+    )
+    totals['average_cap_rate'] = round(totals['average_cap_rate'] or 0, 2)
+    return totals
+
+
+def dashboard_metrics(user):
+    return cached_statistic('metrics', user, compute_dashboard_metrics)
+
+
+def compute_distributions(user):
+    """
+    Histograms and percentiles (see core.utils.metrics.describe) of the cap
+    rate and cash-on-cash of the user's analyses and of the price per
+    square foot of their deals, plus the count of each risk score. One query
+    reads the columns of every deal joined with its analysis, straight from
+    the cursor; each column is then summarized in one NumPy pass.
+    """
+    from collections import Counter
+
+    import numpy as np
+
+    from core.utils import metrics
+
+    queryset = Deal.objects.filter(user=user).values_list(
+        'analysisresult__cap_rate', 'analysisresult__cash_on_cash', 'price', 'asking_price', 'sqft',
+        'analysisresult__risk_score',
+    )
+    # Plain rows straight from the cursor: these columns need no conversion
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    *numeric, risk_score = zip(*rows) if rows else ((),) * 6
+    cap_rate, cash_on_cash, price, asking_price, sqft = (np.array(column, dtype=float) for column in numeric)
+    risk_counts = Counter(risk_score)
+    risk_counts.pop(None, None)
+
+    # Market price when enrichment found one, else the asking price; None became NaN
+    price = np.where(np.isnan(price), asking_price, price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_per_sqft = np.where(sqft > 0, price / sqft, np.nan)
+    return {
+        'deals': len(cap_rate),
+        'analyses': int(np.isfinite(cap_rate).sum()),
+        'metrics': {
+            'cap_rate': metrics.describe(cap_rate),
+            'cash_on_cash': metrics.describe(cash_on_cash),
+            'price_per_sqft': metrics.describe(price_per_sqft),
+        },
+        'risk_score': dict(sorted(risk_counts.items())),
+    }
+
+
+def dashboard_distributions(user):
+    return cached_statistic('distributions', user, compute_distributions)
@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from core.models import Deal
+from core.serializers.deal import DealWriteSerializer
+from core.utils.dashboard import invalidate_dashboard
+from core.utils.filters import refresh_deal_matches
+from core.utils.jobs import enqueue
+from core.utils.rollup import record_deals
+from core.utils.search import index_deals
+
+# Rejected rows reported back in detail; the rest are only counted.
+MAX_REPORTED_ERRORS = 100
+# Longest JSON value read ahead for before the file is rejected as malformed.
+MAX_JSON_VALUE_SIZE = 1024 * 1024
+
+_JSON_SEPARATORS = ' \t\r\n,[]'
+
+
+def detect_format(filename):
+    """Guesses the import format from a file name: "json" for .json/.jsonl/.ndjson, else "csv"."""
+    if filename and filename.lower().rsplit('.', 1)[-1] in ('json', 'jsonl', 'ndjson'):
+        return 'json'
+    return 'csv'
+
+
+def iter_csv_rows(stream):
+    """
+    Yields the rows of a CSV file with a header line as dicts.
+    Blank cells are dropped so that model defaults apply to them.
+    """
+    for row in csv.DictReader(stream):
+        yield {key.strip(): value for key, value in row.items() if key and value not in (None, '')}
+
+
+def iter_json_rows(stream, chunk_size=64 * 1024):
+    """
+    Yields the values of a JSON array, or of a JSON Lines file, reading the
+    stream in chunks so that the whole file is never held in memory.
+    A value that still does not decode after MAX_JSON_VALUE_SIZE characters
+    raises ValueError rather than buffering the rest of the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos = '', 0
+
+    def fill():
+        nonlocal buffer, pos
+        chunk = stream.read(chunk_size)
+        buffer, pos = buffer[pos:] + chunk, 0
+        return bool(chunk)
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _JSON_SEPARATORS:
+            pos += 1
+        if pos == len(buffer):
+            if not fill():
+                return
+            continue
+        try:
+            value, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            # the value may continue in the next chunk
+            if len(buffer) - pos > MAX_JSON_VALUE_SIZE:
+                raise ValueError(f'{e.msg} (no value ends within {MAX_JSON_VALUE_SIZE} characters)') from e
+            if not fill():
+                raise
+            continue
+        yield value
+
+
+def iter_import_rows(file, file_format):
+    """Yields the raw rows of an uploaded binary file in the given format."""
+    stream = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        if file_format == 'json':
+            yield from iter_json_rows(stream)
+        else:
+            yield from iter_csv_rows(stream)
+    finally:
+        stream.detach()  # leave the underlying upload open for its owner
+
+
+def deal_key(address, city, state, zip_code):
+    """Normalized identity of a deal, used to detect duplicates."""
+    return tuple(' '.join(str(part or '').lower().split()) for part in (address, city, state, zip_code))
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_deals(user, rows, batch_size=None, enrichment_batch_size=None, wake_workers=True):
+    """
+    Validates rows with DealWriteSerializer and stores them for `user` with
+    bulk_create, batch_size deals at a time. Rows matching one of the user's
+    deals, or an earlier row, by address/city/state/zip are counted as
+    duplicates and skipped. Enrichment of the new deals is queued as
+    "enrichment_batch" jobs of enrichment_batch_size deals each; see
+    core.utils.jobs.enqueue for wake_workers.
+    Returns a report with accepted, rejected and duplicate counts, the
+    first rejected rows and their errors, and the number of queued jobs.
+    """
+    batch_size = batch_size or settings.DEAL_IMPORT_BATCH_SIZE
+    enrichment_batch_size = enrichment_batch_size or settings.ENRICHMENT_BATCH_SIZE
+
+    # The fields are built once and reused for every row.
+    validator = DealWriteSerializer()
+    seen = {
+        deal_key(*values)
+        for values in Deal.objects.filter(user=user).values_list('address', 'city', 'state', 'zip_code').iterator()
+    }
+    report = {'accepted': 0, 'rejected': 0, 'duplicates': 0, 'errors': [], 'enrichment_jobs': 0}
+
+    def reject(number, errors):
+        report['rejected'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': number, 'errors': errors})
+
+    def valid_deals():
+        for number, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                reject(number, {'non_field_errors': ['Expected an object.']})
+                continue
+            try:
+                data = validator.run_validation(row)
+            except serializers.ValidationError as e:
+                reject(number, e.detail)
+                continue
+            key = deal_key(data.get('address'), data.get('city'), data.get('state'), data.get('zip_code'))
+            if key in seen:
+                report['duplicates'] += 1
+                continue
+            seen.add(key)
+            deal = Deal(user=user, **data)
+            deal.sync_search_text()  # bulk_create does not call save()
+            yield deal
+
+    for batch in _batches(valid_deals(), batch_size):
+        with transaction.atomic():
+            created = Deal.objects.bulk_create(batch)
+            refresh_deal_matches(created, created=True)
+            index_deals(created)
+            record_deals(created)
+            for chunk in _batches((deal.pk for deal in created), enrichment_batch_size):
+                enqueue('enrichment_batch', user, payload={'deal_ids': chunk}, wake=wake_workers)
+                report['enrichment_jobs'] += 1
+        report['accepted'] += len(created)
+        invalidate_dashboard(user.pk)
+    return report
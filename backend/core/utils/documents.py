@@ -0,0 +1,124 @@
+"""
+Uploaded T12 and rent roll documents are parsed once.
+
+DocumentUploadAPIView hashes the file, and a document whose contents the
+same user uploaded and had parsed before gets a copy of that parse right away;
+otherwise a "document_parse" job runs core.utils.parse_document in the
+background and stores the result in UploadedDocument.parsed_data. Analysis
+then reads the stored tables through document_rows and never opens the PDF
+again, except for documents uploaded before parsing was stored.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+
+from core.models import BackgroundJob, UploadedDocument
+from core.utils.jobs import claim_job, run_job
+from core.utils.parse_document import parse_document, primary_rows, summarize_tables
+
+# Seconds between checks on a parse job another worker is running
+PARSE_JOB_POLL_INTERVAL = 0.5
+
+
+def content_hash(file):
+    """The SHA-256 hex digest of an uploaded file or FieldFile, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def is_parsed(document):
+    # Documents uploaded before real parsing hold placeholder figures without tables
+    return bool(document.parsed_data) and 'tables' in document.parsed_data
+
+
+def reuse_parse(document):
+    """
+    Copies the parse of an earlier document of the same user with the same
+    contents onto `document`, summarized for its own doc_type. Returns
+    whether one was found. Documents of other users are never reused, so
+    the response to an upload does not reveal what others uploaded.
+    """
+    if not document.content_hash:
+        return False
+    candidates = (
+        UploadedDocument.objects.filter(
+            content_hash=document.content_hash, deal__user_id=document.deal.user_id, parsed_data__has_key='tables',
+        )
+        .exclude(pk=document.pk)
+        .order_by('-uploaded_at')
+        .values_list('parsed_data', flat=True)
+    )
+    parsed = candidates.first()
+    if parsed is None:
+        return False
+    parsed = {**parsed, 'doc_type': document.doc_type}
+    if 'error' not in parsed:
+        parsed['summary'] = summarize_tables(parsed['tables'], document.doc_type)
+    document.parsed_data = parsed
+    document.save(update_fields=['parsed_data'])
+    return True
+
+
+def parse_uploaded_document(document):
+    """Parses a stored document, unless a document with the same contents already was, and saves the result."""
+    if not document.content_hash:
+        with document.file.open('rb'):
+            document.content_hash = content_hash(document.file)
+        document.save(update_fields=['content_hash'])
+    if reuse_parse(document):
+        return document.parsed_data
+    with document.file.open('rb'):
+        document.parsed_data = parse_document(document.file, document.doc_type)
+    document.save(update_fields=['parsed_data'])
+    return document.parsed_data
+
+
+def _pending_parse_job(document):
+    return (
+        BackgroundJob.objects.filter(
+            kind='document_parse', payload__document_id=document.pk,
+            status__in=[BackgroundJob.QUEUED, BackgroundJob.RUNNING],
+        )
+        .order_by('-created_at')
+        .first()
+    )
+
+
+def ensure_parsed(document):
+    """
+    Makes sure a document has been parsed. A queued "document_parse" job
+    for it is claimed and run here, and one a worker is running is waited
+    for (up to JOB_STALE_AFTER seconds), so the file is never parsed twice
+    at the same time. Without a job the document is parsed directly.
+    """
+    deadline = time.monotonic() + settings.JOB_STALE_AFTER
+    while not is_parsed(document):
+        job = _pending_parse_job(document)
+        if job is None or time.monotonic() > deadline:
+            parse_uploaded_document(document)
+            return
+        if job.status == BackgroundJob.QUEUED and claim_job(job.pk):
+            job.refresh_from_db()
+            run_job(job)
+        else:
+            time.sleep(PARSE_JOB_POLL_INTERVAL)
+        document.refresh_from_db(fields=['parsed_data', 'content_hash'])
+
+
+def document_rows(document):
+    """The rows of a document's primary table, parsing it first if that has not happened yet."""
+    if document is None:
+        return None
+    ensure_parsed(document)
+    return primary_rows(document.parsed_data['tables'])
+
+
+def run_document_parse_job(job):
+    """Job handler for kind "document_parse"; payload["document_id"] is the document to parse."""
+    document = UploadedDocument.objects.filter(pk=job.payload['document_id']).first()
+    if document is not None and not is_parsed(document):
+        parse_uploaded_document(document)
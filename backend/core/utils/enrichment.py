@@ -0,0 +1,121 @@
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync
+
+from core.models import Deal
+from core.utils import llm
+from core.utils.analysis import parse_json_object
+from core.utils.filters import refresh_deal_matches
+
+logger = logging.getLogger(__name__)
+
+
+def build_property_prompt(zip_code, street, city, state):
+    return f"""
+    You are a real estate assistant.
+
+    Generate realistic property data in JSON format for the property at:
+    Street Address: {street}
+    City: {city}
+    State: {state}
+    Zip Code: {zip_code}
+
+    Include the following fields:
+    - bedrooms (integer,  between 1 and 5)
+    - bathrooms (integer, between 1 and 4)
+    - sqft (integer)
+    - price (integer, USD)
+    - rent (integer, USD)
+    - cap_rate (float, between 0.01 and 0.12)
+    - year_built (integer)
+
+    Output JSON only, no explanation or formatting. Keep values realistic for that location. and ensure all fields are present. and please do not geneate the same response again.
+    """
+
+
+async def agenerate_property_data(zip_code, street, city, state, provider=None):
+    """
+    Asks the LLM for property facts (bedrooms, sqft, price, rent, ...) of an
+    address. Returns None when the model is unavailable or its answer is not
+    valid JSON.
+    """
+    prompt = build_property_prompt(zip_code=zip_code, street=street, city=city, state=state)
+    try:
+        text = await llm.generate(
+            prompt, provider=provider, validate=lambda text: parse_json_object(text) is not None,
+        )
+    except Exception as e:
+        logger.warning("Property data generation failed: %s", e)
+        return None
+    data = parse_json_object(text)
+    if data is None:
+        logger.warning("Property data generation failed: no JSON object in the response")
+    return data
+
+
+def generate_property_data(zip_code, street, city, state, provider=None):
+    return async_to_sync(agenerate_property_data)(zip_code, street, city, state, provider=provider)
+
+
+def _apply_property_data(deal, fetched_data):
+    if fetched_data:
+        deal.fetched_data = fetched_data
+        deal.enrichment_status = Deal.ENRICHMENT_DONE
+    else:
+        deal.enrichment_status = Deal.ENRICHMENT_FAILED
+
+
+def enrich_deal(deal):
+    """
+    Fills deal.fetched_data from the LLM and records the outcome in
+    deal.enrichment_status. Returns True when data was stored.
+    """
+    fetched_data = generate_property_data(
+        city=deal.city, state=deal.state, street=deal.address, zip_code=deal.zip_code,
+    )
+    _apply_property_data(deal, fetched_data)
+    deal.save(update_fields=['fetched_data', 'enrichment_status'])
+    return bool(fetched_data)
+
+
+def enrich_deals(deals, provider=None):
+    """
+    Enriches many deals at once: the LLM calls run concurrently (still
+    subject to the provider's rate limiter) and the results are written
+    back with a single bulk_update. Returns the number of deals enriched.
+    """
+    async def generate_all():
+        return await asyncio.gather(*(
+            agenerate_property_data(
+                city=deal.city, state=deal.state, street=deal.address, zip_code=deal.zip_code, provider=provider,
+            )
+            for deal in deals
+        ))
+
+    results = async_to_sync(generate_all)()
+    for deal, fetched_data in zip(deals, results):
+        _apply_property_data(deal, fetched_data)
+        deal.sync_property_columns()  # bulk_update does not call save()
+    Deal.objects.bulk_update(deals, ['fetched_data', 'enrichment_status', *Deal.PROPERTY_COLUMNS])
+    refresh_deal_matches(deals)
+    return sum(1 for fetched_data in results if fetched_data)
+
+
+def run_enrichment_job(job):
+    """Job handler for kind "enrichment"; the job fails when no data could be generated."""
+    if not enrich_deal(job.deal):
+        raise RuntimeError("Property data could not be generated")
+
+
+def run_enrichment_batch_job(job):
+    """
+    Job handler for kind "enrichment_batch"; payload["deal_ids"] lists the
+    deals to enrich. Deals that are no longer pending are skipped.
+    """
+    deals = list(Deal.objects.filter(
+        pk__in=job.payload['deal_ids'], enrichment_status=Deal.ENRICHMENT_PENDING,
+    ))
+    enriched = enrich_deals(deals)
+    if deals and not enriched:
+        raise RuntimeError(f"Property data could not be generated for any of {len(deals)} deals")
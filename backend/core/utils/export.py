@@ -1,12 +1,11 @@
 import os
-import pandas as pd
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
+
+# pandas and reportlab are imported inside the exporters: together they add
+# about half a second to process start-up and only the export views need them.
 
 def export_deals_to_excel(deals: list, excel_path: str = "deals.xlsx"):
+    import pandas as pd
+
     flat_data = []
     for deal in deals:
         result = deal.get("analysis_result", {})
@@ -38,6 +37,11 @@ def export_deals_to_excel(deals: list, excel_path: str = "deals.xlsx"):
     print(f"✅ Excel exported to: {excel_path}")
 
 def export_deals_to_pdf(deals: list, pdf_path: str):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
     flat_data = []
     for deal in deals:
         result = deal.get("analysis_result", {})
@@ -0,0 +1,90 @@
+from itertools import islice
+
+from django.db import transaction
+
+from core.models import FilterMatch, FilterSetting
+
+MATCH_BATCH_SIZE = 1000
+
+
+def apply_filter_setting(queryset, filter_setting):
+    """
+    Narrows a Deal queryset to the deals matching a saved FilterSetting.
+    Every condition is on an indexed column (see Deal.Meta.indexes), so the
+    result is a single indexed query.
+    """
+    if filter_setting.min_cap_rate:
+        queryset = queryset.filter(cap_rate__gte=filter_setting.min_cap_rate)
+    if filter_setting.max_price is not None:
+        queryset = queryset.filter(asking_price__lte=filter_setting.max_price)
+    if filter_setting.year_built_min is not None:
+        queryset = queryset.filter(year_built__gte=filter_setting.year_built_min)
+    return queryset
+
+
+def filter_matches(filter_setting, deal):
+    """
+    Whether a deal matches a saved filter; the in-memory twin of
+    apply_filter_setting, with SQL semantics for missing (NULL) values.
+    """
+    if filter_setting.min_cap_rate and not (
+        deal.cap_rate is not None and deal.cap_rate >= filter_setting.min_cap_rate
+    ):
+        return False
+    if filter_setting.max_price is not None and not (
+        deal.asking_price is not None and deal.asking_price <= filter_setting.max_price
+    ):
+        return False
+    if filter_setting.year_built_min is not None and not (
+        deal.year_built is not None and deal.year_built >= filter_setting.year_built_min
+    ):
+        return False
+    return True
+
+
+def matched_deals(queryset, filter_setting):
+    """
+    Narrows a Deal queryset to the deals in a filter's FilterMatch rows.
+    Costs O(matches), unlike apply_filter_setting which scans the portfolio.
+    """
+    return queryset.filter(filter_matches__filter_setting=filter_setting)
+
+
+def refresh_deal_matches(deals, created=False):
+    """
+    Re-checks changed deals against their users' saved filters and rewrites
+    their FilterMatch rows: one query for the filters, then at most one
+    delete and one insert. Pass created=True for new deals, which have no
+    rows to delete yet.
+    """
+    deals = [deal for deal in deals if deal.pk is not None]
+    if not deals:
+        return
+    filters = list(FilterSetting.objects.filter(user_id__in={deal.user_id for deal in deals}))
+    if not filters and created:
+        return
+    matches = [
+        FilterMatch(filter_setting=filter_setting, deal=deal)
+        for deal in deals
+        for filter_setting in filters
+        if filter_setting.user_id == deal.user_id and filter_matches(filter_setting, deal)
+    ]
+    with transaction.atomic():
+        if not created:
+            FilterMatch.objects.filter(deal__in=deals).delete()
+        FilterMatch.objects.bulk_create(matches, batch_size=MATCH_BATCH_SIZE, ignore_conflicts=created)
+
+
+def rebuild_filter_matches(filter_setting):
+    """Recomputes every FilterMatch row of one filter with a single indexed query."""
+    from core.models import Deal
+
+    deal_ids = apply_filter_setting(
+        Deal.objects.filter(user_id=filter_setting.user_id), filter_setting,
+    ).values_list('id', flat=True).iterator(chunk_size=MATCH_BATCH_SIZE)
+    with transaction.atomic():
+        FilterMatch.objects.filter(filter_setting=filter_setting).delete()
+        while batch := list(islice(deal_ids, MATCH_BATCH_SIZE)):
+            FilterMatch.objects.bulk_create(
+                [FilterMatch(filter_setting=filter_setting, deal_id=deal_id) for deal_id in batch]
+            )
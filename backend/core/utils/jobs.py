@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> dotted path of a handler taking the BackgroundJob
+JOB_HANDLERS = {
+    'analysis': 'core.utils.pipeline.run_analysis_job',
+    'document_parse': 'core.utils.documents.run_document_parse_job',
+    'enrichment': 'core.utils.enrichment.run_enrichment_job',
+    'enrichment_batch': 'core.utils.enrichment.run_enrichment_batch_job',
+}
+
+_recovery_lock = threading.Lock()
+_next_recovery = 0.0  # time.monotonic() of this process's next stale job check
+
+
+def enqueue(kind, user, deal=None, payload=None, wake=True):
+    """
+    Stores a queued job and wakes the worker pool once the surrounding
+    transaction commits. With settings.JOB_RUN_INLINE the job runs right
+    away in the calling thread instead. Short-lived processes such as
+    management commands pass wake=False and leave the job to
+    `manage.py run_workers` or a web process.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = BackgroundJob.objects.create(kind=kind, user=user, deal=deal, payload=payload)
+    if settings.JOB_RUN_INLINE:
+        if claim_job(job.pk):
+            job.refresh_from_db()
+            run_job(job)
+    elif wake:
+        transaction.on_commit(worker_pool.wake)
+    return job
+
+
+def claim_job(job_id):
+    """Atomically moves a queued job to running; False if another worker got it first."""
+    return BackgroundJob.objects.filter(pk=job_id, status=BackgroundJob.QUEUED).update(
+        status=BackgroundJob.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1,
+    ) == 1
+
+
+def recover_stale_jobs():
+    """
+    Jobs still running JOB_STALE_AFTER seconds after they started were
+    left behind by a worker that died: they are queued again, or failed
+    once JOB_MAX_ATTEMPTS workers have claimed them. Returns how many
+    jobs were recovered.
+    """
+    stale = BackgroundJob.objects.filter(
+        status=BackgroundJob.RUNNING,
+        started_at__lt=timezone.now() - timedelta(seconds=settings.JOB_STALE_AFTER),
+    )
+    failed = stale.filter(attempts__gte=settings.JOB_MAX_ATTEMPTS).update(
+        status=BackgroundJob.FAILED, error="The worker running the job stopped before it finished",
+        finished_at=timezone.now(),
+    )
+    requeued = stale.update(status=BackgroundJob.QUEUED, started_at=None)
+    if failed or requeued:
+        logger.warning("Recovered %d stale jobs (%d failed, %d queued again)", failed + requeued, failed, requeued)
+    return failed + requeued
+
+
+def recover_stale_jobs_periodically():
+    """recover_stale_jobs, at most once every JOB_RECOVERY_INTERVAL seconds per process."""
+    global _next_recovery
+    with _recovery_lock:
+        now = time.monotonic()
+        if now < _next_recovery:
+            return 0
+        _next_recovery = now + settings.JOB_RECOVERY_INTERVAL
+    return recover_stale_jobs()
+
+
+def claim_next_job():
+    recover_stale_jobs_periodically()
+    while True:
+        job_id = (
+            BackgroundJob.objects
+            .filter(status=BackgroundJob.QUEUED)
+            .order_by('created_at')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        if claim_job(job_id):
+            return BackgroundJob.objects.select_related('deal').get(pk=job_id)
+
+
+def run_job(job):
+    handler = import_string(JOB_HANDLERS[job.kind])
+    try:
+        handler(job)
+        job.status = BackgroundJob.DONE
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        job.status = BackgroundJob.FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def run_next_job():
+    job = claim_next_job()
+    if job is not None:
+        run_job(job)
+    return job
+
+
+class WorkerPool:
+    """
+    Threads that drain the BackgroundJob table.
+    Started lazily by the first enqueue in a web process, or in the
+    foreground by `manage.py run_workers`. Idle workers poll every
+    JOB_POLL_INTERVAL seconds so jobs queued by other processes are
+    picked up too.
+    """
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self, size=None):
+        size = settings.JOB_WORKERS if size is None else size
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(size):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    @property
+    def size(self):
+        return len(self._threads)
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job = run_next_job()
+            except Exception:
+                logger.exception("Worker loop error")
+                job = None
+            finally:
+                close_old_connections()
+            if job is None:
+                self._wakeup.wait(settings.JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+
+
+worker_pool = WorkerPool()
@@ -0,0 +1,280 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from core.utils.llm_cache import cache_key, response_cache
+from core.utils.llm_guard import LLMUnavailableError, ProviderGuard
+
+
+class LLMTimeoutError(LLMUnavailableError):
+    """Raised when a provider does not answer within the configured timeout."""
+
+
+class LLMProvider:
+    """
+    Base class for text generation backends.
+    Subclasses implement `generate`, an async call that returns the raw
+    model text for a prompt.
+    Each provider instance owns a ProviderGuard (rate limiter, circuit
+    breaker and in-flight coalescing) that llm.generate and llm.stream_many
+    route its calls through.
+    """
+    name = "base"
+    _guard = None
+
+    @property
+    def guard(self):
+        if self._guard is None:
+            self._guard = ProviderGuard()
+        return self._guard
+
+    async def generate(self, prompt):
+        raise NotImplementedError
+
+    async def stream(self, prompt):
+        """
+        Yields the response in chunks as the model produces them.
+        Providers without incremental output yield it in one piece.
+        """
+        yield await self.generate(prompt)
+
+
+_gemini_lock = threading.Lock()
+_gemini_configured = False
+
+
+def _import_gemini():
+    """
+    Imports and configures the Gemini SDK on first use. The SDK pulls in
+    gRPC and protobuf, which would otherwise slow down every process start.
+    """
+    global _gemini_configured
+    import google.generativeai as genai
+
+    with _gemini_lock:
+        if not _gemini_configured:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            _gemini_configured = True
+    return genai
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Google Gemini backend.
+    The SDK call is blocking, so it runs in a worker thread; several calls
+    awaited together therefore overlap instead of running back to back.
+    """
+
+    def __init__(self, model_name):
+        if not settings.GEMINI_API_KEY:
+            raise ImproperlyConfigured("Set GEMINI_API_KEY to use the gemini provider, or LLM_PROVIDER=fake")
+        self.name = model_name
+        self.model = _import_gemini().GenerativeModel(model_name)
+
+    async def generate(self, prompt):
+        response = await asyncio.to_thread(self.model.generate_content, prompt)
+        return response.text
+
+    async def stream(self, prompt):
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:
+                pass  # the consumer's loop is gone, e.g. the client disconnected
+
+        def produce():
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    put(chunk.text)
+            except Exception as e:
+                put(e)
+            finally:
+                put(None)
+
+        threading.Thread(target=produce, name="gemini-stream", daemon=True).start()
+        while (item := await chunks.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+# Canned answer of the fake provider. It carries the keys every prompt in
+# the app asks for, so all the response parsers accept it.
+FAKE_RESPONSE = {
+    "risk_score": "Medium",
+    "explanation": "Generated offline by the fake LLM provider.",
+    "red_flags": [],
+    "recommendations": [
+        "Review operating expenses against market comparables",
+        "Benchmark rents against nearby units",
+        "Plan capital improvements for older systems",
+    ],
+    "bedrooms": 3,
+    "bathrooms": 2,
+    "sqft": 1500,
+    "price": 350000,
+    "rent": 2400,
+    "cap_rate": 0.065,
+    "year_built": 1998,
+}
+
+
+class FakeLLMProvider(LLMProvider):
+    """
+    Offline provider for tests and benchmarks.
+    Waits `latency` seconds, then returns `response` (a string, or a callable
+    taking the prompt) or FAKE_RESPONSE encoded as JSON. When streaming, the
+    text arrives in `chunks` pieces spread evenly over the latency.
+    """
+    name = "fake"
+
+    def __init__(self, latency=0.0, response=None, chunks=8):
+        self.latency = latency
+        self.response = response
+        self.chunks = chunks
+        self.calls = 0
+
+    def _text(self, prompt):
+        if callable(self.response):
+            return self.response(prompt)
+        if self.response is not None:
+            return self.response
+        return json.dumps(FAKE_RESPONSE)
+
+    async def generate(self, prompt):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._text(prompt)
+
+    async def stream(self, prompt):
+        self.calls += 1
+        text = self._text(prompt)
+        size = max(1, -(-len(text) // self.chunks))
+        for start in range(0, len(text), size):
+            if self.latency:
+                await asyncio.sleep(self.latency / self.chunks)
+            yield text[start:start + size]
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name=None):
+    """
+    Returns the shared provider selected by settings.LLM_PROVIDER
+    ("gemini" or "fake"), creating it on first use.
+    """
+    name = name or settings.LLM_PROVIDER
+    with _providers_lock:
+        if name not in _providers:
+            if name == "fake":
+                _providers[name] = FakeLLMProvider(latency=settings.LLM_FAKE_LATENCY)
+            elif name == "gemini":
+                _providers[name] = GeminiProvider(settings.LLM_MODEL)
+            else:
+                raise ValueError(f"Unknown LLM provider: {name}")
+        return _providers[name]
+
+
+async def generate(prompt, provider=None, timeout=None, use_cache=True, validate=None):
+    """
+    Runs one prompt through a provider, giving up after `timeout` seconds
+    (settings.LLM_TIMEOUT by default). Raises an LLMUnavailableError when
+    the call times out or is refused by the provider's guard.
+    Responses are cached by model and prompt, so a repeated prompt is
+    answered from core.utils.llm_cache without calling the provider. When
+    `validate` is given, only responses for which validate(text) is true
+    are cached, so a garbled or refused answer is asked again next time.
+    """
+    provider = provider or get_provider()
+    timeout = settings.LLM_TIMEOUT if timeout is None else timeout
+    if use_cache:
+        cached = await sync_to_async(response_cache.get)(provider.name, prompt)
+        if cached is not None:
+            return cached
+
+    async def call():
+        try:
+            return await asyncio.wait_for(provider.generate(prompt), timeout)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"{provider.name} did not respond within {timeout}s")
+
+    text = await provider.guard.run(cache_key(provider.name, prompt), call)
+    if use_cache and (validate is None or validate(text)):
+        await sync_to_async(response_cache.set)(provider.name, prompt, text)
+    return text
+
+
+async def stream_many(prompts, provider=None, timeout=None):
+    """
+    Streams several prompts concurrently and merges their output.
+    `prompts` maps a name to a prompt. Yields (name, kind, value) tuples in
+    arrival order, where kind is "token" (value is a text chunk), "error"
+    (value is the exception) or "done" (value is None, sent last per name).
+    Calls go through the provider's rate limiter and circuit breaker but
+    are not coalesced. The response cache is not consulted; callers decide
+    what to cache.
+    """
+    provider = provider or get_provider()
+    timeout = settings.LLM_TIMEOUT if timeout is None else timeout
+    events = asyncio.Queue()
+
+    async def pump(name, prompt):
+        try:
+            await provider.guard.enter()
+        except LLMUnavailableError as e:
+            await events.put((name, "error", e))
+            await events.put((name, "done", None))
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        chunks = provider.stream(prompt)
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                await events.put((name, "token", chunk))
+            provider.guard.record(True)
+        except asyncio.TimeoutError:
+            provider.guard.record(False)
+            await events.put((name, "error", LLMTimeoutError(f"{provider.name} did not respond within {timeout}s")))
+        except Exception as e:
+            provider.guard.record(False)
+            await events.put((name, "error", e))
+        except asyncio.CancelledError:
+            provider.guard.abandon()
+            raise
+        finally:
+            await chunks.aclose()
+        await events.put((name, "done", None))
+
+    tasks = [asyncio.create_task(pump(name, prompt)) for name, prompt in prompts.items()]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            event = await events.get()
+            if event[1] == "done":
+                remaining -= 1
+            yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def provider_stats():
+    """Guard metrics of every shared provider created so far."""
+    with _providers_lock:
+        providers = dict(_providers)
+    return {name: provider.guard.stats() for name, provider in providers.items()}
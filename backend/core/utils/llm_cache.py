@@ -0,0 +1,122 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import CachedLLMResponse
+
+
+def cache_key(model_name, prompt):
+    """Content address of a prompt: SHA-256 of the model name and prompt text."""
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of raw LLM responses.
+    An in-process LRU answers repeated prompts without a query; the
+    CachedLLMResponse table keeps answers across restarts and workers.
+    Entries expire after settings.LLM_CACHE_TTL seconds in both tiers.
+    """
+    prune_every = 100
+
+    def __init__(self):
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return settings.LLM_CACHE_ENABLED and settings.LLM_CACHE_TTL > 0
+
+    def get(self, model_name, prompt):
+        if not self.enabled:
+            return None
+        key = cache_key(model_name, prompt)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+
+        cutoff = timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL)
+        row = (
+            CachedLLMResponse.objects
+            .filter(key=key, created_at__gte=cutoff)
+            .values_list("response", "created_at")
+            .first()
+        )
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        response, created_at = row
+        remaining = settings.LLM_CACHE_TTL - (timezone.now() - created_at).total_seconds()
+        with self._lock:
+            self.db_hits += 1
+            self._remember(key, response, now + remaining)
+        return response
+
+    def set(self, model_name, prompt, response):
+        if not self.enabled:
+            return
+        key = cache_key(model_name, prompt)
+        with self._lock:
+            self._remember(key, response, time.monotonic() + settings.LLM_CACHE_TTL)
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        CachedLLMResponse.objects.update_or_create(
+            key=key,
+            defaults={"model_name": model_name, "response": response, "created_at": timezone.now()},
+        )
+        if prune:
+            self.prune()
+
+    def _remember(self, key, response, expires_at):
+        self._memory[key] = (expires_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > settings.LLM_CACHE_MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def prune(self):
+        """Drops expired rows and the oldest rows beyond LLM_CACHE_DB_ENTRIES."""
+        cutoff = timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL)
+        CachedLLMResponse.objects.filter(created_at__lt=cutoff).delete()
+        stale_ids = (
+            CachedLLMResponse.objects
+            .order_by("-created_at")
+            .values_list("id", flat=True)[settings.LLM_CACHE_DB_ENTRIES:]
+        )
+        CachedLLMResponse.objects.filter(id__in=list(stale_ids)).delete()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = self.db_hits = self.misses = 0
+        CachedLLMResponse.objects.all().delete()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            hits = self.memory_hits + self.db_hits
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+response_cache = LLMResponseCache()
@@ -0,0 +1,218 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from django.conf import settings
+
+
+class LLMUnavailableError(Exception):
+    """Base class for LLM calls that were not answered by the provider."""
+
+
+class RateLimitedError(LLMUnavailableError):
+    """Raised when a call would wait longer than LLM_RATE_LIMIT_MAX_WAIT for a token."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Allows `rate` calls per second on average with bursts of up to `burst`.
+    Thread-safe, so callers on different event loops share one budget.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.rejections = 0
+
+    def _reserve(self, max_wait):
+        """Takes a token, returning how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                self.rejections += 1
+                raise RateLimitedError(f"Rate limit of {self.rate}/s exceeded")
+            self._tokens -= 1
+            if wait:
+                self.waits += 1
+                self.waited_seconds += wait
+            return wait
+
+    async def acquire(self, max_wait):
+        wait = self._reserve(max_wait)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "waits": self.waits,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "rejections": self.rejections,
+            }
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds; then lets a single trial call through
+    (half-open) and closes again if it succeeds.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+        self.rejections = 0
+        self.times_opened = 0
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return
+            if self.state != self.CLOSED:
+                self.rejections += 1
+                raise CircuitOpenError("LLM provider is unavailable, failing fast")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def release_trial(self):
+        """Puts a half-open breaker back to open when its trial call never reached the provider."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                # _opened_at is unchanged, so the next call is admitted as the trial
+                self.state = self.OPEN
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejections": self.rejections,
+            }
+
+
+class ProviderGuard:
+    """
+    Protects one provider: identical in-flight prompts share a single call
+    (singleflight), calls are rate limited, and a circuit breaker stops
+    calling the provider while it keeps failing.
+    """
+
+    def __init__(self):
+        self.limiter = TokenBucket(settings.LLM_RATE_LIMIT, settings.LLM_RATE_BURST)
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_THRESHOLD, settings.LLM_BREAKER_RESET)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    async def enter(self):
+        """Admits one provider call: checks the breaker, then waits for a rate token."""
+        self.breaker.before_call()
+        try:
+            await self.limiter.acquire(settings.LLM_RATE_LIMIT_MAX_WAIT)
+        except BaseException:
+            # Rejected or cancelled while waiting: the provider was never called
+            self.breaker.release_trial()
+            raise
+        with self._lock:
+            self.calls += 1
+
+    def record(self, ok):
+        if ok:
+            self.breaker.record_success()
+            return
+        with self._lock:
+            self.failures += 1
+        self.breaker.record_failure()
+
+    def abandon(self):
+        """Records an admitted call that was cancelled before the provider answered."""
+        self.breaker.release_trial()
+
+    async def run(self, key, call):
+        """
+        Returns `await call()`, or the result of an identical in-flight call
+        with the same key. Followers on other threads or event loops wait on
+        a thread-safe future.
+        """
+        with self._lock:
+            shared = self._inflight.get(key)
+            leader = shared is None
+            if leader:
+                shared = self._inflight[key] = concurrent.futures.Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            # shield: a cancelled follower must not cancel the shared call
+            return await asyncio.shield(asyncio.wrap_future(shared))
+
+        try:
+            await self.enter()
+            try:
+                result = await call()
+            except Exception:
+                self.record(False)
+                raise
+            except BaseException:
+                self.abandon()
+                raise
+            self.record(True)
+            shared.set_result(result)
+            return result
+        except Exception as e:
+            if not shared.done():
+                shared.set_exception(e)
+            raise
+        except asyncio.CancelledError:
+            shared.set_exception(LLMUnavailableError("Coalesced LLM call was cancelled"))
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            counters = {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "failures": self.failures,
+                "in_flight": len(self._inflight),
+            }
+        return {**counters, "rate_limiter": self.limiter.stats(), "circuit_breaker": self.breaker.stats()}
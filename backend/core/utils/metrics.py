@@ -0,0 +1,170 @@
+"""
+Vectorized investment metrics.
+
+Every function takes NumPy arrays (or anything np.asarray accepts) and
+evaluates all deals in one call. Cash flows are a 2-D array with one row
+per deal and one column per period, period 0 being the initial investment;
+ragged lists are padded with zeros, which leaves NPV and IRR unchanged.
+"""
+import numpy as np
+
+# IRR search interval. Rates are expanded up to IRR_MAX_RATE for deals
+# whose NPV has not changed sign at the initial upper bound.
+IRR_LOWER_BOUND = -0.99
+IRR_UPPER_BOUND = 1.0
+IRR_MAX_RATE = 1e4
+
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+HISTOGRAM_BINS = 20
+
+
+def as_cash_flow_matrix(cash_flows):
+    """Returns cash flows as a float array of shape (deals, periods)."""
+    if isinstance(cash_flows, np.ndarray):
+        flows = cash_flows.astype(float, copy=False)
+    else:
+        rows = list(cash_flows)
+        if rows and not np.ndim(rows[0]):
+            rows = [rows]
+        width = max((len(row) for row in rows), default=0)
+        flows = np.zeros((len(rows), width))
+        for i, row in enumerate(rows):
+            flows[i, :len(row)] = row
+    if flows.ndim == 1:
+        flows = flows[np.newaxis, :]
+    return flows
+
+
+def npv(rate, cash_flows):
+    """
+    Net present value of each row of cash flows, discounted at `rate`
+    (a scalar or one rate per deal). Returns an array with one value per deal.
+    """
+    flows = as_cash_flow_matrix(cash_flows)
+    rate = np.asarray(rate, dtype=float).reshape(-1, 1)
+    periods = np.arange(flows.shape[1])
+    return (flows / (1 + rate) ** periods).sum(axis=1)
+
+
+def _npv_and_derivative(rate, flows):
+    """
+    NPV and its derivative with respect to the rate, per row. NPV is a
+    polynomial in v = 1 / (1 + rate), evaluated with Horner's scheme: one
+    pass over the periods instead of a (deals x periods) power table.
+    """
+    v = 1 / (1 + rate)
+    value = flows[:, -1].copy()
+    slope = np.zeros_like(value)
+    for column in range(flows.shape[1] - 2, -1, -1):
+        slope = slope * v + value
+        value = value * v + flows[:, column]
+    # d/drate = d/dv * dv/drate, with dv/drate = -v**2
+    return value, -slope * v * v
+
+
+def irr(cash_flows, tol=1e-10, max_iter=100):
+    """
+    Internal rate of return of each row of cash flows.
+
+    Newton's method on all rows at once, kept inside a per-row bracket
+    where NPV changes sign: a row whose Newton step leaves the bracket (or
+    whose derivative vanishes) takes a bisection step instead, so every
+    row converges. Rows without a sign change in
+    [IRR_LOWER_BOUND, IRR_MAX_RATE], i.e. without an IRR, and rows with
+    non-finite cash flows give NaN.
+    """
+    flows = as_cash_flow_matrix(cash_flows)
+    count, width = flows.shape
+    if not width:
+        return np.full(count, np.nan)
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        low = np.full(count, IRR_LOWER_BOUND)
+        high = np.full(count, IRR_UPPER_BOUND)
+        npv_low = _npv_and_derivative(low, flows)[0]
+        npv_high = _npv_and_derivative(high, flows)[0]
+        while True:
+            unbracketed = (np.sign(npv_low) == np.sign(npv_high)) & (high < IRR_MAX_RATE)
+            if not unbracketed.any():
+                break
+            high[unbracketed] *= 10
+            npv_high[unbracketed] = _npv_and_derivative(high[unbracketed], flows[unbracketed])[0]
+        solvable = (np.sign(npv_low) != np.sign(npv_high)) & np.isfinite(flows).all(axis=1)
+
+        rate = np.clip(np.full(count, 0.1), low, high)
+        # Only rows that have not converged yet are iterated on
+        active = np.flatnonzero(solvable)
+        for _ in range(max_iter):
+            if not active.size:
+                break
+            r, lo, hi, sign_low = rate[active], low[active], high[active], np.sign(npv_low[active])
+            value, slope = _npv_and_derivative(r, flows[active])
+            # Shrink the bracket around the root
+            same_side = np.sign(value) == sign_low
+            lo = np.where(same_side, r, lo)
+            hi = np.where(same_side, hi, r)
+            newton = r - value / slope
+            bisect = ~np.isfinite(newton) | (newton <= lo) | (newton >= hi)
+            step = np.where(bisect, (lo + hi) / 2, newton)
+            step = np.where(value == 0, r, step)
+            rate[active], low[active], high[active] = step, lo, hi
+            active = active[np.abs(step - r) > tol * (1 + np.abs(r))]
+    return np.where(solvable, rate, np.nan)
+
+
+def cap_rate(noi, purchase_price):
+    """NOI over purchase price; NaN where the price is not positive."""
+    noi = np.asarray(noi, dtype=float)
+    purchase_price = np.asarray(purchase_price, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(purchase_price > 0, noi / purchase_price, np.nan)
+
+
+def cash_on_cash(annual_cash_flow, cash_invested):
+    """Annual pre-tax cash flow over cash invested; NaN where nothing was invested."""
+    annual_cash_flow = np.asarray(annual_cash_flow, dtype=float)
+    cash_invested = np.asarray(cash_invested, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(cash_invested > 0, annual_cash_flow / cash_invested, np.nan)
+
+
+def deal_metrics(noi, purchase_price, annual_cash_flow, cash_invested, cash_flows, discount_rate=0.08):
+    """
+    Cap rate, cash-on-cash, IRR and NPV (at discount_rate) for many deals.
+    Each argument holds one value, or one row of cash flows, per deal.
+    Returns a dict of arrays.
+    """
+    flows = as_cash_flow_matrix(cash_flows)
+    return {
+        'cap_rate': cap_rate(noi, purchase_price),
+        'cash_on_cash': cash_on_cash(annual_cash_flow, cash_invested),
+        'irr': irr(flows),
+        'npv': npv(discount_rate, flows),
+    }
+
+
+def to_scalar(value, digits=4):
+    """Rounds a metric for storage, turning NaN into None."""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def describe(values, bins=HISTOGRAM_BINS):
+    """Percentiles, mean and a histogram of the finite values of an array."""
+    values = np.asarray(values, dtype=float)
+    finite = values[np.isfinite(values)]
+    if not finite.size:
+        return {'undefined': int(values.size)}
+    counts, edges = np.histogram(finite, bins=bins)
+    return {
+        'mean': round(float(finite.mean()), 4),
+        'std': round(float(finite.std()), 4),
+        'percentiles': {
+            f'p{p}': round(float(v), 4)
+            for p, v in zip(PERCENTILES, np.percentile(finite, PERCENTILES))
+        },
+        'histogram': {
+            'edges': [round(float(edge), 4) for edge in edges],
+            'counts': counts.tolist(),
+        },
+        'undefined': int(values.size - finite.size),
+    }
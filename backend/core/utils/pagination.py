@@ -0,0 +1,15 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class DealCursorPagination(CursorPagination):
+    """
+    Keyset pagination over a user's deals, newest first, with the id breaking
+    ties between deals created at the same time (bulk imports).
+    Relies on the (user, created_at, id) index on Deal so every page is an
+    index range scan, no matter how deep the cursor is.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = settings.DEAL_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.DEAL_MAX_PAGE_SIZE
@@ -1,19 +1,266 @@
+"""
+Table extraction from uploaded T12 and rent roll PDFs.
 
-def parse_document(file, doc_type):
-    """
-    Simulated parsing logic.
-    Real logic can use: PyPDF2, pandas, textract, etc.
-    """
-    if doc_type == 't12':
-        return {
-            "total_income": 120000,
-            "total_expense": 40000,
-            "net_operating_income": 80000
-        }
-    elif doc_type == 'rent_roll':
-        return {
-            "units": 10,
-            "avg_rent": 1200,
-            "occupancy_rate": 0.9
-        }
-    return {}
+parse_pdf() reads the tables of every page with pdfplumber. Documents
+longer than DOCUMENT_PARSE_CHUNK_PAGES pages are split into page ranges
+that are parsed in parallel by a pool of worker processes (table detection
+is CPU-bound, so threads would not help). Tables continuing over several
+pages, with or without a repeated header row, are stitched back together,
+and headers are normalized so that "Unit #", "Sq. Ft." or "YTD" read the
+same in every document. detect_document_type() then tells a T12 from a
+rent roll by the shape of its tables.
+
+pdfplumber is imported in the functions that use it; worker processes are
+started on first use and kept for later documents, in one pool per worker
+count.
+"""
+import io
+import math
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from core.utils.summarize import EXPENSE_WORDS, INCOME_WORDS, is_numeric_cell, summarize_rent_roll, summarize_t12
+
+T12 = 't12'
+RENT_ROLL = 'rent_roll'
+
+# Normalized header -> canonical name
+HEADER_ALIASES = {
+    'unit #': 'unit', 'unit no': 'unit', 'unit number': 'unit', 'apt': 'unit', 'apt #': 'unit', 'suite': 'unit',
+    'sq ft': 'sqft', 'sf': 'sqft', 'square feet': 'sqft', 'sq feet': 'sqft', 'size sf': 'sqft',
+    'tenant name': 'tenant', 'resident': 'tenant', 'resident name': 'tenant',
+    'unit status': 'status', 'occupancy': 'status',
+    'rent': 'actual rent', 'current rent': 'actual rent', 'contract rent': 'actual rent', 'lease rent': 'actual rent',
+    'description': 'item', 'account': 'item', 'account name': 'item', 'line item': 'item', 'category': 'item',
+    'ytd': 'total', 'annual': 'total', 'annual total': 'total', 'year total': 'total', 'total year': 'total',
+}
+MONTHS = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+RENT_ROLL_HEADERS = ('unit', 'tenant', 'lease', 'sqft', 'status', 'rent', 'deposit', 'move', 'bed', 'bath')
+
+_NON_HEADER = re.compile(r'[^0-9a-z%#/]+')
+
+_pools = {}  # worker count -> ProcessPoolExecutor
+_pool_lock = threading.Lock()
+
+
+def normalize_header(value):
+    """Lowercases a header cell, drops punctuation and line breaks, and applies HEADER_ALIASES."""
+    text = ' '.join(_NON_HEADER.sub(' ', str(value or '').lower()).split())
+    return HEADER_ALIASES.get(text, text)
+
+
+def normalize_headers(cells):
+    """Normalized headers of a table, with blank ones named "column N" and duplicates numbered."""
+    headers = []
+    for index, cell in enumerate(cells):
+        header = normalize_header(cell) or f'column {index + 1}'
+        name, count = header, 2
+        while name in headers:
+            name, count = f'{header} {count}', count + 1
+        headers.append(name)
+    return headers
+
+
+def _clean_cell(cell):
+    return ' '.join(str(cell).split()) if cell is not None else ''
+
+
+def _is_header_row(cells):
+    """A header row has text in at least half its cells and no plain numbers."""
+    filled = [cell for cell in cells if cell]
+    return len(filled) * 2 >= len(cells) and not any(is_numeric_cell(cell) for cell in filled)
+
+
+def _extract_page_range(source, start, stop):
+    """
+    Worker: the raw tables of pages [start, stop) as lists of rows of
+    cleaned cells. `source` is a file path or the PDF's bytes.
+    """
+    import pdfplumber
+
+    tables = []
+    with pdfplumber.open(source if isinstance(source, str) else io.BytesIO(source)) as pdf:
+        for number in range(start, stop):
+            page = pdf.pages[number]
+            for table in page.extract_tables():
+                rows = [[_clean_cell(cell) for cell in row] for row in table]
+                rows = [row for row in rows if any(row)]
+                if rows:
+                    tables.append((number, rows))
+            page.close()  # drop the page's cached layout objects
+    return tables
+
+
+def _page_count(source):
+    import pdfplumber
+
+    with pdfplumber.open(source if isinstance(source, str) else io.BytesIO(source)) as pdf:
+        return len(pdf.pages)
+
+
+def _get_pool(workers):
+    # Pools are never replaced: other threads may still wait on their futures
+    with _pool_lock:
+        if workers not in _pools:
+            # spawn: forking a threaded server process is unsafe
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pools[workers]
+
+
+def shutdown_pool():
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def extract_raw_tables(source, workers=None, chunk_pages=None):
+    """
+    The raw tables of every page, in page order, as (page index, rows)
+    pairs. Page ranges of chunk_pages pages are spread over `workers`
+    processes; small documents and workers=1 are parsed in this process.
+    """
+    workers = workers or settings.DOCUMENT_PARSE_WORKERS
+    chunk_pages = chunk_pages or settings.DOCUMENT_PARSE_CHUNK_PAGES
+    pages = _page_count(source)
+    if workers <= 1 or pages <= chunk_pages:
+        return pages, _extract_page_range(source, 0, pages)
+
+    chunk_pages = max(chunk_pages, math.ceil(pages / (workers * 4)))
+    starts = range(0, pages, chunk_pages)
+    path, temporary = source, None
+    if not isinstance(source, str):
+        # Workers get a path: the bytes would be pickled again for every chunk
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temporary:
+            temporary.write(source)
+        path = temporary.name
+    try:
+        pool = _get_pool(workers)
+        futures = [pool.submit(_extract_page_range, path, start, min(start + chunk_pages, pages)) for start in starts]
+        return pages, [table for future in futures for table in future.result()]
+    finally:
+        if temporary is not None:
+            os.remove(temporary.name)
+
+
+def merge_tables(raw_tables):
+    """
+    Turns raw tables into tables of row dicts keyed by normalized headers.
+    A table whose header repeats the previous table's, or which has no
+    header row but the same number of columns, continues that table
+    (typically onto the next page). Headerless tables with nothing to
+    continue are dropped. Rows with more or fewer cells than the header,
+    from merged or split cells, are cut or padded with blank cells to fit
+    and counted in the table's irregular_rows.
+    """
+    tables = []
+    current = None
+    for number, rows in raw_tables:
+        if _is_header_row(rows[0]):
+            headers = normalize_headers(rows[0])
+            body = rows[1:]
+            if current is None or headers != current['headers']:
+                current = {'headers': headers, 'rows': [], 'pages': [number + 1, number + 1], 'irregular_rows': 0}
+                tables.append(current)
+        elif current is not None and len(rows[0]) == len(current['headers']):
+            body = rows
+        else:
+            continue
+        current['pages'][1] = number + 1
+        headers = current['headers']
+        for row in body:
+            if len(row) != len(headers):
+                current['irregular_rows'] += 1
+                row = (row + [''] * len(headers))[:len(headers)]
+            current['rows'].append(dict(zip(headers, row)))
+    return [table for table in tables if table['rows']]
+
+
+def detect_document_type(tables):
+    """
+    T12, rent roll or None, scored on the headers of the tables: month
+    columns and income/expense line items point to a T12; unit, tenant,
+    lease and rent columns to a rent roll.
+    """
+    t12_score = rent_roll_score = 0
+    for table in tables:
+        headers = table['headers']
+        months = sum(header.startswith(MONTHS) for header in headers)
+        t12_score += 2 * months + ('total' in headers)
+        labels = [str(next(iter(row.values()), '')).lower() for row in table['rows'][:50]]
+        line_items = sum(any(word in label for word in INCOME_WORDS + EXPENSE_WORDS) for label in labels)
+        if labels and line_items * 3 >= len(labels):
+            t12_score += 3
+        rent_roll_score += sum(any(word in header for word in RENT_ROLL_HEADERS) for header in headers)
+    if max(t12_score, rent_roll_score) == 0:
+        return None
+    return T12 if t12_score > rent_roll_score else RENT_ROLL
+
+
+def primary_rows(tables):
+    """The rows of the tables that share the headers of the largest one."""
+    if not tables:
+        return []
+    headers = max(tables, key=lambda table: len(table['rows']))['headers']
+    return [row for table in tables if table['headers'] == headers for row in table['rows']]
+
+
+def parse_pdf(source, workers=None):
+    """
+    Parses every page of a PDF, given as a path or as bytes. Returns the
+    page count, the detected document type and the merged tables.
+    """
+    pages, raw_tables = extract_raw_tables(source, workers=workers)
+    tables = merge_tables(raw_tables)
+    return {'pages': pages, 'doc_type': detect_document_type(tables), 'tables': tables}
+
+
+def _pdf_source(file):
+    """A path or the bytes of an uploaded file, a FieldFile or a path; None when it is not a PDF."""
+    if isinstance(file, (str, os.PathLike)):
+        path = str(file)
+        return path if path.lower().endswith('.pdf') and os.path.exists(path) else None
+    if hasattr(file, 'temporary_file_path'):
+        path = file.temporary_file_path()
+        with open(path, 'rb') as handle:
+            return path if handle.read(5) == b'%PDF-' else None
+    file.seek(0)
+    data = file.read()
+    file.seek(0)
+    return data if data.startswith(b'%PDF-') else None
+
+
+def parse_document(file, doc_type=None):
+    """
+    Parses an uploaded T12 or rent roll. Returns the detected type, the
+    merged tables and a summary of the primary table (see
+    core.utils.summarize) for the given doc_type, or for the detected one
+    when doc_type is not given. Files that are not PDFs give an error entry.
+    """
+    source = _pdf_source(file)
+    if source is None:
+        return {'doc_type': doc_type, 'error': 'Only PDF documents can be parsed.', 'pages': 0, 'tables': []}
+    parsed = parse_pdf(source)
+    detected = parsed['doc_type']
+    doc_type = doc_type or detected
+    return {
+        **parsed, 'doc_type': doc_type, 'detected_type': detected,
+        'summary': summarize_tables(parsed['tables'], doc_type),
+    }
+
+
+def summarize_tables(tables, doc_type):
+    """The summary of the primary table of parsed tables as a T12 or rent roll; None for other types."""
+    rows = primary_rows(tables)
+    if doc_type == T12:
+        return summarize_t12(rows)
+    if doc_type == RENT_ROLL:
+        return summarize_rent_roll(rows)
+    return None
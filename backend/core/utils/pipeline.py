@@ -0,0 +1,221 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from django.db import connections
+
+from core.models import AnalysisResult, UploadedDocument
+from core.utils import llm
+from core.utils.analysis import (
+    build_insights_prompt,
+    is_valid_insights_response,
+    is_valid_risk_response,
+    parse_insights_response,
+    parse_risk_response,
+    prepare_risk_prompt,
+    run_full_analysis,
+    summarize_property,
+)
+from core.utils.documents import document_rows
+from core.utils.llm_cache import response_cache
+from core.utils.sse import iterate_sync
+
+# Fallbacks for anything missing from a deal's fetched_data
+DEFAULT_ANALYSIS_INPUT = {
+    "purchase_price": 1000000,
+    "noi": 75000,
+    "bedrooms": 3,
+    "bathrooms": 2,
+    "sqft": 1200,
+    "rent": 2500,
+    "year_built": 1995,
+    "crime_score": 5,
+    "area_income": 60000,
+}
+# Operating expenses over gross rent when NOI is estimated from the rent;
+# the same share as underwrite.DEFAULT_ASSUMPTIONS["expense_ratio"]
+RENT_EXPENSE_RATIO = 0.4
+
+
+class StageTimer:
+    """
+    Records how long each named stage of a pipeline takes, in seconds.
+    `on_stage(name, seconds)` is called as each stage finishes.
+    """
+
+    def __init__(self, on_stage=None):
+        self.timings = {}
+        self.on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        yield
+        self.timings[name] = round(time.perf_counter() - started, 4)
+        if self.on_stage:
+            self.on_stage(name, self.timings[name])
+
+
+def base_analysis_input(deal):
+    """
+    The deal's fetched_data over DEFAULT_ANALYSIS_INPUT; no documents are
+    read. Unless fetched_data sets them, the purchase price is the asking
+    price, else the market price found by enrichment, and the NOI is
+    estimated from the monthly rent, else from the market cap rate.
+    """
+    fetched = deal.fetched_data or {}
+    data = {**DEFAULT_ANALYSIS_INPUT, **fetched}
+    if not fetched.get("purchase_price") and (deal.asking_price or deal.price):
+        data["purchase_price"] = deal.asking_price or deal.price
+    if not fetched.get("noi"):
+        if deal.rent:
+            data["noi"] = round(deal.rent * 12 * (1 - RENT_EXPENSE_RATIO))
+        elif deal.cap_rate and deal.price:
+            data["noi"] = round(deal.cap_rate * deal.price)
+    return data
+
+
+def load_analysis_inputs(deal):
+    """
+    Returns the merged analysis input and the T12 / rent roll rows of a
+    deal, read from the tables stored when the documents were parsed.
+    """
+    analysis_input = base_analysis_input(deal)
+
+    t12_extracted = document_rows(UploadedDocument.objects.filter(deal=deal, doc_type='t12').first())
+    rent_roll_extracted = document_rows(UploadedDocument.objects.filter(deal=deal, doc_type='rent_roll').first())
+    return analysis_input, t12_extracted, rent_roll_extracted
+
+
+def save_analysis_result(deal, analysis_input, result):
+    # cap_rate is None without a purchase price, cash_on_cash and irr without equity invested
+    cap_rate = result["summary"].get("cap_rate")
+    analysis_result, created = AnalysisResult.objects.update_or_create(
+        deal=deal,
+        defaults={
+            'cap_rate': cap_rate,
+            'cash_on_cash': result["summary"].get("cash_on_cash"),
+            'irr': result["summary"].get("irr"),
+            'pass_status': cap_rate is not None and cap_rate >= 0.07 and analysis_input['year_built'] > 2005,  # Example logic
+            'recommendations': result["ai_recommendations"].get("recommendations", []),
+            'risk_score': result["risk_analysis"].get("risk_score"),
+            'risk_flags': result["risk_analysis"].get("red_flags"),
+        }
+    )
+    return analysis_result
+
+
+def analyze_deal(deal, timer=None):
+    """
+    Runs the full analysis pipeline for a deal and stores the AnalysisResult.
+    Stages: parse_documents, llm_analysis, save_result.
+    """
+    timer = timer or StageTimer()
+
+    with timer.stage("parse_documents"):
+        analysis_input, t12_extracted, rent_roll_extracted = load_analysis_inputs(deal)
+
+    with timer.stage("llm_analysis"):
+        result = run_full_analysis(analysis_input, t12_data=t12_extracted, rent_roll_data=rent_roll_extracted)
+
+    with timer.stage("save_result"):
+        return save_analysis_result(deal, analysis_input, result)
+
+
+def stream_deal_analysis(deal, provider=None):
+    """
+    Runs the analysis pipeline like analyze_deal, yielding (event, data)
+    pairs as it goes: started, documents_parsed, risk_analysis_started,
+    insights_started, token (incremental model output), error,
+    risk_analysis_done, insights_done and finally result_saved, whose data
+    is the stored AnalysisResult.
+    Both prompts stream concurrently; database work stays in the calling thread.
+    """
+    provider = provider or llm.get_provider()
+    yield "started", {"deal_id": deal.pk}
+
+    analysis_input, t12_extracted, rent_roll_extracted = load_analysis_inputs(deal)
+    yield "documents_parsed", {
+        "t12_rows": len(t12_extracted or []),
+        "rent_roll_rows": len(rent_roll_extracted or []),
+    }
+
+    prompts = {
+        "risk_analysis": prepare_risk_prompt(
+            analysis_input["area_income"], analysis_input["crime_score"], t12_extracted or [], rent_roll_extracted or []
+        ),
+        "insights": build_insights_prompt(analysis_input),
+    }
+    texts = {}
+    to_stream = {}
+    for name, prompt in prompts.items():
+        yield f"{name}_started", {}
+        cached = response_cache.get(provider.name, prompt)
+        if cached is None:
+            to_stream[name] = prompt
+            continue
+        texts[name] = cached
+        yield "token", {"call": name, "text": cached, "cached": True}
+        yield f"{name}_done", {}
+
+    # Streamed answers are cached only when they parse
+    valid = {"risk_analysis": is_valid_risk_response, "insights": is_valid_insights_response}
+    chunks = {name: [] for name in to_stream}
+    failed = set()
+    for name, kind, value in iterate_sync(llm.stream_many(to_stream, provider=provider)):
+        if kind == "token":
+            chunks[name].append(value)
+            yield "token", {"call": name, "text": value}
+        elif kind == "error":
+            failed.add(name)
+            yield "error", {"call": name, "message": str(value)}
+        else:
+            texts[name] = "".join(chunks[name])
+            if name not in failed and valid[name](texts[name]):
+                response_cache.set(provider.name, to_stream[name], texts[name])
+            yield f"{name}_done", {}
+
+    result = {
+        "summary": summarize_property(analysis_input),
+        "risk_analysis": parse_risk_response(texts["risk_analysis"]),
+        "ai_recommendations": parse_insights_response(texts["insights"]),
+    }
+    yield "result_saved", save_analysis_result(deal, analysis_input, result)
+
+
+def run_analysis_job(job):
+    """Job handler for kind "analysis"; stage timings are saved as they complete."""
+    def save_timing(name, seconds):
+        job.stage_timings[name] = seconds
+        job.save(update_fields=['stage_timings'])
+
+    analyze_deal(job.deal, StageTimer(on_stage=save_timing))
+
+
+def _analyze_in_thread(deal):
+    try:
+        return analyze_deal(deal)
+    finally:
+        connections.close_all()
+
+
+def analyze_deals_concurrently(deals, concurrency):
+    """
+    Analyzes many deals with at most `concurrency` running at once.
+    Yields (deal, analysis_result, error) in completion order; exactly one
+    of analysis_result and error is None. Closing the generator early (the
+    client went away) cancels the deals not started yet and returns without
+    waiting for the running ones.
+    """
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-analysis")
+    try:
+        futures = {executor.submit(_analyze_in_thread, deal): deal for deal in deals}
+        for future in as_completed(futures):
+            deal = futures[future]
+            try:
+                yield deal, future.result(), None
+            except Exception as e:
+                yield deal, None, e
+    finally:
+        # After an early close, queued deals are dropped and running ones finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,58 @@
+from core.models import Deal
+
+# Shown for deals that have not been enriched yet. Kept numeric so that
+# the frontend and the exporters can format it like real fetched data.
+PLACEHOLDER_FETCHED_DATA = {
+    "bedrooms": 0,
+    "bathrooms": 0,
+    "sqft": 0,
+    "price": 0,
+    "zestimate": 0,
+    "rent": 0,
+    "cap_rate": 0.0,
+    "year_built": 0,
+}
+
+
+def portfolio_queryset(user):
+    """
+    Returns the user's deals joined with their one-to-one AnalysisResult,
+    newest first. Evaluating it costs a single query regardless of the
+    number of deals.
+    """
+    return (
+        Deal.objects
+        .filter(user=user)
+        .select_related('analysisresult')
+        .order_by('-created_at', '-id')
+    )
+
+
+def attach_portfolio_fields(deal):
+    """
+    Sets the attributes DealReadSerializer expects on a deal loaded through
+    portfolio_queryset, without touching the database.
+    """
+    deal.analysis_result = getattr(deal, 'analysisresult', None)
+    deal.fetched_data = deal.fetched_data or dict(PLACEHOLDER_FETCHED_DATA)
+    return deal
+
+
+def load_portfolio(user, queryset=None):
+    """
+    Loads the user's deals ready for DealReadSerializer.
+    An already filtered portfolio queryset can be passed in to narrow it down.
+    """
+    if queryset is None:
+        queryset = portfolio_queryset(user)
+    return [attach_portfolio_fields(deal) for deal in queryset]
+
+
+def iter_portfolio(user, chunk_size=500):
+    """
+    Yields the user's deals one at a time, ready for DealReadSerializer.
+    Rows are fetched from the database cursor in chunks of chunk_size, so
+    memory use does not grow with the size of the portfolio.
+    """
+    for deal in portfolio_queryset(user).iterator(chunk_size=chunk_size):
+        yield attach_portfolio_fields(deal)
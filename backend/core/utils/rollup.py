@@ -0,0 +1,134 @@
+"""
+Daily rollups of deal and analysis activity, for the dashboard trends.
+
+Each DailyRollup row holds one user's counts for one day. The signal
+handlers in core.signals apply the change of every deal or analysis save
+and delete as an increment, so trends never scan AnalysisResult history;
+`manage.py backfill_rollups` recomputes the rows from scratch.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from core.models import AnalysisResult, DailyRollup, Deal
+
+PERIODS = ('day', 'week')
+
+
+def rollup_date(moment):
+    """The day a timestamp is counted on."""
+    return timezone.localdate(moment)
+
+
+def apply_rollup_delta(user_id, date, **deltas):
+    """Adds `deltas` (field name -> amount) to a user's row for a day, creating it if needed."""
+    deltas = {name: amount for name, amount in deltas.items() if amount}
+    if not deltas:
+        return
+    with transaction.atomic():
+        row, _ = DailyRollup.objects.get_or_create(user_id=user_id, date=date)
+        DailyRollup.objects.filter(pk=row.pk).update(**{name: F(name) + amount for name, amount in deltas.items()})
+
+
+def record_deals(deals, sign=1):
+    """Counts deals as added (sign=1) or removed (sign=-1) on the day they were created."""
+    days = Counter((deal.user_id, rollup_date(deal.created_at)) for deal in deals)
+    for (user_id, date), count in days.items():
+        apply_rollup_delta(user_id, date, deals_added=sign * count)
+
+
+def record_analysis(user_id, created_at, cap_rate, passed, sign=1):
+    """Counts one analysis result in (sign=1) or out (sign=-1) of its day."""
+    apply_rollup_delta(
+        user_id, rollup_date(created_at),
+        analyses=sign, passed=sign * int(bool(passed)),
+        cap_rate_sum=sign * (cap_rate or 0), cap_rate_count=sign * int(cap_rate is not None),
+    )
+
+
+def rebuild_rollups(user_ids):
+    """
+    Recomputes the rollup rows of the given users from their deals and
+    analyses, with two grouped queries. Returns the number of rows written.
+    """
+    days = {}
+
+    def row(user_id, date):
+        return days.setdefault((user_id, date), DailyRollup(user_id=user_id, date=date))
+
+    deals = (
+        Deal.objects.filter(user_id__in=user_ids)
+        .annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(count=Count('id'))
+    )
+    for values in deals:
+        row(values['user_id'], values['day']).deals_added = values['count']
+
+    analyses = (
+        AnalysisResult.objects.filter(deal__user_id__in=user_ids)
+        .annotate(day=TruncDate('created_at'))
+        .values('deal__user_id', 'day')
+        .annotate(
+            count=Count('id'), passed=Count('id', filter=Q(pass_status=True)),
+            cap_rate_sum=Sum('cap_rate'), cap_rate_count=Count('id', filter=Q(cap_rate__isnull=False)),
+        )
+    )
+    for values in analyses:
+        rollup = row(values['deal__user_id'], values['day'])
+        rollup.analyses = values['count']
+        rollup.passed = values['passed']
+        rollup.cap_rate_sum = values['cap_rate_sum'] or 0
+        rollup.cap_rate_count = values['cap_rate_count']
+
+    with transaction.atomic():
+        DailyRollup.objects.filter(user_id__in=user_ids).delete()
+        DailyRollup.objects.bulk_create(days.values(), batch_size=1000)
+    return len(days)
+
+
+def trends(user, period='day', days=90):
+    """
+    The user's activity over the last `days` days, one point per day or per
+    week (weeks start on Monday), oldest first and with empty periods
+    included. Each point has deals_added, analyses, average_cap_rate and
+    pass_rate; pass_rate is None when nothing was analyzed, and
+    average_cap_rate when no analysis has a cap rate.
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = DailyRollup.objects.filter(user=user, date__gte=start)
+    if period == 'week':
+        start -= timedelta(days=start.weekday())
+        step = timedelta(weeks=1)
+        rows = rows.annotate(period=TruncWeek('date'))
+    else:
+        step = timedelta(days=1)
+        rows = rows.annotate(period=F('date'))
+    totals = {
+        values['period']: values
+        for values in rows.values('period').annotate(
+            total_deals=Sum('deals_added'), total_analyses=Sum('analyses'),
+            total_passed=Sum('passed'), total_cap_rate=Sum('cap_rate_sum'), total_cap_rates=Sum('cap_rate_count'),
+        )
+    }
+
+    points = []
+    current = start
+    while current <= today:
+        values = totals.get(current, {})
+        analyses = values.get('total_analyses') or 0
+        cap_rates = values.get('total_cap_rates') or 0
+        points.append({
+            'period': current.isoformat(),
+            'deals_added': values.get('total_deals') or 0,
+            'analyses': analyses,
+            'average_cap_rate': round(values['total_cap_rate'] / cap_rates, 4) if cap_rates else None,
+            'pass_rate': round(values['total_passed'] / analyses, 4) if analyses else None,
+        })
+        current += step
+    return points
@@ -0,0 +1,218 @@
+"""
+Fuzzy and prefix search over the location of a user's deals.
+
+Deals are matched on Deal.search_text, their normalized address, city,
+state and ZIP code, by trigram similarity: the share of the query's
+three-letter fragments found in a deal's words. On PostgreSQL this runs in
+the database on a pg_trgm GIN index (see migration 0010). Other databases
+use NgramIndex, an in-process inverted index of the same trigrams, built
+per user on first search and kept current by the signal handlers in
+core.signals; it is only as fresh as the process that holds it, which is
+fine for SQLite development and tests.
+"""
+import heapq
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, When
+
+from core.models import Deal
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+# Users whose in-process index is kept; the least recently searched are dropped.
+INDEX_CACHE_SIZE = 32
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def normalize(text):
+    """Lowercases text and reduces it to words of letters and digits separated by single spaces."""
+    return _NON_WORD.sub(' ', (text or '').lower()).strip()
+
+
+def trigrams(text, prefix=False):
+    """
+    The set of trigrams of normalized text, pg_trgm style: each word is
+    padded with two spaces in front and one behind. With prefix=True the
+    last word is not padded behind, so that "123 ma" matches "123 main".
+    """
+    words = text.split()
+    grams = set()
+    for i, word in enumerate(words):
+        padded = f'  {word}' if prefix and i == len(words) - 1 else f'  {word} '
+        grams.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return grams
+
+
+class NgramIndex:
+    """
+    Inverted trigram index of deal ids to their search_text. Posting lists
+    are plain lists of ids: adding is cheap, removing scans the lists of
+    the removed text's trigrams only.
+    """
+
+    def __init__(self, items=()):
+        self._texts = {}
+        self._postings = {}
+        self._lock = threading.Lock()
+        for deal_id, text in items:
+            self._add(deal_id, text)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def _add(self, deal_id, text):
+        self._texts[deal_id] = text
+        for gram in trigrams(text):
+            self._postings.setdefault(gram, []).append(deal_id)
+
+    def _remove(self, deal_id):
+        text = self._texts.pop(deal_id, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            postings = self._postings[gram]
+            postings.remove(deal_id)
+            if not postings:
+                del self._postings[gram]
+
+    def update(self, deal_id, text):
+        with self._lock:
+            if self._texts.get(deal_id) != text:
+                self._remove(deal_id)
+                self._add(deal_id, text)
+
+    def remove(self, deal_id):
+        with self._lock:
+            self._remove(deal_id)
+
+    def search(self, query, limit, min_similarity):
+        """
+        Returns up to `limit` (deal_id, score) pairs, best first. Deals
+        containing the query word-for-word (its last word as a prefix)
+        score 1; others score their trigram similarity, and those below
+        min_similarity are left out.
+        """
+        grams = trigrams(query, prefix=True)
+        if not grams:
+            return []
+        size = len(grams)
+        with self._lock:
+            counts = Counter()
+            for gram in grams:
+                counts.update(self._postings.get(gram, ()))
+            needed = min_similarity * size
+            texts = self._texts
+            scored = [
+                (count / size, deal_id)
+                for deal_id, count in counts.items()
+                if needed <= count < size
+            ]
+            for deal_id, count in counts.items():
+                if count == size:
+                    text = texts[deal_id]
+                    if text.startswith(query):
+                        # Prefix matches of the whole text rank first
+                        scored.append((2.0, deal_id))
+                    elif _contains_words(text, query):
+                        scored.append((1.0, deal_id))
+                    else:
+                        scored.append((0.99, deal_id))
+        best = heapq.nlargest(limit, scored)
+        return [(deal_id, min(score, 1.0)) for score, deal_id in best]
+
+
+def _contains_words(text, query):
+    """Whether query occurs in text starting at a word boundary."""
+    return f' {text}'.find(f' {query}') != -1
+
+
+def get_index(user_id):
+    """
+    The in-process index of a user's deals, built on first use. The index is
+    built without holding the lock, so searches of other users go on
+    meanwhile, and swapped in when ready.
+    """
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        if index is not None:
+            _indexes.move_to_end(user_id)
+            return index
+    built = NgramIndex(
+        Deal.objects.filter(user_id=user_id).values_list('id', 'search_text').iterator(chunk_size=5000)
+    )
+    with _indexes_lock:
+        # Another search of the user may have built it first
+        index = _indexes.setdefault(user_id, built)
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+        return index
+
+
+def index_deals(deals):
+    """Updates the loaded in-process indexes with new or changed deals."""
+    for deal in deals:
+        index = _indexes.get(deal.user_id)
+        if index is not None:
+            index.update(deal.pk, deal.search_text)
+
+
+def unindex_deal(deal):
+    index = _indexes.get(deal.user_id)
+    if index is not None:
+        index.remove(deal.pk)
+
+
+def clear_indexes():
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def match_rank(query):
+    """
+    SQL counterpart of the tiers of NgramIndex.search: 2 for deals whose
+    search_text starts with the query, 1 for deals containing it from a
+    word boundary, 0 for the rest, which rank by similarity.
+    """
+    return Case(
+        When(search_text__startswith=query, then=Value(2)),
+        When(search_text__contains=f' {query}', then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def search_deals(user, query, limit=None):
+    """
+    The user's deals best matching `query`, best first, each with a
+    `score` between 0 and 1. Returns a list of Deal instances.
+    """
+    limit = limit or settings.DEAL_SEARCH_LIMIT
+    query = normalize(query)
+    if not query:
+        return []
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        return list(
+            Deal.objects.filter(user=user)
+            .filter(Q(search_text__contains=query) | Q(search_text__trigram_word_similar=query))
+            .annotate(rank=match_rank(query), similarity=TrigramWordSimilarity(query, 'search_text'))
+            .annotate(score=Case(When(rank__gt=0, then=Value(1.0)), default=F('similarity'), output_field=FloatField()))
+            .order_by('-rank', '-score', '-id')[:limit]
+        )
+
+    matches = get_index(user.pk).search(query, limit, settings.DEAL_SEARCH_MIN_SIMILARITY)
+    deals = Deal.objects.filter(user=user).in_bulk([deal_id for deal_id, _ in matches])
+    results = []
+    for deal_id, score in matches:
+        deal = deals.get(deal_id)
+        if deal is not None:
+            deal.score = round(score, 4)
+            results.append(deal)
+    return results
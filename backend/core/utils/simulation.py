@@ -0,0 +1,72 @@
+"""
+Monte Carlo sensitivity analysis of a deal.
+
+Each scenario draws rent growth, vacancy, expense inflation and an exit cap
+rate from uniform ranges, projects the deal over a holding period and
+computes its returns. All scenarios are evaluated together as NumPy arrays
+of shape (scenarios, years).
+"""
+import numpy as np
+
+from core.utils import metrics, underwrite
+
+# (low, high) of the uniform distribution each assumption is drawn from
+DEFAULT_RANGES = {
+    'rent_growth': (0.0, 0.05),
+    'vacancy': (0.03, 0.12),
+    'expense_inflation': (0.02, 0.05),
+    'exit_cap_rate': (0.05, 0.09),
+}
+
+
+def draw_assumptions(scenarios, ranges, rng):
+    """One array of `scenarios` draws per assumption in `ranges`."""
+    return {
+        name: rng.uniform(low, high, scenarios)
+        for name, (low, high) in ranges.items()
+    }
+
+
+def simulate_returns(inputs, assumptions, years):
+    """
+    Projects every scenario over `years` years with core.utils.underwrite
+    and returns a dict of arrays with one value per scenario: irr,
+    cap_rate (year one NOI over price), cash_on_cash (year one) and
+    equity_multiple. `inputs` are underwrite.deal_inputs() of the deal;
+    the drawn assumptions replace its growth, vacancy and exit cap rate.
+    """
+    projection = underwrite.project(**{
+        **inputs,
+        "hold_years": years,
+        "rent_growth": assumptions["rent_growth"],
+        "vacancy": assumptions["vacancy"],
+        "expense_growth": assumptions["expense_inflation"],
+        "exit_cap_rate": assumptions["exit_cap_rate"],
+    })
+    return {
+        "irr": projection["irr"],
+        "cap_rate": metrics.cap_rate(projection["noi"][:, 0], inputs["purchase_price"]),
+        "cash_on_cash": projection["cash_on_cash"],
+        "equity_multiple": projection["equity_multiple"],
+    }
+
+
+def run_simulation(inputs, scenarios=10000, years=5, ranges=None, seed=None):
+    """
+    Runs `scenarios` Monte Carlo scenarios for a deal, given as an
+    analysis input dict, and summarizes each return metric. `ranges`
+    overrides entries of DEFAULT_RANGES.
+    """
+    ranges = {**DEFAULT_RANGES, **(ranges or {})}
+    rng = np.random.default_rng(seed)
+    assumptions = draw_assumptions(scenarios, ranges, rng)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        returns = simulate_returns(underwrite.deal_inputs(inputs), assumptions, years)
+    irr = returns['irr']
+    return {
+        'scenarios': scenarios,
+        'years': years,
+        'ranges': {name: list(bounds) for name, bounds in ranges.items()},
+        'metrics': {name: metrics.describe(values) for name, values in returns.items()},
+        'probability_of_loss': round(float(np.mean(~(irr > 0))), 4),
+    }
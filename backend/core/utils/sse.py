@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets views that stream server-sent events pass DRF content negotiation
+    for `Accept: text/event-stream`. Error responses are rendered as JSON.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=JSONEncoder)
+
+
+def sse_event(event, data):
+    """Formats one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n"
+
+
+def iterate_sync(agen):
+    """
+    Iterates an async generator from synchronous code, one item at a time,
+    on a private event loop. Unlike handing the async generator to
+    StreamingHttpResponse under WSGI, items are not buffered up front.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
@@ -0,0 +1,158 @@
+import re
+
+INCOME_WORDS = ("income", "rent", "revenue", "fee", "laundry", "parking", "other inc")
+EXPENSE_WORDS = (
+    "expense", "tax", "insurance", "repair", "maintenance", "utilit", "water", "electric",
+    "gas", "payroll", "salar", "management", "admin", "marketing", "legal", "contract",
+    "landscap", "trash", "pest", "turnover", "cleaning",
+)
+TOTAL_WORDS = ("total", "net operating", "noi", "subtotal")
+VACANT_WORDS = ("vacant", "vacancy", "empty", "down", "model")
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_NUMERIC_CELL = re.compile(r"^\(?-?\$?\s*[\d,]*\.?\d+\s*%?\)?$")
+
+
+def parse_number(value):
+    """
+    Reads a number out of a table cell such as "$1,250.00", "(300)" or
+    "6.5%"; percentages are read as fractions (0.065), the way cap rates
+    are stored. Returns None for booleans and cells without a number.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return None
+    text = str(value).strip().replace(",", "").replace("$", "")
+    negative = text.startswith("(") and text.endswith(")")
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    number = float(match.group())
+    if "%" in text:
+        number /= 100
+    return -abs(number) if negative else number
+
+
+def is_numeric_cell(value):
+    """Whether a cell holds just a number, unlike labels such as "4010 Rental Income"."""
+    if isinstance(value, (int, float)):
+        return True
+    return bool(_NUMERIC_CELL.match(str(value or "").strip()))
+
+
+def _find_column(headers, *words):
+    # Earlier words win, so "status" is preferred to "tenant" wherever they appear
+    for word in words:
+        for header in headers:
+            if word in header.lower():
+                return header
+    return None
+
+
+def _numeric_columns(rows, headers):
+    return [
+        header for header in headers
+        if sum(is_numeric_cell(row.get(header)) for row in rows) > len(rows) / 2
+    ]
+
+
+def summarize_t12(rows):
+    """
+    Reduces T12 line items to income/expense totals per period column,
+    NOI, and the largest expense lines.
+    """
+    if not rows:
+        return {"rows": 0}
+    import numpy as np
+
+    headers = list(rows[0].keys())
+    numeric = _numeric_columns(rows, headers)
+    label = next((header for header in headers if header not in numeric), None)
+    periods = [header for header in numeric if "total" not in header.lower()] or numeric
+    total_column = _find_column(numeric, "total", "annual", "ytd")
+
+    income = np.zeros(len(periods))
+    expense = np.zeros(len(periods))
+    expense_lines = []
+    for row in rows:
+        name = str(row.get(label, "")).lower() if label else ""
+        if any(word in name for word in TOTAL_WORDS):
+            continue  # skip subtotal lines so nothing is counted twice
+        values = np.array([parse_number(row.get(header)) or 0.0 for header in periods])
+        if any(word in name for word in EXPENSE_WORDS):
+            expense += values
+            line_total = parse_number(row.get(total_column)) if total_column else None
+            expense_lines.append((row.get(label), line_total if line_total is not None else float(values.sum())))
+        elif any(word in name for word in INCOME_WORDS):
+            income += values
+
+    expense_lines.sort(key=lambda line: line[1], reverse=True)
+    return {
+        "rows": len(rows),
+        "periods": periods,
+        "income_by_period": [round(value, 2) for value in income.tolist()],
+        "expense_by_period": [round(value, 2) for value in expense.tolist()],
+        "total_income": round(float(income.sum()), 2),
+        "total_expense": round(float(expense.sum()), 2),
+        "noi": round(float(income.sum() - expense.sum()), 2),
+        "expense_ratio": round(float(expense.sum() / income.sum()), 4) if income.sum() else None,
+        "top_expenses": [{"item": item, "total": round(total, 2)} for item, total in expense_lines[:5]],
+    }
+
+
+def summarize_rent_roll(rows, max_outliers=10):
+    """
+    Reduces unit-level rent roll rows to occupancy, rent distribution
+    quantiles and the units whose rent falls outside 1.5 IQR.
+    """
+    if not rows:
+        return {"units": 0}
+    import numpy as np
+
+    headers = list(rows[0].keys())
+    unit_column = _find_column(headers, "unit", "apt", "suite")
+    rent_column = _find_column(headers, "market rent", "actual rent", "rent", "amount")
+    status_column = _find_column(headers, "status", "occup", "vacan", "tenant")
+    sqft_column = _find_column(headers, "sqft", "sq ft", "sq. ft", "square", "size", "sf")
+
+    rents = np.array([parse_number(row.get(rent_column)) if rent_column else None for row in rows], dtype=float)
+    vacant = np.array([
+        bool(status_column) and any(word in str(row.get(status_column, "")).lower() for word in VACANT_WORDS)
+        for row in rows
+    ])
+    summary = {
+        "units": len(rows),
+        "occupied": int((~vacant).sum()),
+        "vacant": int(vacant.sum()),
+        "occupancy_rate": round(float((~vacant).mean()), 4),
+    }
+
+    known = rents[~np.isnan(rents)]
+    if known.size:
+        q1, median, q3 = np.percentile(known, [25, 50, 75])
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        outliers = np.flatnonzero((rents < low) | (rents > high))
+        summary["rent"] = {
+            "min": round(float(known.min()), 2),
+            "p25": round(float(q1), 2),
+            "median": round(float(median), 2),
+            "p75": round(float(q3), 2),
+            "max": round(float(known.max()), 2),
+            "mean": round(float(known.mean()), 2),
+            "total_monthly": round(float(known.sum()), 2),
+        }
+        summary["rent_outliers"] = [
+            {"unit": rows[i].get(unit_column) if unit_column else int(i), "rent": float(rents[i])}
+            for i in outliers[:max_outliers]
+        ]
+    if sqft_column:
+        sqft = np.array([parse_number(row.get(sqft_column)) for row in rows], dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_sqft = rents / sqft
+        per_sqft = per_sqft[np.isfinite(per_sqft)]
+        if per_sqft.size:
+            summary["median_rent_per_sqft"] = round(float(np.median(per_sqft)), 3)
+    return summary
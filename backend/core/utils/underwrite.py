@@ -1,22 +1,251 @@
+"""
+Multi-year pro-forma projection of deals.
+
+From the purchase price, the year-zero NOI (split into income and operating
+expenses), financing terms and growth assumptions, project() builds each
+deal's annual income, expenses, NOI, loan amortization, levered cash flow
+and exit proceeds. Everything is computed as NumPy arrays of shape
+(deals, years), so thousands of deals project in one call.
+
+project_deal() and project_deals() memoize projections on a fingerprint of
+their inputs, so re-analyzing an unchanged deal costs a dictionary lookup.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from core.utils import metrics
+
+DEFAULT_ASSUMPTIONS = {
+    "hold_years": 5,
+    "ltv": 0.75,  # loan-to-value at purchase
+    "interest_rate": 0.065,  # annual, fixed
+    "amortization_years": 30,
+    "closing_costs": 0.0,  # share of the price paid in cash at purchase
+    "rent_growth": 0.03,
+    "expense_growth": 0.03,
+    "vacancy": 0.0,  # extra vacancy and credit loss on top of the base NOI
+    "expense_ratio": 0.4,  # operating expenses over effective income in year zero
+    "exit_cap_rate": None,  # None: going-in cap rate plus EXIT_CAP_SPREAD
+    "selling_costs": 0.02,  # share of the exit value
+}
+EXIT_CAP_SPREAD = 0.005
+
+PROJECTION_CACHE_SIZE = 4096
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _column(value):
+    """A per-deal assumption as a column that broadcasts across years."""
+    return np.asarray(value, dtype=float)[..., np.newaxis]
+
+
+def amortization(loan, interest_rate, amortization_years, years):
+    """
+    Monthly-payment amortization summarized per year, for every loan at once.
+    Returns (annual debt service with shape (deals,), end-of-year balances,
+    interest paid and principal repaid, each with shape (deals, years)).
+    """
+    monthly_rate = np.asarray(interest_rate, dtype=float) / 12
+    months = np.asarray(amortization_years, dtype=float) * 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = np.where(
+            monthly_rate > 0,
+            loan * monthly_rate / (1 - (1 + monthly_rate) ** -months),
+            loan / months,
+        )
+    elapsed = 12 * np.arange(years + 1)
+    growth = (1 + monthly_rate)[..., np.newaxis] ** elapsed
+    with np.errstate(divide='ignore', invalid='ignore'):
+        paid_down = np.where(
+            (monthly_rate > 0)[..., np.newaxis],
+            payment[..., np.newaxis] * (growth - 1) / monthly_rate[..., np.newaxis],
+            payment[..., np.newaxis] * elapsed,
+        )
+    balances = np.clip(loan[..., np.newaxis] * growth - paid_down, 0, None)
+    principal = balances[..., :-1] - balances[..., 1:]
+    debt_service = 12 * payment
+    interest = debt_service[..., np.newaxis] - principal
+    return debt_service, balances[..., 1:], interest, principal
+
+
+def project(purchase_price, noi, hold_years=DEFAULT_ASSUMPTIONS["hold_years"], **assumptions):
+    """
+    Projects deals over hold_years years. purchase_price, noi and every
+    entry of `assumptions` (see DEFAULT_ASSUMPTIONS) may be scalars or
+    arrays with one value per deal. Returns a dict of arrays: yearly
+    income, expenses, noi, debt_service, interest, principal, balance and
+    cash_flow; per deal equity, exit_value, sale_proceeds, the equity
+    cash_flows (year 0 first) and the metrics irr, cap_rate,
+    cash_on_cash (year one) and equity_multiple.
+    """
+    a = {**DEFAULT_ASSUMPTIONS, **assumptions}
+    # One row per deal, however many of the inputs vary between deals
+    shape = np.broadcast_shapes((1,), np.shape(purchase_price), np.shape(noi), *(
+        np.shape(value) for value in a.values() if value is not None
+    ))
+    price = np.broadcast_to(np.asarray(purchase_price, dtype=float), shape)
+    base_noi = np.broadcast_to(np.asarray(noi, dtype=float), shape)
+
+    base_income = base_noi / (1 - np.asarray(a["expense_ratio"], dtype=float))
+    base_expenses = base_income - base_noi
+    # Years 1..hold_years, plus the following year whose NOI prices the exit
+    periods = np.arange(1, hold_years + 2)
+    income = base_income[:, np.newaxis] * (1 + _column(a["rent_growth"])) ** periods * (1 - _column(a["vacancy"]))
+    expenses = base_expenses[:, np.newaxis] * (1 + _column(a["expense_growth"])) ** periods
+    noi_by_year = income - expenses
+
+    loan = price * np.asarray(a["ltv"], dtype=float)
+    equity = price - loan + price * np.asarray(a["closing_costs"], dtype=float)
+    debt_service, balance, interest, principal = amortization(
+        loan, a["interest_rate"], a["amortization_years"], hold_years,
+    )
+    debt_service = np.broadcast_to(debt_service, price.shape)
+    cash_flow = noi_by_year[:, :hold_years] - debt_service[:, np.newaxis]
+
+    going_in_cap = metrics.cap_rate(base_noi, price)
+    if a["exit_cap_rate"] is None:
+        exit_cap = going_in_cap + EXIT_CAP_SPREAD
+    else:
+        # NaN entries take the default for their deal, as None does for all deals
+        exit_cap = np.asarray(a["exit_cap_rate"], dtype=float)
+        exit_cap = np.where(np.isnan(exit_cap), going_in_cap + EXIT_CAP_SPREAD, exit_cap)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exit_value = noi_by_year[:, hold_years] / exit_cap
+    sale_proceeds = exit_value * (1 - np.asarray(a["selling_costs"], dtype=float)) - balance[:, -1]
+
+    cash_flows = np.column_stack([-equity, cash_flow])
+    cash_flows[:, -1] += sale_proceeds
+    with np.errstate(divide='ignore', invalid='ignore'):
+        equity_multiple = np.where(equity > 0, cash_flows[:, 1:].sum(axis=1) / equity, np.nan)
+    return {
+        "income": income[:, :hold_years],
+        "expenses": expenses[:, :hold_years],
+        "noi": noi_by_year[:, :hold_years],
+        "debt_service": debt_service,
+        "interest": interest,
+        "principal": principal,
+        "balance": balance,
+        "cash_flow": cash_flow,
+        "equity": equity,
+        "exit_value": exit_value,
+        "sale_proceeds": sale_proceeds,
+        "cash_flows": cash_flows,
+        "irr": metrics.irr(cash_flows),
+        "cap_rate": going_in_cap,
+        "cash_on_cash": metrics.cash_on_cash(cash_flow[:, 0], equity),
+        "equity_multiple": equity_multiple,
+    }
+
+
+def deal_inputs(data):
+    """The projection inputs found in an analysis input dict (see pipeline.DEFAULT_ANALYSIS_INPUT)."""
+    inputs = {"purchase_price": float(data["purchase_price"]), "noi": float(data["noi"])}
+    for name in DEFAULT_ASSUMPTIONS:
+        if data.get(name) is not None:
+            inputs[name] = data[name]
+    return inputs
+
+
+def fingerprint(inputs):
+    """Stable hash of projection inputs, with defaults filled in."""
+    canonical = json.dumps({**DEFAULT_ASSUMPTIONS, **inputs}, sort_keys=True, default=float)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+RATIO_METRICS = ("irr", "cap_rate", "cash_on_cash", "equity_multiple")
+
+
+def _rows(projection):
+    """
+    Splits a projection into one dict per deal of plain Python values,
+    rounded for storage, with None for undefined (NaN or infinite) values.
+    """
+    columns = {}
+    for name, values in projection.items():
+        rounded = np.round(values, 4 if name in RATIO_METRICS else 2).astype(object)
+        rounded[~np.isfinite(values)] = None
+        columns[name] = rounded.tolist()
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def project_deals(inputs_list):
+    """
+    Projects many deals given as deal_inputs() dicts and returns one row
+    per deal (plain lists and floats, see _rows). Cached rows are reused;
+    the others are projected together, one vectorized call per distinct
+    hold period. Returned rows are shared with the cache: do not mutate them.
+    """
+    keys = [fingerprint(inputs) for inputs in inputs_list]
+    rows = [None] * len(inputs_list)
+    missing = {}
+    with _cache_lock:
+        for i, key in enumerate(keys):
+            if key in _cache:
+                _cache.move_to_end(key)
+                rows[i] = _cache[key]
+            else:
+                missing.setdefault(key, []).append(i)
+    if not missing:
+        return rows
+
+    groups = {}
+    for key, positions in missing.items():
+        inputs = {**DEFAULT_ASSUMPTIONS, **inputs_list[positions[0]]}
+        groups.setdefault(int(inputs["hold_years"]), []).append((key, inputs))
+    computed = {}
+    for hold_years, members in groups.items():
+        columns = {
+            name: [inputs[name] for _, inputs in members]
+            for name in members[0][1] if name != "hold_years"
+        }
+        if all(value is None for value in columns["exit_cap_rate"]):
+            columns["exit_cap_rate"] = None
+        else:
+            columns["exit_cap_rate"] = [np.nan if value is None else value for value in columns["exit_cap_rate"]]
+        projection = project(hold_years=hold_years, **columns)
+        for (key, _), row in zip(members, _rows(projection)):
+            computed[key] = row
+
+    with _cache_lock:
+        for key, row in computed.items():
+            _cache[key] = row
+            _cache.move_to_end(key)
+        while len(_cache) > PROJECTION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    for key, positions in missing.items():
+        for i in positions:
+            rows[i] = computed[key]
+    return rows
+
+
+def project_deal(inputs):
+    """Projection of a single deal, memoized; see project_deals."""
+    return project_deals([inputs])[0]
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
 
 def run_underwriting_logic(deal):
     """
-    Stub logic to simulate AI underwriting.
-    In real app, integrate your AI/financial model here.
-    """
-    # Sample dummy logic
-    cap_rate = 0.07  # 7%
-    cash_on_cash = 0.10  # 10%
-    irr = 0.12  # 12%
-    pass_status = cap_rate >= 0.06  # Example threshold
-    recommendations = [
-        "Increase rent by 5%",
-        "Reduce operating expenses by 3%",
-    ]
+    Underwrites a deal from its analysis inputs with the default
+    assumptions and returns its headline metrics.
+    """
+    from core.utils.pipeline import base_analysis_input
+
+    projection = project_deal(deal_inputs(base_analysis_input(deal)))
+    cap_rate = projection["cap_rate"]
     return {
         "cap_rate": cap_rate,
-        "cash_on_cash": cash_on_cash,
-        "irr": irr,
-        "pass_status": pass_status,
-        "recommendations": recommendations,
+        "cash_on_cash": projection["cash_on_cash"],
+        "irr": projection["irr"],
+        "pass_status": cap_rate is not None and cap_rate >= 0.06,
+        "cash_flows": projection["cash_flows"],
     }
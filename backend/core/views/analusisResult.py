@@ -1,70 +1,116 @@
 # core/views.py
 
+import json
+from contextlib import closing
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
 
-from core.utils.analysis import run_full_analysis, extract_pdf_table_data
-from core.models import Deal, AnalysisResult,UploadedDocument
-from core.serializers.analasisResult import AnalysisResultSerializer, RecommendationsSerializer
+from core.utils.jobs import enqueue
+from core.utils.filters import matched_deals
+from core.utils.pipeline import analyze_deal, analyze_deals_concurrently, stream_deal_analysis
+from core.utils.sse import EventStreamRenderer, sse_event
+from core.models import Deal, AnalysisResult, FilterSetting
+from core.serializers.analasisResult import AnalysisResultSerializer, RecommendationsSerializer, BatchAnalysisSerializer
+from core.serializers.job import BackgroundJobSerializer
 
 class DealAnalyzeAPIView(APIView):
     """
     Handles analyzing a specific deal for the authenticated user.
-    POST: Run AI-powered investment analysis and create/update analysis result for a deal by ID.
+    POST: Queue an AI-powered investment analysis for a deal by ID and return
+          202 with the job; poll /jobs/<id>/ for progress.
+          Pass ?sync=true to run it in the request and get the result directly.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        deal = get_object_or_404(Deal, pk=pk, user=request.user)
+
+        if request.query_params.get('sync') == 'true':
+            analysis_result = analyze_deal(deal)
+            serializer = AnalysisResultSerializer(analysis_result)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        job = enqueue('analysis', request.user, deal=deal)
+        return Response(BackgroundJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class DealAnalyzeStreamAPIView(APIView):
+    """
+    Handles analyzing a specific deal while streaming its progress.
+    POST: Run the analysis for a deal by ID and stream server-sent events:
+          pipeline stages as they start and finish, `token` events carrying
+          incremental model output, and a final `result_saved` event with
+          the stored analysis result.
     """
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
 
     def post(self, request, pk):
         deal = get_object_or_404(Deal, pk=pk, user=request.user)
+        response = StreamingHttpResponse(self.stream_events(deal), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+        return response
 
-        # Make sure fetched_data exists and contains what we need
-        data = deal.fetched_data or {}
-
-        # Define expected fields with fallbacks
-        default_data = {
-            "purchase_price": 1000000,
-            "noi": 75000,
-            "cash_invested": 250000,
-            "annual_cash_flow": 20000,
-            "cash_flows": [-250000, 20000, 22000, 25000, 800000],
-            "bedrooms": 3,
-            "bathrooms": 2,
-            "sqft": 1200,
-            "rent": 2500,
-            "year_built": 1995,
-            "crime_score": 5,
-            "area_income": 60000,
-        }
-
-        # Merge default values with actual fetched_data
-        analysis_input = {**default_data, **data}
-
-        # Run full analysis using Gemini + Python logic
-        t12_doc = UploadedDocument.objects.filter(deal=deal, doc_type='t12').first()
-        t12_extracted = extract_pdf_table_data(t12_doc.file.path) if t12_doc else None
-        rent_roll_doc = UploadedDocument.objects.filter(deal=deal, doc_type='rent_roll').first()
-        
-        rent_roll_extracted = extract_pdf_table_data(rent_roll_doc.file.path) if rent_roll_doc else None
-        result = run_full_analysis(analysis_input,t12_data=t12_extracted, rent_roll_data=rent_roll_extracted)
-
-        # Save to AnalysisResult
-        analysis_result, created = AnalysisResult.objects.update_or_create(
-            deal=deal,
-            defaults={
-                'cap_rate': result["summary"].get("cap_rate"),
-                'cash_on_cash': result["summary"].get("cash_on_cash"),
-                'irr': result["summary"].get("irr"),
-                'pass_status': result["summary"].get("cap_rate", 0) >= 0.07 and deal.fetched_data['year_built'] > 2005,  # Example logic
-                'recommendations': result["ai_recommendations"].get("recommendations", []),
-                'risk_score': result["risk_analysis"].get("risk_score"),
-                'risk_flags': result["risk_analysis"].get("red_flags"),
-            }
+    def stream_events(self, deal):
+        try:
+            for event, data in stream_deal_analysis(deal):
+                if event == 'result_saved':
+                    data = AnalysisResultSerializer(data).data
+                yield sse_event(event, data)
+        except Exception as e:
+            yield sse_event('error', {'message': str(e)})
+
+
+class DealBatchAnalyzeAPIView(APIView):
+    """
+    Handles analyzing many deals of the authenticated user in one request.
+    POST: Analyze the deals given by `deal_ids` or matched by the saved filter
+          `filter_id`, running at most `concurrency` at a time. Results are
+          streamed back as newline-delimited JSON, one line per deal as it
+          completes, followed by a summary line.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchAnalysisSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        deals = Deal.objects.filter(user=request.user)
+        if 'filter_id' in data:
+            filter_setting = get_object_or_404(FilterSetting, pk=data['filter_id'], user=request.user)
+            deals = matched_deals(deals, filter_setting)
+        else:
+            deals = deals.filter(pk__in=data['deal_ids'])
+
+        return StreamingHttpResponse(
+            self.stream_results(list(deals), data['concurrency']),
+            content_type='application/x-ndjson',
         )
 
-        serializer = AnalysisResultSerializer(analysis_result)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def stream_results(self, deals, concurrency):
+        encoder = JSONEncoder()
+        failed = 0
+        # closing: a client disconnect closes this generator, which cancels the deals not started yet
+        with closing(analyze_deals_concurrently(deals, concurrency)) as results:
+            for deal, analysis_result, error in results:
+                if error is None:
+                    line = {'deal_id': deal.pk, 'status': 'done', 'result': AnalysisResultSerializer(analysis_result).data}
+                else:
+                    failed += 1
+                    line = {'deal_id': deal.pk, 'status': 'failed', 'error': str(error)}
+                yield encoder.encode(line) + '\n'
+        yield json.dumps({'status': 'complete', 'total': len(deals), 'failed': failed}) + '\n'
+
+
 class DealAnalysisResultAPIView(APIView):
     """
     Handles retrieving the analysis result for a specific deal.
@@ -6,12 +6,16 @@ from django.shortcuts import get_object_or_404
 
 from core.models import Deal, UploadedDocument
 from core.serializers.document import UploadedDocumentSerializer
-from core.utils.parse_document import parse_document
+from core.serializers.job import BackgroundJobSerializer
+from core.utils.documents import content_hash, reuse_parse
+from core.utils.jobs import enqueue
 
 class DocumentUploadAPIView(APIView):
     """
     Handles uploading and parsing documents for a specific deal.
-    POST: Upload a document and parse it based on its type.
+    POST: Upload a document. A file whose contents were parsed before comes
+          back with its parsed_data; otherwise parsed_data is null and the
+          response includes the "document_parse" job that fills it in.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -23,17 +27,20 @@ class DocumentUploadAPIView(APIView):
         if not file or not doc_type:
             return Response({'error': 'File and doc_type are required.'}, status=400)
 
-        # Parse document
-        parsed_data = parse_document(file, doc_type)
-
         document = UploadedDocument.objects.create(
             deal=deal,
             file=file,
             doc_type=doc_type,
-            parsed_data=parsed_data
+            content_hash=content_hash(file),
         )
 
-        return Response(UploadedDocumentSerializer(document).data, status=201)
+        if reuse_parse(document):
+            return Response(UploadedDocumentSerializer(document).data, status=201)
+
+        job = enqueue('document_parse', request.user, deal=deal, payload={'document_id': document.pk})
+        document.refresh_from_db(fields=['parsed_data'])  # set already when jobs run inline
+        data = UploadedDocumentSerializer(document).data
+        return Response({**data, 'job': BackgroundJobSerializer(job).data}, status=201)
 
 
 class DealDocumentsAPIView(APIView):
@@ -1,6 +1,5 @@
 
 import os
-import random
 from tempfile import NamedTemporaryFile
 from django.conf import settings
 from django.http import FileResponse
@@ -9,10 +8,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
 
-from core.models import AnalysisResult, ExportedFile, Deal
+from core.models import ExportedFile, Deal
 from core.serializers.export import ExportedFileSerializer
 from core.serializers.deal import DealReadSerializer
 from core.utils.export import export_deals_to_excel, export_deals_to_pdf
+from core.utils.portfolio import load_portfolio
 
 
 class ExportListAPIView(APIView):
@@ -37,23 +37,9 @@ class ExportPDFAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        deals = Deal.objects.filter(user=request.user)
-        if not deals.exists():
+        deals = load_portfolio(request.user)
+        if not deals:
             return Response({"detail": "No deals found for the user."}, status=404)
-        for deal in deals:
-            analaysis_result = AnalysisResult.objects.filter(deal=deal).first()
-            
-            deal.fetched_data = deal.fetched_data or {
-                "bedrooms": 0,
-                "bathrooms": 0,
-                "sqft": random.randint(500, 5000),
-                "price": random.randint(100000, 1000000),
-                "zestimate": random.randint(100000, 1000000),
-                "rent": random.randint(1000, 5000),
-                "cap_rate": random.uniform(0.01, 0.1),
-                "year_built": random.randint(1900, 2023),
-            }
-            deal.analysis_result = analaysis_result if analaysis_result else None
         deals_data = DealReadSerializer(deals, many=True).data
         filename = generate_timestamp_filename("deal_report", "pdf")
         output_dir = os.path.join(settings.MEDIA_ROOT, "exports")
@@ -76,23 +62,9 @@ class ExportExcelAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        deals = Deal.objects.filter(user=request.user)
-        if not deals.exists():
+        deals = load_portfolio(request.user)
+        if not deals:
             return Response({"detail": "No deals found for the user."}, status=404)
-        for deal in deals:
-            analaysis_result = AnalysisResult.objects.filter(deal=deal).first()
-            
-            deal.fetched_data = deal.fetched_data or {
-                "bedrooms": 0,
-                "bathrooms": 0,
-                "sqft": random.randint(500, 5000),
-                "price": random.randint(100000, 1000000),
-                "zestimate": random.randint(100000, 1000000),
-                "rent": random.randint(1000, 5000),
-                "cap_rate": random.uniform(0.01, 0.1),
-                "year_built": random.randint(1900, 2023),
-            }
-            deal.analysis_result = analaysis_result if analaysis_result else None
         deals_data = DealReadSerializer(deals, many=True).data
         filename = generate_timestamp_filename("deal_report", "xlsx")
         output_dir = os.path.join(settings.MEDIA_ROOT, "exports")
@@ -1,9 +1,14 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
 from core.models import FilterSetting
+from core.serializers.deal import DealReadSerializer
 from core.serializers.filter import FilterSettingSerializer
+from core.utils.filters import matched_deals
+from core.utils.pagination import DealCursorPagination
+from core.utils.portfolio import load_portfolio, portfolio_queryset
 
 class FilterListCreateAPIView(APIView):
     """
@@ -14,7 +19,7 @@ class FilterListCreateAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        filters = FilterSetting.objects.filter(user=request.user)
+        filters = FilterSetting.objects.filter(user=request.user).annotate(match_count=Count('matches'))
         serializer = FilterSettingSerializer(filters, many=True)
         return Response(serializer.data)
 
@@ -55,3 +60,21 @@ class FilterDetailAPIView(APIView):
         filt = self.get_object(pk, request.user)
         filt.delete()
         return Response(status=204)
+
+
+class FilterDealsAPIView(APIView):
+    """
+    Runs a saved filter on the server.
+    GET: The user's deals matching the filter, newest first, cursor-paginated
+         like /deals/ (?cursor=, ?page_size=). Reads the precomputed
+         FilterMatch rows rather than re-evaluating the filter.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        filter_setting = get_object_or_404(FilterSetting, pk=pk, user=request.user)
+        queryset = matched_deals(portfolio_queryset(request.user), filter_setting)
+        paginator = DealCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = DealReadSerializer(load_portfolio(request.user, queryset=page), many=True)
+        return paginator.get_paginated_response(serializer.data)
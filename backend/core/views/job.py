@@ -0,0 +1,19 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import permissions
+from django.shortcuts import get_object_or_404
+
+from core.models import BackgroundJob
+from core.serializers.job import BackgroundJobSerializer
+
+
+class JobStatusAPIView(APIView):
+    """
+    Reports the progress of a background job.
+    GET: Status (queued/running/done/failed) and stage timings of a job by ID.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(BackgroundJob, pk=pk, user=request.user)
+        return Response(BackgroundJobSerializer(job).data)
@@ -0,0 +1,24 @@
+from rest_framework import permissions
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from core.utils.analysis import prompt_size_stats
+from core.utils.llm import provider_stats
+from core.utils.llm_cache import response_cache
+
+
+class LLMMetricsAPIView(APIView):
+    """
+    Operational metrics of the LLM layer in this process, for staff users.
+    - Per provider: calls, coalesced calls, rate limiter and circuit breaker state.
+    - Response cache hits and misses.
+    - Risk prompt sizes before and after summarizing.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'providers': provider_stats(),
+            'cache': response_cache.stats(),
+            'prompt_size': prompt_size_stats(),
+        })
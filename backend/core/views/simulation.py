@@ -0,0 +1,39 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status, permissions
+from django.shortcuts import get_object_or_404
+
+from core.models import Deal
+from core.serializers.simulation import SimulationSerializer
+from core.utils.pipeline import base_analysis_input
+
+ASSUMPTIONS = ('rent_growth', 'vacancy', 'expense_inflation', 'exit_cap_rate')
+
+
+class DealSimulateAPIView(APIView):
+    """
+    Runs a Monte Carlo sensitivity analysis for a deal.
+    POST: Optional scenarios, years, seed and [low, high] ranges for
+          rent_growth, vacancy, expense_inflation and exit_cap_rate.
+          Returns percentiles and histograms of IRR, cap rate,
+          cash-on-cash and equity multiple.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        from core.utils.simulation import run_simulation
+
+        deal = get_object_or_404(Deal, pk=pk, user=request.user)
+        serializer = SimulationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        options = serializer.validated_data
+        result = run_simulation(
+            base_analysis_input(deal),
+            scenarios=options['scenarios'],
+            years=options['years'],
+            ranges={name: options[name] for name in ASSUMPTIONS if name in options},
+            seed=options.get('seed'),
+        )
+        return Response({'deal': deal.pk, **result})
@@ -1,8 +1,10 @@
-from rest_framework import permissions
+from rest_framework import permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Avg
-from core.models import Deal, AnalysisResult
+from core.models import AnalysisResult
+from core.serializers.stat import TrendsSerializer
+from core.utils.dashboard import dashboard_distributions, dashboard_metrics
+from core.utils.rollup import trends
 
 
 class DashboardMetricsAPIView(APIView):
@@ -11,25 +13,13 @@ class DashboardMetricsAPIView(APIView):
     - Total deals created by the user.
     - Average cap rate of analyzed deals.
     - Count of deals that passed or failed analysis.
+    Computed in one query and cached until one of the user's deals or
+    analyses changes.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-
-        total_deals = Deal.objects.filter(user=user).count()
-
-        analysis_qs = AnalysisResult.objects.filter(deal__user=user)
-        avg_cap_rate = analysis_qs.aggregate(avg_cap=Avg('cap_rate'))['avg_cap']
-        pass_count = analysis_qs.filter(pass_status=True).count()
-        fail_count = analysis_qs.filter(pass_status=False).count()
-
-        return Response({
-            'total_deals': total_deals,
-            'average_cap_rate': round(avg_cap_rate or 0, 2),
-            'pass_count': pass_count,
-            'fail_count': fail_count,
-        })
+        return Response(dashboard_metrics(request.user))
 
 
 class DashboardRecentDealsAPIView(APIView):
@@ -60,3 +50,33 @@ class DashboardRecentDealsAPIView(APIView):
         ]
 
         return Response(data)
+
+
+class DashboardDistributionsAPIView(APIView):
+    """
+    Provides how the user's portfolio is distributed.
+    GET: Mean, standard deviation, percentiles and a histogram of the cap
+         rate, cash-on-cash and price per square foot, and the count of
+         deals per risk score. Cached until one of the user's deals or
+         analyses changes.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(dashboard_distributions(request.user))
+
+
+class DashboardTrendsAPIView(APIView):
+    """
+    Provides the user's activity over time, for trend charts.
+    GET: One point per day, or per week with ?period=week, over the last
+         ?days= days (default 90): deals added, analyses, average cap rate
+         and pass rate. Served from the daily rollup table.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        serializer = TrendsSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(trends(request.user, **serializer.validated_data))
@@ -1,6 +1,29 @@
-import { createApi } from '@reduxjs/toolkit/query/react'
+import { createApi, FetchArgs, FetchBaseQueryError } from '@reduxjs/toolkit/query/react'
 import { baseQuery } from './base.query'
 
+const POLL_INTERVAL_MS = 1500
+const POLL_TIMEOUT_MS = 5 * 60 * 1000
+
+type Fetch = (arg: string | FetchArgs) =>
+  | Promise<{ data?: unknown; error?: FetchBaseQueryError }>
+  | { data?: unknown; error?: FetchBaseQueryError }
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms))
+
+// GETs `url` every POLL_INTERVAL_MS until `isDone(data)` holds, a request fails or POLL_TIMEOUT_MS passes
+async function pollUntil<T>(fetch: Fetch, url: string, isDone: (data: T) => boolean) {
+  const deadline = Date.now() + POLL_TIMEOUT_MS
+  while (true) {
+    const result = await fetch(url)
+    if (result.error) return { error: result.error }
+    if (isDone(result.data as T)) return { data: result.data as T }
+    if (Date.now() > deadline) {
+      return { error: { status: 'TIMEOUT_ERROR', error: `Timed out waiting for ${url}` } as FetchBaseQueryError }
+    }
+    await sleep(POLL_INTERVAL_MS)
+  }
+}
+
 
 export const dealApi = createApi({
   reducerPath: 'api/deals',
@@ -8,10 +31,23 @@ export const dealApi = createApi({
   tagTypes: ['Deal', 'Deals','Analysis', 'Document', 'Export'],
   endpoints: (builder) => ({
     analyzeDeal: builder.mutation({
-      query: (id: number | string) => ({
-        url: `deals/${id}/analyze/`,
-        method: 'POST',
-      }),
+      // The analysis runs as a background job (202 + job); polls jobs/<id>/
+      // and resolves with the stored analysis once the job is done
+      async queryFn(id: number | string, _api, _extraOptions, fetchWithBQ) {
+        const queued = await fetchWithBQ({ url: `deals/${id}/analyze/`, method: 'POST' })
+        if (queued.error) return { error: queued.error }
+        const job = await pollUntil<{ status: string; error: string }>(
+          fetchWithBQ,
+          `jobs/${(queued.data as { id: number }).id}/`,
+          (result) => result.status === 'done' || result.status === 'failed',
+        )
+        if (job.error) return { error: job.error }
+        if (job.data.status === 'failed') {
+          return { error: { status: 'CUSTOM_ERROR', error: job.data.error || 'Analysis failed' } as FetchBaseQueryError }
+        }
+        const analysis = await fetchWithBQ(`deals/${id}/analysis/`)
+        return analysis.error ? { error: analysis.error } : { data: analysis.data }
+      },
       invalidatesTags: (result, error, id) => [
         { type: 'Deal', id },
         { type: 'Analysis', id },
@@ -27,15 +63,24 @@ export const dealApi = createApi({
       query: (id: number | string) => `deals/${id}/recommendations/`,
     }),
      listDeals: builder.query({
-      query: () => 'deals/',
+      query: () => 'deals/?all=true',
       providesTags: ['Deals'],
     }),
     createDeal: builder.mutation({
-      query: (data) => ({
-        url: 'deals/',
-        method: 'POST',
-        body: data,
-      }),
+      // The deal is created at once and enriched by a background job;
+      // resolves with the deal once its property data is in
+      async queryFn(data, _api, _extraOptions, fetchWithBQ) {
+        const created = await fetchWithBQ({ url: 'deals/', method: 'POST', body: data })
+        if (created.error) return { error: created.error }
+        const deal = created.data as { id: number }
+        const enrichment = await pollUntil<{ enrichment_status: string }>(
+          fetchWithBQ,
+          `deals/${deal.id}/enrichment/`,
+          (result) => result.enrichment_status !== 'pending',
+        )
+        if (enrichment.error) return { error: enrichment.error }
+        return { data: { ...deal, ...enrichment.data } }
+      },
       invalidatesTags: ['Deal'],
     }),
     getDeal: builder.query({